@@ -10,3 +10,6 @@ python manage.py collectstatic --no-input
 
 # Apply any outstanding database migrations
 python manage.py migrate
+
+# Load the bank list into the shared cache before the first request
+python manage.py warm_bank_directory
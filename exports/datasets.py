@@ -0,0 +1,122 @@
+"""
+Datasets that can be exported and the streaming of their rows.
+
+Each dataset maps column names to ORM lookups. Rows are read as tuples with
+values_list(...).iterator(), which uses a server-side cursor on PostgreSQL, so
+neither model instances nor the full result set are ever held in memory.
+"""
+
+from collections import namedtuple
+
+from payments.models import Transaction, WalletTransaction
+from useraccounts.models import CustomUser, UserEarnings
+
+CHUNK_SIZE = 2000
+
+Dataset = namedtuple("Dataset", ["model", "columns", "date_field"])
+
+DATASETS = {
+    "earnings": Dataset(
+        UserEarnings,
+        {
+            "id": "id",
+            "email": "individual_profile__user__email",
+            "amount": "amount",
+            "earnings_type": "earnings_type__bonus_name",
+            "description": "description",
+            "date": "date",
+        },
+        "date",
+    ),
+    "wallet_transactions": Dataset(
+        WalletTransaction,
+        {
+            "id": "id",
+            "email": "wallet__user__email",
+            "transaction_type": "transaction_type",
+            "amount": "amount",
+            "status": "status",
+            "reference": "paystack_payment_reference",
+            "timestamp": "timestamp",
+        },
+        "timestamp",
+    ),
+    "payouts": Dataset(
+        Transaction,
+        {
+            "reference_id": "reference_id",
+            "email": "user__email",
+            "amount": "amount",
+            "payment_method": "payment_method",
+            "status": "status",
+            "account_number": "account_number",
+            "bank_code": "bank_code",
+            "transfer_code": "transfer_code",
+            "date": "date",
+            "submitted_at": "submitted_at",
+        },
+        "date",
+    ),
+    "users": Dataset(
+        CustomUser,
+        {
+            "id": "id",
+            "email": "email",
+            "name": "name",
+            "user_type": "user_type",
+            "status": "status",
+            "is_active": "is_active",
+            "phone_number": "phone_number",
+            "country": "country",
+            "state": "state",
+            "city": "city",
+            "date_joined": "date_joined",
+        },
+        "date_joined",
+    ),
+}
+
+
+def get_dataset(name):
+    """
+    Returns the dataset with the given name. Raises ValueError when there
+    is none.
+    """
+    try:
+        return DATASETS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown dataset {name!r}; choose from {', '.join(DATASETS)}."
+        )
+
+
+def select_columns(dataset, columns=None):
+    """
+    Returns the requested columns in order, or all columns of the dataset.
+    Raises ValueError for columns the dataset does not have.
+    """
+    if not columns:
+        return list(dataset.columns)
+    unknown = [column for column in columns if column not in dataset.columns]
+    if unknown:
+        raise ValueError(
+            f"Unknown columns {', '.join(unknown)}; "
+            f"choose from {', '.join(dataset.columns)}."
+        )
+    return list(columns)
+
+
+def rows(dataset, columns, since=None, until=None, chunk_size=CHUNK_SIZE):
+    """
+    Yields the rows of a dataset as tuples of the given columns, in primary
+    key order, optionally limited to [since, until) on its date field.
+    """
+    queryset = dataset.model.objects.all()
+    if since:
+        queryset = queryset.filter(**{f"{dataset.date_field}__gte": since})
+    if until:
+        queryset = queryset.filter(**{f"{dataset.date_field}__lt": until})
+    lookups = [dataset.columns[column] for column in columns]
+    yield from (
+        queryset.order_by("pk").values_list(*lookups).iterator(chunk_size=chunk_size)
+    )
@@ -0,0 +1,82 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from exports import datasets, writers
+
+
+def _datetime(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise CommandError(f"Invalid date {value!r}; use ISO 8601.")
+    return parsed
+
+
+class Command(BaseCommand):
+    """
+    Streams a dataset to a CSV or NDJSON file. Memory use does not grow with
+    the number of rows, so it suits exports too large to serve over HTTP.
+    """
+
+    help = "Export earnings, wallet transactions, payouts or users to a file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=list(datasets.DATASETS))
+        parser.add_argument("--format", choices=list(writers.FORMATS), default="csv")
+        parser.add_argument("--columns", help="Comma separated columns (default: all).")
+        parser.add_argument("--since", type=_datetime)
+        parser.add_argument("--until", type=_datetime)
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument(
+            "--output",
+            help="File to write to (default: <dataset>.<format>[.gz]); - for stdout.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=datasets.CHUNK_SIZE,
+            help="Rows fetched from the database at a time.",
+        )
+
+    def handle(self, *args, **options):
+        dataset = datasets.get_dataset(options["dataset"])
+        requested = (options["columns"] or "").split(",")
+        try:
+            columns = datasets.select_columns(
+                dataset, [column.strip() for column in requested if column.strip()]
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        rows = datasets.rows(
+            dataset,
+            columns,
+            since=options["since"],
+            until=options["until"],
+            chunk_size=options["chunk_size"],
+        )
+        count = 0
+
+        def counted(rows):
+            nonlocal count
+            for row in rows:
+                count += 1
+                yield row
+
+        chunks = writers.encode(
+            options["format"], columns, counted(rows), options["gzip"]
+        )
+        output = options["output"] or writers.filename(
+            options["dataset"], options["format"], options["gzip"]
+        )
+        if output == "-":
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+
+        with open(output, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Exported {count} rows to {output}."))
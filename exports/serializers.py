@@ -0,0 +1,19 @@
+from rest_framework import serializers
+
+from . import writers
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    """
+    Serializer for the options of an export.
+    """
+
+    # Not "format", which REST framework reserves for content negotiation
+    file_format = serializers.ChoiceField(choices=list(writers.FORMATS), default="csv")
+    columns = serializers.CharField(required=False)
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+    gzip = serializers.BooleanField(default=False)
+
+    def validate_columns(self, value):
+        return [column.strip() for column in value.split(",") if column.strip()]
@@ -0,0 +1,97 @@
+import gzip
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from useraccounts.models import CustomUser
+
+from . import writers
+
+
+class CsvWriterTests(SimpleTestCase):
+    def encode(self, rows):
+        return b"".join(writers.encode("csv", ["name", "amount"], rows)).decode()
+
+    def test_formula_cells_are_escaped(self):
+        rows = [
+            ['=HYPERLINK("http://example.com")', 1],
+            ["+1", 2],
+            ["-1", 3],
+            ["@SUM(A1)", 4],
+        ]
+
+        lines = self.encode(rows).splitlines()[1:]
+
+        self.assertEqual(
+            lines,
+            [
+                '"\'=HYPERLINK(""http://example.com"")",1',
+                "'+1,2",
+                "'-1,3",
+                "'@SUM(A1),4",
+            ],
+        )
+
+    def test_numbers_and_plain_text_are_unchanged(self):
+        lines = self.encode([["Ada", Decimal("-5000.00")]]).splitlines()
+
+        self.assertEqual(lines, ["name,amount", "Ada,-5000.00"])
+
+
+class ExportViewTests(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(
+            "admin@example.com", "password", name="Admin", user_type="admin"
+        )
+        self.member = CustomUser.objects.create_user(
+            "member@example.com", "password", name="Member", user_type="individual"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, dataset, **params):
+        return self.client.get(reverse("export", args=[dataset]), params)
+
+    def test_streams_the_selected_columns_as_csv(self):
+        response = self.export("users", columns="email,user_type")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('filename="users.csv"', response["Content-Disposition"])
+        self.assertEqual(
+            b"".join(response.streaming_content).decode().splitlines(),
+            [
+                "email,user_type",
+                "admin@example.com,admin",
+                "member@example.com,individual",
+            ],
+        )
+
+    def test_gzipped_ndjson_limited_to_a_date_range(self):
+        CustomUser.objects.filter(pk=self.admin.pk).update(
+            date_joined=timezone.now() - timedelta(days=30)
+        )
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+
+        response = self.export(
+            "users", file_format="ndjson", gzip="true", columns="email", since=since
+        )
+
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        lines = gzip.decompress(b"".join(response.streaming_content)).splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines], [{"email": "member@example.com"}]
+        )
+
+    def test_unknown_datasets_and_columns_are_rejected(self):
+        self.assertEqual(self.export("secrets").status_code, 400)
+        self.assertEqual(self.export("users", columns="password").status_code, 400)
+
+    def test_only_admins_can_export(self):
+        self.client.force_authenticate(self.member)
+
+        self.assertEqual(self.export("users").status_code, 403)
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .views import ExportView
+
+urlpatterns = [
+    path("<str:dataset>/", ExportView.as_view(), name="export"),
+]
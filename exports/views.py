@@ -0,0 +1,42 @@
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from referrals.permissions import IsAdmin
+
+from . import datasets, writers
+from .serializers import ExportQuerySerializer
+
+
+class ExportView(APIView):
+    """
+    View streaming a dataset as CSV or NDJSON, optionally gzip compressed.
+    """
+
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request, dataset):
+        query = ExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        options = query.validated_data
+
+        try:
+            source = datasets.get_dataset(dataset)
+            columns = datasets.select_columns(source, options.get("columns"))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = datasets.rows(
+            source, columns, since=options.get("since"), until=options.get("until")
+        )
+        response = StreamingHttpResponse(
+            writers.encode(options["file_format"], columns, rows, options["gzip"]),
+            content_type=writers.content_type(options["file_format"], options["gzip"]),
+        )
+        response["Content-Disposition"] = (
+            "attachment; filename="
+            f'"{writers.filename(dataset, options["file_format"], options["gzip"])}"'
+        )
+        return response
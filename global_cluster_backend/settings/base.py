@@ -28,10 +28,12 @@ INSTALLED_APPS = [
     "rest_framework_simplejwt",
     "corsheaders",
     "drf_spectacular",
+    "django_filters",
     # Local
     "useraccounts.apps.UseraccountsConfig",
     "referrals.apps.ReferralsConfig",
     "payments.apps.PaymentsConfig",
+    "exports.apps.ExportsConfig",
 ]
 
 MIDDLEWARE = [
@@ -103,6 +105,8 @@ AUTH_USER_MODEL = "useraccounts.CustomUser"
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "mediafiles"
+# Public base URL of the API, for media URLs built outside a request
+SITE_URL = os.getenv("DJANGO_SITE_URL", "http://localhost:8000")
 
 # REST framework
 REST_FRAMEWORK = {
@@ -186,6 +190,7 @@ CSRF_TRUSTED_ORIGINS = ["http://localhost:5173"]
 # Paystack keys
 PAYSTACK_SECRET_KEY = os.getenv("PAYSTACK_SECRET_KEY", "")
 PAYSTACK_PUBLIC_KEY = os.getenv("PAYSTACK_PUBLIC_KEY", "")
+PAYSTACK_BASE_URL = os.getenv("PAYSTACK_BASE_URL", "https://api.paystack.co/")
 
 # Email settings for local development
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
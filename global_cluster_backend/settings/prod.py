@@ -29,9 +29,12 @@ INSTALLED_APPS = [
     "rest_framework_simplejwt",
     "corsheaders",
     "drf_spectacular",
+    "django_filters",
     # Local
     "useraccounts.apps.UseraccountsConfig",
     "referrals.apps.ReferralsConfig",
+    "payments.apps.PaymentsConfig",
+    "exports.apps.ExportsConfig",
 ]
 
 MIDDLEWARE = [
@@ -82,6 +85,16 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 db_from_env = dj_database_url.config(default=DATABASE_URL, conn_max_age=500)
 DATABASES["default"].update(db_from_env)
 
+# Shared by all workers: the earnings type registry version stamp, the
+# leaderboards, the bank directory refresh lock and the Paystack, counter and
+# catalogue caches must be seen by every process, and are read on hot paths.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -119,6 +132,8 @@ AUTH_USER_MODEL = "useraccounts.CustomUser"
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "mediafiles"
+# Public base URL of the API, for media URLs built outside a request
+SITE_URL = os.getenv("DJANGO_SITE_URL", "")
 
 # REST framework
 REST_FRAMEWORK = {
@@ -191,6 +206,11 @@ CORS_ALLOW_HEADERS = [
 # CSRF
 CSRF_TRUSTED_ORIGINS = os.getenv("CSRF_TRUSTED_ORIGINS", "").split(",")
 
+# Paystack keys
+PAYSTACK_SECRET_KEY = os.getenv("PAYSTACK_SECRET_KEY", "")
+PAYSTACK_PUBLIC_KEY = os.getenv("PAYSTACK_PUBLIC_KEY", "")
+PAYSTACK_BASE_URL = os.getenv("PAYSTACK_BASE_URL", "https://api.paystack.co/")
+
 # Email settings for production
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "default-email@example.com")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "default-password")
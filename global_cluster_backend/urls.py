@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from referrals.views import ProductRedirectView
 from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularRedocView,
@@ -13,6 +14,12 @@ urlpatterns = [
     path("api/v1/accounts/", include("useraccounts.urls")),
     path("api/v1/referrals/", include("referrals.urls")),
     path("api/v1/payments/", include("payments.urls")),
+    path("api/v1/exports/", include("exports.urls")),
+    path(
+        "r/<uuid:product>/<int:sharer>/",
+        ProductRedirectView.as_view(),
+        name="product-redirect",
+    ),
     path("api/v1/api-schema/", SpectacularAPIView.as_view(), name="api-schema"),
     path(
         "api/v1/api-schema/swagger-ui/",
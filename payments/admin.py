@@ -1,10 +1,20 @@
 from django.contrib import admin
-from .models import Wallet, WalletTransaction, Transaction
+from .models import (
+    Wallet,
+    WalletTransaction,
+    Transaction,
+    WalletBalanceCheckpoint,
+    PaystackEvent,
+    JobCheckpoint,
+    BankDirectorySnapshot,
+    TransferRecipient,
+)
 
 
 @admin.register(Wallet)
 class WalletAdmin(admin.ModelAdmin):
-    list_display = ("user", "currency", "created_at")
+    list_display = ("user", "currency", "balance", "created_at")
+    readonly_fields = ("balance",)
 
 
 @admin.register(WalletTransaction)
@@ -12,9 +22,65 @@ class WalletTransactionAdmin(admin.ModelAdmin):
     list_display = ("wallet", "transaction_type", "amount", "timestamp", "status")
 
 
+@admin.register(WalletBalanceCheckpoint)
+class WalletBalanceCheckpointAdmin(admin.ModelAdmin):
+    list_display = ("wallet", "taken_at", "balance")
+    date_hierarchy = "taken_at"
+    readonly_fields = ("wallet", "taken_at", "balance")
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
-    list_display = ("user", "reference_id", "amount", "payment_method", "status")
+    list_display = (
+        "user",
+        "reference_id",
+        "amount",
+        "payment_method",
+        "status",
+        "submitted_at",
+    )
 
     def get_queryset(self, request):
         return Transaction.objects.filter(user=request.user)
+
+
+@admin.register(PaystackEvent)
+class PaystackEventAdmin(admin.ModelAdmin):
+    list_display = ("event", "reference", "received_at", "processed_at", "outcome")
+    list_filter = ("event", "outcome")
+    search_fields = ("reference", "event_key")
+    readonly_fields = (
+        "event_key",
+        "event",
+        "reference",
+        "payload",
+        "received_at",
+        "processed_at",
+        "outcome",
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(JobCheckpoint)
+class JobCheckpointAdmin(admin.ModelAdmin):
+    list_display = ("name", "position", "updated_at")
+
+
+@admin.register(BankDirectorySnapshot)
+class BankDirectorySnapshotAdmin(admin.ModelAdmin):
+    list_display = ("source", "fetched_at")
+    readonly_fields = ("source", "payload", "fetched_at")
+
+
+@admin.register(TransferRecipient)
+class TransferRecipientAdmin(admin.ModelAdmin):
+    list_display = ("recipient_code", "name", "bank_code", "account_number")
+    search_fields = ("recipient_code", "account_number")
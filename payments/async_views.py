@@ -0,0 +1,220 @@
+"""
+Async variants of the Paystack-bound payment views.
+
+Django REST framework views are synchronous, so these are plain Django async
+views that authenticate with the same JWT settings and return the same
+payloads as their counterparts in payments.views. Served under ASGI, a worker
+keeps handling other requests while a Paystack round-trip is in flight, and
+their database and cache work runs on the payments.threads pool rather than
+on a single thread.
+"""
+
+import json
+
+import httpx
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from . import events, ledger
+from .banks import BankDirectoryUnavailable, bank_directory
+from .models import PaystackEvent, Wallet, WalletTransaction
+from .paystack import async_paystack
+from .resolution import account_resolver
+from .serializers import DepositSerializer
+from .threads import run_in_thread
+from .views import deposit_status
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncAPIView(View):
+    """
+    Base class for async views that require a JWT authenticated user.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            authenticated = await run_in_thread(
+                JWTAuthentication().authenticate, request
+            )
+        except AuthenticationFailed as e:
+            return JsonResponse({"detail": str(e.detail)}, status=401)
+        if authenticated is None:
+            return JsonResponse(
+                {"detail": "Authentication credentials were not provided."},
+                status=401,
+            )
+        request.user = authenticated[0]
+        return await super().dispatch(request, *args, **kwargs)
+
+    def request_data(self, request):
+        if request.content_type == "application/json":
+            try:
+                return json.loads(request.body or b"{}")
+            except ValueError:
+                return {}
+        return request.POST
+
+
+def _record_deposit(user, amount, reference):
+    WalletTransaction.objects.create(
+        wallet=Wallet.objects.get(user=user),
+        transaction_type="deposit",
+        amount=amount,
+        paystack_payment_reference=reference,
+        status="pending",
+    )
+
+
+def _apply_pending_events(transaction):
+    events.process_events(
+        PaystackEvent.objects.filter(reference=transaction.paystack_payment_reference),
+        retry_unmatched=True,
+    )
+    transaction.refresh_from_db()
+
+
+class AsyncDepositFunds(AsyncAPIView):
+    """
+    View for depositing funds into the wallet.
+    """
+
+    async def post(self, request, *args, **kwargs):
+        serializer = DepositSerializer(
+            data=self.request_data(request), context={"request": request}
+        )
+        if not await run_in_thread(serializer.is_valid):
+            return JsonResponse(serializer.errors, status=400)
+
+        try:
+            response = await async_paystack.post(
+                "transaction/initialize", data=serializer.validated_data
+            )
+            response_data = response.json()
+        except (httpx.HTTPError, ValueError):
+            return JsonResponse(
+                {"detail": "Failed to initialize transaction with Paystack."},
+                status=400,
+            )
+        if not response_data.get("status"):
+            return JsonResponse(
+                {
+                    "detail": response_data.get(
+                        "message", "Paystack declined the request."
+                    )
+                },
+                status=400,
+            )
+
+        await run_in_thread(
+            _record_deposit,
+            request.user,
+            serializer.validated_data["amount"],
+            response_data["data"]["reference"],
+        )
+        return JsonResponse(response_data, status=201)
+
+
+class AsyncVerifyDeposit(AsyncAPIView):
+    """
+    View for verifying deposit.
+    """
+
+    async def get(self, request, reference):
+        transaction = await run_in_thread(
+            WalletTransaction.objects.filter(
+                paystack_payment_reference=reference, wallet__user=request.user
+            ).first
+        )
+        if transaction is None:
+            return JsonResponse({"detail": "Not found."}, status=404)
+        if transaction.status in ledger.UNSETTLED_STATUSES:
+            # Apply a charge.success webhook that arrived but was not processed yet
+            await run_in_thread(_apply_pending_events, transaction)
+        if transaction.status == "success":
+            return JsonResponse(deposit_status(transaction))
+
+        try:
+            response = await async_paystack.get(
+                f"transaction/verify/{reference}", endpoint="transaction/verify"
+            )
+        except httpx.HTTPError:
+            response = None
+
+        if response is None or response.status_code != 200:
+            return JsonResponse(
+                {"detail": "Failed to verify transaction with Paystack."}, status=400
+            )
+
+        resp_data = response.json()
+        if resp_data.get("data", {}).get("status") == "success":
+            await run_in_thread(
+                ledger.settle_pending,
+                transaction,
+                resp_data["data"]["status"],
+                resp_data["data"]["amount"],
+            )
+            return JsonResponse(resp_data)
+
+        return JsonResponse(resp_data, status=400)
+
+
+class AsyncBankListView(AsyncAPIView):
+    async def get(self, request):
+        try:
+            banks = await run_in_thread(bank_directory.payload)
+        except BankDirectoryUnavailable as e:
+            return JsonResponse(
+                {"error": "Failed to fetch banks from Paystack", "details": str(e)},
+                status=500,
+            )
+
+        return JsonResponse(banks)
+
+
+class AsyncVerifyBankAccountView(AsyncAPIView):
+    async def get(self, request, *args, **kwargs):
+        account_number = request.GET.get("account_number")
+        bank_code = request.GET.get("bank_code")
+
+        if not account_number or not bank_code:
+            return JsonResponse(
+                {"error": "account_number and bank_code are required."}, status=400
+            )
+
+        try:
+            resolution = await account_resolver.aresolve(bank_code, account_number)
+        except httpx.HTTPError as e:
+            return JsonResponse(
+                {"error": "Failed to reach Paystack", "details": str(e)}, status=502
+            )
+
+        return JsonResponse(resolution.data, status=resolution.status_code)
+
+
+class AsyncValidateAccountView(AsyncAPIView):
+    async def post(self, request):
+        data = self.request_data(request)
+        bank_code = data.get("bank_code")
+        account_number = data.get("account_number")
+
+        try:
+            bank = await run_in_thread(bank_directory.by_code, bank_code)
+        except BankDirectoryUnavailable:
+            return JsonResponse({"error": "Bank list not available"}, status=500)
+        if not bank:
+            return JsonResponse({"error": "Bank not found"}, status=400)
+
+        try:
+            resolution = await account_resolver.aresolve(bank_code, account_number)
+        except httpx.HTTPError:
+            return JsonResponse({"error": "Failed to validate account"}, status=502)
+
+        if resolution.status_code == 200:
+            return JsonResponse(resolution.data)
+        return JsonResponse(
+            {"error": "Failed to validate account"}, status=resolution.status_code
+        )
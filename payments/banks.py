@@ -0,0 +1,173 @@
+"""
+Directory of the banks supported by Paystack.
+
+The bank list is kept in the Django cache without expiry together with the
+time it was fetched. Once it is older than BANK_LIST_TTL it is still served
+while a single background refresh (guarded by a cache.add lock, so one per
+cache, not one per request) fetches a new copy. Every good copy is also
+persisted in BankDirectorySnapshot, which seeds the cache on cold starts.
+With neither a cached list nor a snapshot, one request fetches the list and
+the others fail at once with BankDirectoryUnavailable instead of waiting.
+The warm_bank_directory management command (run by build.sh after
+migrating) loads the list before the first request. Each worker keeps dicts
+of the current list by bank code and by slug.
+
+Tunable through settings: BANK_LIST_TTL (seconds, default one hour).
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from .models import BankDirectorySnapshot
+from .paystack import paystack
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = "bank_directory"
+LOCK_KEY = "bank_directory:refresh"
+LOCK_TIMEOUT = 60
+
+
+class BankDirectoryUnavailable(Exception):
+    """
+    Raised when there is no bank list in the cache or the database and
+    Paystack could not be reached.
+    """
+
+
+def ttl():
+    return getattr(settings, "BANK_LIST_TTL", 60 * 60)
+
+
+class BankDirectory:
+    """
+    Stale-while-revalidate access to the bank list with O(1) lookups.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (fetched_at, by_code, by_slug) of the list last seen by this worker
+        self._index = (None, {}, {})
+
+    def _fetch(self):
+        response = paystack.get("bank")
+        response.raise_for_status()
+        payload = response.json()
+        if not payload.get("status") or not isinstance(payload.get("data"), list):
+            raise BankDirectoryUnavailable("Unexpected bank list response.")
+
+        entry = {"fetched_at": time.time(), "payload": payload}
+        cache.set(CACHE_KEY, entry, None)
+        BankDirectorySnapshot.objects.update_or_create(
+            source="paystack",
+            defaults={
+                "payload": payload,
+                "fetched_at": datetime.fromtimestamp(
+                    entry["fetched_at"], tz=dt_timezone.utc
+                ),
+            },
+        )
+        return entry
+
+    def refresh(self):
+        """
+        Fetches the list from Paystack unless another worker is already doing
+        so. Returns the new cache entry, or None when the refresh was skipped
+        or failed.
+        """
+        if not cache.add(LOCK_KEY, True, LOCK_TIMEOUT):
+            return None
+        try:
+            entry = self._fetch()
+        except (requests.RequestException, ValueError, BankDirectoryUnavailable):
+            # The lock is kept until it expires so an outage costs one
+            # attempt per LOCK_TIMEOUT instead of one per request
+            logger.exception("Failed to refresh the bank list from Paystack")
+            return None
+        cache.delete(LOCK_KEY)
+        return entry
+
+    def _refresh_in_background(self):
+        def run():
+            try:
+                self.refresh()
+            finally:
+                connections.close_all()
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _from_snapshot(self):
+        snapshot = BankDirectorySnapshot.objects.filter(source="paystack").first()
+        if snapshot is None:
+            return None
+        entry = {
+            "fetched_at": snapshot.fetched_at.timestamp(),
+            "payload": snapshot.payload,
+        }
+        cache.add(CACHE_KEY, entry, None)
+        return entry
+
+    def _entry(self):
+        entry = cache.get(CACHE_KEY) or self._from_snapshot()
+        if entry is None:
+            # Nothing to serve yet: one caller fetches, and the others fail
+            # fast rather than hold a worker while Paystack may be down
+            entry = self.refresh()
+            if entry is None:
+                raise BankDirectoryUnavailable("Bank list not available.")
+        elif time.time() - entry["fetched_at"] > ttl():
+            if not cache.get(LOCK_KEY):
+                self._refresh_in_background()
+        return entry
+
+    def _indexed(self):
+        entry = self._entry()
+        index = self._index
+        if index[0] != entry["fetched_at"]:
+            banks = entry["payload"]["data"]
+            index = (
+                entry["fetched_at"],
+                {bank["code"]: bank for bank in banks if bank.get("code")},
+                {bank["slug"]: bank for bank in banks if bank.get("slug")},
+            )
+            with self._lock:
+                self._index = index
+        return entry, index
+
+    def payload(self):
+        """
+        Returns the bank list as received from Paystack.
+        """
+        entry, _ = self._indexed()
+        return entry["payload"]
+
+    def by_code(self, code):
+        """
+        Returns the bank with the given code, or None.
+        """
+        _, (_, by_code, _) = self._indexed()
+        return by_code.get(code)
+
+    def by_slug(self, slug):
+        """
+        Returns the bank with the given slug, or None.
+        """
+        _, (_, _, by_slug) = self._indexed()
+        return by_slug.get(slug)
+
+    def warm(self):
+        """
+        Loads the list into the cache from the snapshot, or from Paystack
+        when there is none. Returns True when a list is available.
+        """
+        return bool(cache.get(CACHE_KEY) or self._from_snapshot() or self.refresh())
+
+
+bank_directory = BankDirectory()
@@ -0,0 +1,235 @@
+"""
+Ingestion and batch processing of Paystack webhook events.
+
+The webhook view only verifies the signature and records the event with
+record_event(); state changes are applied later, in batches, by
+process_events() (see the process_paystack_events management command).
+Events are keyed so that Paystack retries of the same delivery are stored
+once and applied once. Events that contradict the stored state, a charge for
+another amount or currency than its deposit or a transfer event for a payout
+that is final already, are marked rejected and logged instead of applied.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import ledger, payouts
+from .models import PaystackEvent, Transaction, WalletTransaction
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+TRANSFER_STATUSES = {
+    "transfer.success": "approved",
+    "transfer.failed": "declined",
+    "transfer.reversed": "declined",
+}
+
+
+def valid_signature(body, signature):
+    """
+    Checks the x-paystack-signature header, an HMAC-SHA512 of the raw body
+    keyed with the secret key.
+    """
+    secret = settings.PAYSTACK_SECRET_KEY
+    if not secret or not signature:
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha512).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def event_key(payload, body):
+    """
+    Returns the idempotency key of an event: its type and the id of the
+    Paystack object it is about, or a hash of the body for events without one.
+    """
+    data = payload.get("data") or {}
+    if data.get("id") is not None:
+        return f"{payload.get('event')}:{data['id']}"
+    return f"{payload.get('event')}:{hashlib.sha256(body).hexdigest()}"
+
+
+def record_event(body):
+    """
+    Stores a verified webhook body. Returns the event, or None when the same
+    event was already recorded.
+    """
+    payload = json.loads(body)
+    data = payload.get("data") or {}
+    try:
+        with transaction.atomic():
+            return PaystackEvent.objects.create(
+                event_key=event_key(payload, body)[:255],
+                event=str(payload.get("event", ""))[:100],
+                reference=str(data.get("reference") or "")[:100],
+                payload=payload,
+            )
+    except IntegrityError:
+        return None
+
+
+def _charge_matches(deposit, data):
+    amount = data.get("amount")
+    currency = deposit.wallet.currency if deposit.wallet else None
+    return (
+        amount is not None
+        and Decimal(str(amount)) == deposit.amount
+        and data.get("currency") == currency
+    )
+
+
+def _apply_charges(events):
+    """
+    Confirms the deposits of charge.success events, including deposits that
+    reconciliation marked abandoned or failed before the customer completed
+    the payment. Charges whose amount or currency differ from the deposit's
+    are not credited. Returns the ids of the events that matched a deposit
+    and of those that were rejected.
+    """
+    by_reference = defaultdict(list)
+    for event in events:
+        if event.reference:
+            by_reference[event.reference].append(event)
+    deposits = list(
+        WalletTransaction.objects.select_for_update(of=("self",))
+        .select_related("wallet")
+        .filter(
+            paystack_payment_reference__in=by_reference,
+            status__in=ledger.UNSETTLED_STATUSES,
+        )
+    )
+    settled, changes, applied, rejected = [], [], set(), set()
+    for deposit in deposits:
+        for event in by_reference[deposit.paystack_payment_reference]:
+            data = event.payload["data"]
+            if not _charge_matches(deposit, data):
+                logger.warning(
+                    "Rejected charge %s: %s %s paid for a deposit of %s",
+                    event.reference,
+                    data.get("amount"),
+                    data.get("currency"),
+                    deposit.amount,
+                )
+                rejected.add(event.pk)
+                continue
+            applied.add(event.pk)
+            if deposit.status != "success":
+                previous = deposit.ledger_entry()
+                deposit.status = "success"
+                settled.append(deposit)
+                changes.append((previous, deposit.ledger_entry()))
+
+    WalletTransaction.objects.bulk_update(settled, ["status"])
+    for previous, current in changes:
+        ledger.apply_transaction_change(previous, current)
+    return applied, rejected
+
+
+def _apply_transfers(events):
+    """
+    Approves or declines the pending payouts of transfer events and refunds
+    the declined ones. Payouts that are final already are left alone, so a
+    late or replayed event cannot flip them; events contradicting the final
+    status are rejected. Returns the ids of the events that matched a payout
+    and of those that were rejected.
+    """
+    references = defaultdict(set)
+    for event in events:
+        references[TRANSFER_STATUSES[event.event]].add(event.reference)
+
+    applied, rejected = set(), set()
+    for status, refs in references.items():
+        current = dict(
+            Transaction.objects.select_for_update()
+            .filter(reference_id__in=refs)
+            .values_list("reference_id", "status")
+        )
+        changed = [ref for ref, stored in current.items() if stored == "pending"]
+        Transaction.objects.filter(reference_id__in=changed).update(status=status)
+        if status == "declined":
+            # The transfer failed or was reversed: the held amount is returned
+            payouts.refund(changed)
+
+        for ref, stored in current.items():
+            if stored in ("pending", status):
+                applied.add((status, ref))
+            else:
+                logger.warning(
+                    "Rejected transfer event for payout %s: %s, already %s",
+                    ref,
+                    status,
+                    stored,
+                )
+                rejected.add((status, ref))
+
+    def event_ids(keys):
+        return {
+            event.pk
+            for event in events
+            if (TRANSFER_STATUSES[event.event], event.reference) in keys
+        }
+
+    return event_ids(applied), event_ids(rejected)
+
+
+def process_events(events=None, batch_size=BATCH_SIZE, retry_unmatched=False):
+    """
+    Applies one batch of unprocessed events, oldest first. Rows locked by
+    another worker are skipped. Returns a {outcome: count} mapping.
+    Args:
+        events: Optional queryset of events to pick the batch from.
+        batch_size: The maximum number of events applied.
+        retry_unmatched: Also retry events that matched no deposit or payout,
+            e.g. a webhook that arrived before its deposit was recorded.
+    """
+    if events is None:
+        events = PaystackEvent.objects.all()
+    pending = Q(processed_at__isnull=True)
+    if retry_unmatched:
+        pending |= Q(outcome="unmatched")
+
+    with transaction.atomic():
+        batch = list(
+            events.filter(pending)
+            .select_for_update(skip_locked=True)
+            .order_by("pk")[:batch_size]
+        )
+        if not batch:
+            return {}
+
+        charges = [event for event in batch if event.event == "charge.success"]
+        transfers = [event for event in batch if event.event in TRANSFER_STATUSES]
+        applied_charges, rejected_charges = _apply_charges(charges)
+        applied_transfers, rejected_transfers = _apply_transfers(transfers)
+        applied = applied_charges | applied_transfers
+        rejected = rejected_charges | rejected_transfers
+        handled = {event.pk for event in charges + transfers}
+
+        outcomes = defaultdict(list)
+        for event in batch:
+            if event.pk in applied:
+                outcomes["applied"].append(event.pk)
+            elif event.pk in rejected:
+                outcomes["rejected"].append(event.pk)
+            elif event.pk in handled:
+                outcomes["unmatched"].append(event.pk)
+            else:
+                outcomes["ignored"].append(event.pk)
+
+        now = timezone.now()
+        for outcome, pks in outcomes.items():
+            PaystackEvent.objects.filter(pk__in=pks).update(
+                processed_at=now, outcome=outcome
+            )
+
+    return {outcome: len(pks) for outcome, pks in outcomes.items()}
@@ -0,0 +1,158 @@
+"""
+Paged wallet transaction history with running balances.
+
+Pages are keyset paginated on (timestamp, id), newest first, so fetching a
+page costs the same however deep into the history it is. The running balance
+of a row is the wallet balance right after that transaction. It is computed
+with a window sum over the successful transactions the page spans, on top of
+the balance before the page: the latest checkpoint before the page plus the
+successful transactions between the two. Transactions without a timestamp
+predate the history and only count towards balances.
+"""
+
+import base64
+from decimal import Decimal
+
+from django.db.models import F, Q, Sum, Window
+from django.utils.dateparse import parse_datetime
+
+from .models import WalletBalanceCheckpoint, WalletTransaction
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(transaction):
+    raw = f"{transaction.timestamp.isoformat()}|{transaction.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Returns the (timestamp, id) key of a cursor. Raises ValueError when the
+    cursor is malformed.
+    """
+    try:
+        timestamp, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        timestamp = parse_datetime(timestamp)
+        pk = int(pk)
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor.")
+    if timestamp is None:
+        raise ValueError("Invalid cursor.")
+    return timestamp, pk
+
+
+def _before(timestamp, pk):
+    return Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, pk__lt=pk)
+
+
+def _after(timestamp, pk):
+    return Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, pk__gt=pk)
+
+
+def _balance_before(wallet_id, timestamp, pk):
+    """
+    Returns the wallet balance before the transaction with the given key.
+    """
+    successful = WalletTransaction.objects.filter(wallet_id=wallet_id, status="success")
+    checkpoint = (
+        WalletBalanceCheckpoint.objects.filter(
+            wallet_id=wallet_id, taken_at__lt=timestamp
+        )
+        .order_by("-taken_at")
+        .values("taken_at", "balance")
+        .first()
+    )
+    if checkpoint is not None:
+        balance = checkpoint["balance"]
+        successful = successful.filter(
+            _before(timestamp, pk), timestamp__gt=checkpoint["taken_at"]
+        )
+    else:
+        balance = Decimal("0.00")
+        successful = successful.filter(
+            _before(timestamp, pk) | Q(timestamp__isnull=True)
+        )
+    return balance + (
+        successful.aggregate(total=Sum("amount"))["total"] or Decimal("0.00")
+    )
+
+
+def _with_running_balances(wallet_id, page):
+    """
+    Sets running_balance on the transactions of a page, newest first.
+    """
+    oldest, newest = page[-1], page[0]
+    balance = _balance_before(wallet_id, oldest.timestamp, oldest.pk)
+
+    # Running sums of the successful transactions between the ends of the page,
+    # including those the filters left out of it
+    spanned = list(
+        WalletTransaction.objects.filter(
+            wallet_id=wallet_id, status="success", timestamp__isnull=False
+        )
+        .exclude(_before(oldest.timestamp, oldest.pk))
+        .exclude(_after(newest.timestamp, newest.pk))
+        .annotate(
+            running=Window(
+                Sum("amount"), order_by=[F("timestamp").asc(), F("id").asc()]
+            )
+        )
+        .order_by("timestamp", "id")
+        .values_list("timestamp", "id", "running")
+    )
+
+    running = Decimal("0.00")
+    position = 0
+    for transaction in reversed(page):
+        key = (transaction.timestamp, transaction.pk)
+        while position < len(spanned) and spanned[position][:2] <= key:
+            running = spanned[position][2]
+            position += 1
+        transaction.running_balance = balance + Decimal(str(running))
+    return page
+
+
+def transaction_history(
+    wallet,
+    transaction_type=None,
+    status=None,
+    since=None,
+    until=None,
+    cursor=None,
+    page_size=PAGE_SIZE,
+):
+    """
+    Returns (transactions, next_cursor) for one page of the wallet history,
+    newest first. next_cursor is None on the last page.
+    Args:
+        wallet: The wallet whose transactions are listed.
+        transaction_type: Only list transactions of this type.
+        status: Only list transactions with this status.
+        since: Only list transactions timestamped at or after this time.
+        until: Only list transactions timestamped before this time.
+        cursor: The next_cursor of the previous page.
+        page_size: The number of transactions per page, at most MAX_PAGE_SIZE.
+    """
+    transactions = WalletTransaction.objects.filter(
+        wallet=wallet, timestamp__isnull=False
+    )
+    if transaction_type:
+        transactions = transactions.filter(transaction_type=transaction_type)
+    if status:
+        transactions = transactions.filter(status=status)
+    if since:
+        transactions = transactions.filter(timestamp__gte=since)
+    if until:
+        transactions = transactions.filter(timestamp__lt=until)
+    if cursor:
+        transactions = transactions.filter(_before(*decode_cursor(cursor)))
+
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    page = list(transactions.order_by("-timestamp", "-id")[: page_size + 1])
+    next_cursor = encode_cursor(page[page_size - 1]) if len(page) > page_size else None
+    page = page[:page_size]
+    if page:
+        _with_running_balances(wallet.pk, page)
+    return page, next_cursor
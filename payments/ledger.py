@@ -0,0 +1,201 @@
+"""
+Stored wallet balances and balance checkpoints.
+
+Wallet.balance is the sum of the amounts of the wallet's successful
+transactions. WalletTransaction.save() and delete() apply their change to it
+in the same database transaction, relative to the stored row they lock;
+code that changes transactions with queryset updates must call
+apply_transaction_change itself, as settle_pending() does, and drift can be
+detected and repaired with the verify_wallet_balances management command.
+
+WalletBalanceCheckpoint rows, written by the checkpoint_wallet_balances
+command, hold the balance of a wallet at a point in time so balance_at() only
+has to add the transactions timestamped after the latest checkpoint.
+Transactions without a timestamp count as happening before any checkpoint.
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Wallet, WalletBalanceCheckpoint, WalletTransaction
+
+BATCH_SIZE = 5000
+
+# Deposit statuses a later successful charge may still settle: Paystack lets
+# a customer complete an abandoned checkout, or retry a failed one, with the
+# same reference
+UNSETTLED_STATUSES = ("pending", "abandoned", "failed")
+
+
+def apply_balance_delta(wallet_id, delta, since=None):
+    """
+    Adds delta to the wallet balance and to the checkpoints taken at or
+    after since, the timestamp of the transaction that changed.
+    """
+    delta = Decimal(str(delta or 0))
+    if not wallet_id or not delta:
+        return
+
+    Wallet.objects.filter(pk=wallet_id).update(balance=F("balance") + delta)
+    checkpoints = WalletBalanceCheckpoint.objects.filter(wallet_id=wallet_id)
+    if since is not None:
+        checkpoints = checkpoints.filter(taken_at__gte=since)
+    checkpoints.update(balance=F("balance") + delta)
+
+
+def apply_transaction_change(previous, current):
+    """
+    Moves a transaction's contribution from its previous ledger entry to its
+    current one. Either side may be None when the transaction was not
+    successful, was just created or was deleted.
+    """
+    if previous == current:
+        return
+    if previous is not None:
+        wallet_id, timestamp, amount = previous
+        apply_balance_delta(wallet_id, -Decimal(str(amount or 0)), timestamp)
+    if current is not None:
+        wallet_id, timestamp, amount = current
+        apply_balance_delta(wallet_id, amount, timestamp)
+
+
+def settle_pending(wallet_transaction, status, amount):
+    """
+    Moves an unsettled transaction to status with a conditional UPDATE and
+    credits its wallet when it succeeded. Returns False, leaving the wallet
+    untouched, when the transaction was settled already, e.g. because a
+    webhook or another verification confirmed it first.
+    """
+    with transaction.atomic():
+        settled = WalletTransaction.objects.filter(
+            pk=wallet_transaction.pk, status__in=UNSETTLED_STATUSES
+        ).update(status=status, amount=amount)
+        if settled:
+            wallet_transaction.status = status
+            wallet_transaction.amount = amount
+            apply_transaction_change(None, wallet_transaction.ledger_entry())
+    return bool(settled)
+
+
+def _successful(wallet_id):
+    return WalletTransaction.objects.filter(wallet_id=wallet_id, status="success")
+
+
+def balance_at(wallet_id, at):
+    """
+    Returns the balance of the wallet at the given time from the latest
+    checkpoint before it and the transactions timestamped since.
+    """
+    checkpoint = (
+        WalletBalanceCheckpoint.objects.filter(wallet_id=wallet_id, taken_at__lte=at)
+        .order_by("-taken_at")
+        .values("taken_at", "balance")
+        .first()
+    )
+    transactions = _successful(wallet_id)
+    if checkpoint is not None:
+        balance = checkpoint["balance"]
+        transactions = transactions.filter(
+            timestamp__gt=checkpoint["taken_at"], timestamp__lte=at
+        )
+    else:
+        balance = Decimal("0.00")
+        transactions = transactions.filter(
+            Q(timestamp__lte=at) | Q(timestamp__isnull=True)
+        )
+    return balance + (
+        transactions.aggregate(total=Sum("amount"))["total"] or Decimal("0.00")
+    )
+
+
+def checkpoint(wallet_ids=None, at=None):
+    """
+    Records the balance of every wallet, or only the given ones, at the
+    given time (now by default). Returns the number of checkpoints written.
+    """
+    at = at or timezone.now()
+    later = (
+        WalletTransaction.objects.filter(
+            wallet=OuterRef("pk"), status="success", timestamp__gt=at
+        )
+        .values("wallet")
+        .annotate(total=Sum("amount"))
+        .values("total")
+    )
+    wallets = Wallet.objects.order_by("pk")
+    if wallet_ids is not None:
+        wallets = wallets.filter(pk__in=wallet_ids)
+
+    written, last_pk = 0, 0
+    while True:
+        with transaction.atomic():
+            # Lock the batch so no balance change lands between the read and
+            # the insert of its checkpoints
+            batch = list(
+                wallets.select_for_update()
+                .filter(pk__gt=last_pk)[:BATCH_SIZE]
+                .values_list("pk", flat=True)
+            )
+            if not batch:
+                return written
+            balances = (
+                Wallet.objects.filter(pk__in=batch)
+                .annotate(
+                    later=Coalesce(
+                        Subquery(later),
+                        Value(0),
+                        output_field=DecimalField(max_digits=20, decimal_places=2),
+                    )
+                )
+                .values_list("pk", "balance", "later")
+            )
+            WalletBalanceCheckpoint.objects.bulk_create(
+                [
+                    WalletBalanceCheckpoint(
+                        wallet_id=wallet_id, taken_at=at, balance=balance - later
+                    )
+                    for wallet_id, balance, later in balances
+                ]
+            )
+        written += len(batch)
+        last_pk = batch[-1]
+
+
+def drifted_balances(wallet_ids=None):
+    """
+    Yields (wallet_id, stored_balance, ledger_balance) for every wallet whose
+    balance differs from the sum of its successful transactions.
+    """
+    wallets = Wallet.objects.all()
+    if wallet_ids is not None:
+        wallets = wallets.filter(pk__in=wallet_ids)
+    rows = (
+        wallets.annotate(
+            actual=Sum(
+                "wallettransaction__amount",
+                filter=Q(wallettransaction__status="success"),
+            )
+        )
+        .values_list("pk", "balance", "actual")
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    for wallet_id, stored, actual in rows:
+        actual = actual or Decimal("0.00")
+        if stored != actual:
+            yield wallet_id, stored, actual
+
+
+def fix_balance(wallet_id):
+    """
+    Resets the stored balance of a wallet to the sum of its successful
+    transactions and drops its checkpoints, which may carry the same drift.
+    """
+    with transaction.atomic():
+        wallet = Wallet.objects.select_for_update().get(pk=wallet_id)
+        actual = _successful(wallet.pk).aggregate(total=Sum("amount"))["total"]
+        Wallet.objects.filter(pk=wallet.pk).update(balance=actual or Decimal("0.00"))
+        WalletBalanceCheckpoint.objects.filter(wallet_id=wallet.pk).delete()
@@ -0,0 +1,236 @@
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+User = get_user_model()
+
+BENCH_EMAIL = "paystack-bench@example.com"
+
+
+class PaystackStandIn(ThreadingHTTPServer):
+    """
+    Local stand-in for the Paystack API answering every request after a
+    fixed delay, like a slow upstream.
+    """
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, latency):
+        self.latency = latency
+        super().__init__(("127.0.0.1", 0), PaystackStandInHandler)
+
+
+class PaystackStandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        time.sleep(self.server.latency)
+        body = json.dumps(
+            {
+                "status": True,
+                "message": "Account number resolved",
+                "data": {
+                    "account_number": "0000000000",
+                    "account_name": "BENCH ACCOUNT",
+                    "bank_id": 1,
+                },
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _respond
+    do_POST = _respond
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f"Server on port {port} did not start.")
+
+
+async def _load(url, token, requests, concurrency, first_account=0):
+    """
+    Sends the given number of GET requests to url, formatting a distinct
+    account number into each so none is answered from the account
+    resolution cache.
+    """
+    latencies = []
+    failures = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+
+        async def one(account):
+            nonlocal failures
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(
+                        url.format(account=f"{account:010d}"), headers=headers
+                    )
+                    failures += response.status_code != 200
+                except httpx.HTTPError:
+                    failures += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(first_account + i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "throughput": requests / elapsed,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)],
+        "failures": failures,
+    }
+
+
+class Command(BaseCommand):
+    """
+    Compares the throughput of the sync (WSGI) and async (ASGI) account
+    verification endpoints against a local Paystack stand-in.
+    """
+
+    help = "Benchmark sync WSGI and async ASGI Paystack-bound views."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=200)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.5,
+            help="Seconds the Paystack stand-in waits before answering.",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=8,
+            help="Threads of the single gunicorn worker serving WSGI.",
+        )
+
+    def handle(self, *args, **options):
+        stand_in = PaystackStandIn(options["latency"])
+        threading.Thread(target=stand_in.serve_forever, daemon=True).start()
+
+        user, created = User.objects.get_or_create(
+            email=BENCH_EMAIL, defaults={"name": "Paystack Bench"}
+        )
+        token = str(AccessToken.for_user(user))
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE,
+            "PAYSTACK_BASE_URL": f"http://127.0.0.1:{stand_in.server_port}/",
+            "PAYSTACK_SECRET_KEY": settings.PAYSTACK_SECRET_KEY or "sk_test_bench",
+        }
+        servers = {
+            "sync (WSGI)": (
+                [
+                    "-m",
+                    "gunicorn",
+                    "global_cluster_backend.wsgi:application",
+                    "--workers",
+                    "1",
+                    "--threads",
+                    str(options["threads"]),
+                ],
+                "verify_bank_account/",
+            ),
+            "async (ASGI)": (
+                [
+                    "-m",
+                    "uvicorn",
+                    "global_cluster_backend.asgi:application",
+                    "--workers",
+                    "1",
+                    "--no-access-log",
+                ],
+                "async/verify_bank_account/",
+            ),
+        }
+
+        # A random range of account numbers per run and server, so neither
+        # an earlier run nor the other server left them in a shared cache
+        first_account = random.randrange(10**9)
+        try:
+            for name, (command, path) in servers.items():
+                port = _free_port()
+                bind = (
+                    ["--bind", f"127.0.0.1:{port}"]
+                    if "gunicorn" in command
+                    else ["--port", str(port)]
+                )
+                process = subprocess.Popen(
+                    [sys.executable, *command, *bind],
+                    env=env,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+                try:
+                    _wait_for_port(port)
+                    url = (
+                        f"http://127.0.0.1:{port}/api/v1/payments/{path}"
+                        "?account_number={account}&bank_code=000"
+                    )
+                    result = asyncio.run(
+                        _load(
+                            url,
+                            token,
+                            options["requests"],
+                            options["concurrency"],
+                            first_account,
+                        )
+                    )
+                    first_account += options["requests"]
+                finally:
+                    process.terminate()
+                    process.wait()
+
+                self.stdout.write(
+                    f"{name}: {result['throughput']:.1f} req/s, "
+                    f"p50={result['p50_ms']:.0f}ms p95={result['p95_ms']:.0f}ms, "
+                    f"{result['failures']} failures"
+                )
+        finally:
+            stand_in.shutdown()
+            if created:
+                user.delete()
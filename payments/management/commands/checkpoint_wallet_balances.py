@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from payments import ledger
+
+
+class Command(BaseCommand):
+    """
+    Records the current balance of every wallet as a checkpoint.
+    Meant to run periodically, e.g. daily.
+    """
+
+    help = "Write a balance checkpoint for every wallet."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--wallet",
+            type=int,
+            action="append",
+            dest="wallets",
+            help="Only checkpoint the given wallet id (may be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        written = ledger.checkpoint(wallet_ids=options["wallets"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} balance checkpoints."))
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments import events
+
+
+class Command(BaseCommand):
+    """
+    Applies recorded Paystack webhook events to deposits and payouts in batches.
+    """
+
+    help = "Process pending Paystack webhook events."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=events.BATCH_SIZE)
+        parser.add_argument(
+            "--follow",
+            action="store_true",
+            help="Keep running and poll for new events.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds to wait between polls when --follow is set.",
+        )
+
+    def handle(self, *args, **options):
+        totals = {}
+        while True:
+            processed = events.process_events(batch_size=options["batch_size"])
+            for outcome, count in processed.items():
+                totals[outcome] = totals.get(outcome, 0) + count
+            if processed:
+                continue
+            if not options["follow"]:
+                break
+            time.sleep(options["interval"])
+
+        summary = ", ".join(f"{count} {outcome}" for outcome, count in totals.items())
+        self.stdout.write(self.style.SUCCESS(f"Processed events: {summary or 'none'}."))
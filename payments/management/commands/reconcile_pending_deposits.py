@@ -0,0 +1,66 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from payments import reconciliation
+
+
+class Command(BaseCommand):
+    """
+    Verifies deposits left pending against Paystack and records their final status.
+    Resumes from the last checkpoint when a previous run was interrupted.
+    """
+
+    help = "Reconcile pending deposits older than N minutes with Paystack."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            default=30,
+            help="Minutes a deposit must have been pending (default 30).",
+        )
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=20,
+            help="Maximum Paystack calls per second, 0 for no limit (default 20).",
+        )
+        parser.add_argument("--batch-size", type=int, default=reconciliation.BATCH_SIZE)
+        parser.add_argument(
+            "--limit",
+            type=int,
+            help="Stop after this many deposits and keep the checkpoint.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the stored checkpoint and start from the first deposit.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        counters = reconciliation.reconcile_pending_deposits(
+            older_than=timedelta(minutes=options["older_than"]),
+            concurrency=options["concurrency"],
+            rate=options["rate"],
+            batch_size=options["batch_size"],
+            restart=options["restart"],
+            limit=options["limit"],
+            progress=lambda counters: self.stdout.write(
+                f"Checked {counters['checked']} deposits..."
+            ),
+        )
+        elapsed = time.monotonic() - started
+
+        checked = counters.pop("checked", 0)
+        for outcome, count in sorted(counters.items()):
+            self.stdout.write(f"{outcome}: {count}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Reconciled {checked} deposits in {elapsed:.1f}s "
+                f"({checked / elapsed if elapsed else 0:.1f}/s)."
+            )
+        )
@@ -0,0 +1,68 @@
+import time
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from payments import payouts
+
+
+class Command(BaseCommand):
+    """
+    Submits queued payouts to Paystack with bulk transfers, after looking
+    up the payouts whose earlier submission was never confirmed.
+    """
+
+    help = "Submit pending payouts to Paystack in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=payouts.BATCH_SIZE,
+            help="Payouts per bulk transfer (at most 100).",
+        )
+        parser.add_argument("--limit", type=int, help="Stop after this many payouts.")
+        parser.add_argument(
+            "--follow",
+            action="store_true",
+            help="Keep running and poll for new payouts.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=60,
+            help="Seconds to wait between polls when --follow is set.",
+        )
+
+    def handle(self, *args, **options):
+        totals = {}
+        verified = {}
+        while True:
+            for status, count in payouts.verify_submitted().items():
+                verified[status] = verified.get(status, 0) + count
+            try:
+                submitted = payouts.submit_payouts(
+                    batch_size=options["batch_size"], limit=options["limit"]
+                )
+            except (
+                requests.RequestException,
+                payouts.PayoutSubmissionError,
+                payouts.TransferOutcomeUnknown,
+            ) as e:
+                if not options["follow"]:
+                    raise CommandError(str(e))
+                self.stderr.write(f"Submission failed: {e}")
+                submitted = {}
+            for status, count in submitted.items():
+                totals[status] = totals.get(status, 0) + count
+            if not options["follow"]:
+                break
+            time.sleep(options["interval"])
+
+        summary = ", ".join(f"{count} {status}" for status, count in verified.items())
+        if summary:
+            self.stdout.write(f"Verified unconfirmed payouts: {summary}.")
+        summary = ", ".join(f"{count} {status}" for status, count in totals.items())
+        self.stdout.write(
+            self.style.SUCCESS(f"Submitted payouts: {summary or 'none'}.")
+        )
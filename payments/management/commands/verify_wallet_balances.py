@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from payments import ledger
+
+
+class Command(BaseCommand):
+    """
+    Compares Wallet.balance with the sum of the successful WalletTransactions.
+    """
+
+    help = "Check the stored balance of every wallet against the raw transactions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--wallet",
+            type=int,
+            action="append",
+            dest="wallets",
+            help="Only check the given wallet id (may be repeated).",
+        )
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Reset drifted balances to the sum of their transactions.",
+        )
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for wallet_id, stored, actual in ledger.drifted_balances(
+            wallet_ids=options["wallets"]
+        ):
+            drifted += 1
+            self.stdout.write(f"Wallet {wallet_id}: stored={stored} actual={actual}")
+            if options["fix"]:
+                ledger.fix_balance(wallet_id)
+
+        if drifted and not options["fix"]:
+            raise CommandError(f"{drifted} wallets have drifted balances.")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{drifted} drifted balances {'fixed' if drifted else 'found'}."
+            )
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from payments.banks import bank_directory
+
+
+class Command(BaseCommand):
+    """
+    Loads the Paystack bank list into the shared cache. Meant to run after
+    each deploy, so the first requests do not have to fetch it.
+    """
+
+    help = "Load the bank list into the cache from the snapshot or Paystack."
+
+    def handle(self, *args, **options):
+        # A missing list is fetched by the first request that needs it, so a
+        # Paystack outage does not fail the deploy
+        if bank_directory.warm():
+            self.stdout.write(self.style.SUCCESS("Bank directory loaded."))
+        else:
+            self.stderr.write("Bank directory could not be loaded.")
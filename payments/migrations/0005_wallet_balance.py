@@ -0,0 +1,78 @@
+# Generated by Django 5.0.8 on 2026-10-17 07:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def populate_wallet_balances(apps, schema_editor):
+    Wallet = apps.get_model("payments", "Wallet")
+    WalletTransaction = apps.get_model("payments", "WalletTransaction")
+
+    balances = (
+        WalletTransaction.objects.filter(wallet=models.OuterRef("pk"), status="success")
+        .values("wallet")
+        .annotate(total=models.Sum("amount"))
+        .values("total")
+    )
+    Wallet.objects.update(
+        balance=Coalesce(
+            models.Subquery(balances),
+            models.Value(0),
+            output_field=models.DecimalField(max_digits=20, decimal_places=2),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0004_alter_transaction_options"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="wallet",
+            name="balance",
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=20),
+        ),
+        migrations.CreateModel(
+            name="WalletBalanceCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("taken_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "balance",
+                    models.DecimalField(decimal_places=2, default=0.0, max_digits=20),
+                ),
+                (
+                    "wallet",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="balance_checkpoints",
+                        to="payments.wallet",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Wallet Balance Checkpoint",
+                "verbose_name_plural": "Wallet Balance Checkpoints",
+                "indexes": [
+                    models.Index(
+                        fields=["wallet", "taken_at"],
+                        name="payments_wa_wallet__1756c1_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_wallet_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.0.8 on 2026-10-17 07:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0005_wallet_balance"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PaystackEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("event_key", models.CharField(max_length=255, unique=True)),
+                ("event", models.CharField(max_length=100)),
+                (
+                    "reference",
+                    models.CharField(
+                        blank=True, db_index=True, default="", max_length=100
+                    ),
+                ),
+                ("payload", models.JSONField()),
+                ("received_at", models.DateTimeField(auto_now_add=True)),
+                ("processed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "outcome",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("applied", "Applied"),
+                            ("unmatched", "Unmatched"),
+                            ("ignored", "Ignored"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Paystack Event",
+                "verbose_name_plural": "Paystack Events",
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("processed_at__isnull", True)),
+                        fields=["id"],
+                        name="paystack_event_unprocessed",
+                    )
+                ],
+            },
+        ),
+    ]
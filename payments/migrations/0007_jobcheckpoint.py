@@ -0,0 +1,35 @@
+# Generated by Django 5.0.8 on 2026-10-17 07:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0006_paystackevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, unique=True)),
+                ("position", models.BigIntegerField(default=0)),
+                ("state", models.JSONField(blank=True, default=dict)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Job Checkpoint",
+                "verbose_name_plural": "Job Checkpoints",
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.8 on 2026-10-17 07:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0007_jobcheckpoint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BankDirectorySnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "source",
+                    models.CharField(default="paystack", max_length=50, unique=True),
+                ),
+                ("payload", models.JSONField()),
+                ("fetched_at", models.DateTimeField()),
+            ],
+            options={
+                "verbose_name": "Bank Directory Snapshot",
+                "verbose_name_plural": "Bank Directory Snapshots",
+            },
+        ),
+    ]
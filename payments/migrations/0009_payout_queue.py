@@ -0,0 +1,75 @@
+# Generated by Django 5.0.8 on 2026-10-17 07:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0008_bankdirectorysnapshot"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TransferRecipient",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bank_code", models.CharField(max_length=10)),
+                ("account_number", models.CharField(max_length=20)),
+                ("recipient_code", models.CharField(max_length=50, unique=True)),
+                ("name", models.CharField(blank=True, max_length=255)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Transfer Recipient",
+                "verbose_name_plural": "Transfer Recipients",
+            },
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="account_number",
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="bank_code",
+            field=models.CharField(blank=True, max_length=10),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="submitted_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="transfer_code",
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                condition=models.Q(
+                    ("status", "pending"), ("submitted_at__isnull", True)
+                ),
+                fields=["date"],
+                name="transaction_payout_queue",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="transferrecipient",
+            constraint=models.UniqueConstraint(
+                fields=("bank_code", "account_number"),
+                name="unique_transfer_recipient_account",
+            ),
+        ),
+    ]
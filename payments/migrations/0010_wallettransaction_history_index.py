@@ -0,0 +1,19 @@
+# Generated by Django 5.0.8 on 2026-10-17 07:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0009_payout_queue"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="wallettransaction",
+            index=models.Index(
+                fields=["wallet", "timestamp"], name="wallet_tx_wallet_timestamp"
+            ),
+        ),
+    ]
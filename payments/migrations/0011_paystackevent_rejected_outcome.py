@@ -0,0 +1,27 @@
+# Generated by Django 5.0.8 on 2026-10-17 08:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0010_wallettransaction_history_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="paystackevent",
+            name="outcome",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("applied", "Applied"),
+                    ("unmatched", "Unmatched"),
+                    ("ignored", "Ignored"),
+                    ("rejected", "Rejected"),
+                ],
+                max_length=20,
+            ),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth import get_user_model
@@ -11,6 +11,8 @@ class Wallet(models.Model):
     )
     currency = models.CharField(max_length=50, default="NGN")
     created_at = models.DateTimeField(default=timezone.now, null=True)
+    # Sum of the successful transactions, maintained by payments.ledger
+    balance = models.DecimalField(max_digits=20, decimal_places=2, default=0.00)
 
     class Meta:
         verbose_name = "Wallet"
@@ -41,11 +43,85 @@ class WalletTransaction(models.Model):
     class Meta:
         verbose_name = "Wallet Transaction"
         verbose_name_plural = "Wallet Transactions"
+        indexes = [
+            models.Index(
+                fields=["wallet", "timestamp"], name="wallet_tx_wallet_timestamp"
+            ),
+        ]
+
+    def ledger_entry(self):
+        """
+        Returns the (wallet_id, timestamp, amount) tuple this transaction
+        contributes to its wallet balance, or None when it is not successful.
+        """
+        if self.__dict__.get("status") != "success":
+            return None
+        return (
+            self.__dict__.get("wallet_id"),
+            self.__dict__.get("timestamp"),
+            self.__dict__.get("amount"),
+        )
+
+    def _stored_ledger_entry(self):
+        # Read under a lock: an instance loaded before a concurrent change
+        # (a webhook, a reconciliation run, another verification) must not
+        # apply that change a second time
+        stored = (
+            WalletTransaction.objects.select_for_update().filter(pk=self.pk).first()
+        )
+        return stored.ledger_entry() if stored else None
+
+    def save(self, *args, **kwargs):
+        """
+        Save the transaction and apply its balance change to the wallet.
+        """
+        from . import ledger
+
+        with transaction.atomic():
+            previous = None if self._state.adding else self._stored_ledger_entry()
+            super().save(*args, **kwargs)
+            ledger.apply_transaction_change(previous, self.ledger_entry())
+
+    def delete(self, *args, **kwargs):
+        """
+        Delete the transaction and remove its balance change from the wallet.
+        """
+        from . import ledger
+
+        with transaction.atomic():
+            previous = self._stored_ledger_entry()
+            deleted = super().delete(*args, **kwargs)
+            ledger.apply_transaction_change(previous, None)
+        return deleted
 
     def __str__(self):
         return self.wallet.user.__str__()
 
 
+class WalletBalanceCheckpoint(models.Model):
+    """
+    Balance of a wallet at taken_at, i.e. the sum of its successful
+    transactions timestamped up to that time. Used to answer balance-at-time
+    queries without scanning the whole transaction history.
+    """
+
+    wallet = models.ForeignKey(
+        Wallet, on_delete=models.CASCADE, related_name="balance_checkpoints"
+    )
+    taken_at = models.DateTimeField(default=timezone.now)
+    balance = models.DecimalField(max_digits=20, decimal_places=2, default=0.00)
+
+    class Meta:
+        verbose_name = "Wallet Balance Checkpoint"
+        verbose_name_plural = "Wallet Balance Checkpoints"
+        indexes = [
+            models.Index(fields=["wallet", "taken_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.wallet_id} @ {self.taken_at}: {self.balance}"
+
+
 class Transaction(models.Model):
     uuid = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     STATUS_CHOICES = [
@@ -66,10 +142,121 @@ class Transaction(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     payment_method = models.CharField(max_length=50, choices=PAYMENT_METHOD_CHOICES)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    account_number = models.CharField(max_length=20, blank=True)
+    bank_code = models.CharField(max_length=10, blank=True)
+    # Set when the payout is handed to Paystack by submit_payouts
+    transfer_code = models.CharField(max_length=50, blank=True)
+    submitted_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         verbose_name = "Transaction"
         verbose_name_plural = "Transactions"
+        indexes = [
+            models.Index(
+                fields=["date"],
+                name="transaction_payout_queue",
+                condition=models.Q(status="pending", submitted_at__isnull=True),
+            ),
+        ]
 
     def __str__(self):
         return f"Transaction {self.reference_id} - {self.status}"
+
+
+class TransferRecipient(models.Model):
+    """
+    Paystack transfer recipient of a bank account, created once and reused
+    by every later payout to the same account.
+    """
+
+    bank_code = models.CharField(max_length=10)
+    account_number = models.CharField(max_length=20)
+    recipient_code = models.CharField(max_length=50, unique=True)
+    name = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Transfer Recipient"
+        verbose_name_plural = "Transfer Recipients"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["bank_code", "account_number"],
+                name="unique_transfer_recipient_account",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient_code} ({self.bank_code} {self.account_number})"
+
+
+class PaystackEvent(models.Model):
+    """
+    Raw Paystack webhook event. Rows are only ever inserted; the payload is
+    never modified and processing only fills processed_at and outcome.
+    """
+
+    OUTCOME_CHOICES = [
+        ("applied", "Applied"),
+        ("unmatched", "Unmatched"),
+        ("ignored", "Ignored"),
+        ("rejected", "Rejected"),
+    ]
+
+    event_key = models.CharField(max_length=255, unique=True)
+    event = models.CharField(max_length=100)
+    reference = models.CharField(max_length=100, blank=True, default="", db_index=True)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES, blank=True)
+
+    class Meta:
+        verbose_name = "Paystack Event"
+        verbose_name_plural = "Paystack Events"
+        indexes = [
+            models.Index(
+                fields=["id"],
+                name="paystack_event_unprocessed",
+                condition=models.Q(processed_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event} {self.reference}"
+
+
+class JobCheckpoint(models.Model):
+    """
+    Progress of a restartable batch job: the last processed primary key and
+    the job's running counters.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+    state = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Job Checkpoint"
+        verbose_name_plural = "Job Checkpoints"
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+
+class BankDirectorySnapshot(models.Model):
+    """
+    Last good copy of a bank list fetched from Paystack, used when the cache
+    is cold so that serving the list never depends on Paystack being up.
+    """
+
+    source = models.CharField(max_length=50, unique=True, default="paystack")
+    payload = models.JSONField()
+    fetched_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Bank Directory Snapshot"
+        verbose_name_plural = "Bank Directory Snapshots"
+
+    def __str__(self):
+        return f"{self.source} @ {self.fetched_at}"
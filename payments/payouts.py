@@ -0,0 +1,377 @@
+"""
+Queueing of payouts and their batched submission to Paystack.
+
+Amounts are in kobo, like deposits and wallet balances. create_payout()
+records a payout as a pending Transaction and, in the same database
+transaction, debits its amount from the wallet with a successful "withdraw"
+WalletTransaction sharing the payout's reference (the hold). Payouts that
+end up declined are refunded by reversing their hold, see refund().
+
+submit_payouts()
+claims up to batch_size of them at a time (at most 100, the Paystack bulk
+transfer limit), creates the transfer recipients that are not cached in
+TransferRecipient with one transferrecipient/bulk call, submits the batch
+with one transfer/bulk call and writes the per-item results back with
+bulk_update. Final statuses arrive later as transfer webhooks (see
+events.py), matched by reference_id. Only payouts with a hold are submitted.
+
+A bulk transfer call that times out or drops its connection after the
+request was sent may still have been accepted, and so may items the response
+does not acknowledge. Those payouts stay submitted without a transfer code
+and are never resubmitted blindly: verify_submitted() looks each of them up
+with transfer/verify and only queues the ones Paystack does not know again.
+"""
+
+from datetime import timedelta
+from uuid import uuid4
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from urllib3.exceptions import NewConnectionError
+
+from . import ledger
+from .models import Transaction, TransferRecipient, Wallet, WalletTransaction
+from .paystack import paystack
+
+BATCH_SIZE = 100
+
+# Per-item statuses of transfer/bulk and statuses of transfer/verify
+TRANSFER_STATUSES = {
+    "success": "approved",
+    "failed": "declined",
+    "reversed": "declined",
+}
+
+
+class PayoutSubmissionError(Exception):
+    """
+    Raised when Paystack rejected a bulk call as a whole.
+    """
+
+
+class TransferOutcomeUnknown(Exception):
+    """
+    Raised when a bulk transfer call failed after the request may have
+    reached Paystack. The payouts are left for verify_submitted().
+    """
+
+
+class InsufficientBalance(Exception):
+    """
+    Raised when a wallet balance does not cover a payout.
+    """
+
+
+def max_amount():
+    return getattr(settings, "PAYOUT_MAX_AMOUNT", 50_000_000)
+
+
+def _holds(references):
+    return WalletTransaction.objects.filter(
+        transaction_type="withdraw", paystack_payment_reference__in=references
+    )
+
+
+def create_payout(user, amount, account_number, bank_code, payment_method):
+    """
+    Queues a payout of amount kobo and holds the amount on the user's
+    wallet. Raises InsufficientBalance when the balance does not cover it.
+    """
+    with transaction.atomic():
+        # Locked so concurrent payouts cannot both spend the same balance
+        wallet = Wallet.objects.select_for_update().filter(user=user).first()
+        if wallet is None or wallet.balance < amount:
+            raise InsufficientBalance("The wallet balance does not cover the payout.")
+
+        payout = Transaction.objects.create(
+            user=user,
+            reference_id=str(uuid4()),
+            amount=amount,
+            payment_method=payment_method,
+            account_number=account_number,
+            bank_code=bank_code,
+            status="pending",
+        )
+        WalletTransaction.objects.create(
+            wallet=wallet,
+            transaction_type="withdraw",
+            amount=-amount,
+            paystack_payment_reference=payout.reference_id,
+            status="success",
+        )
+    return payout
+
+
+def refund(references):
+    """
+    Returns the amounts held for the payouts with the given references to
+    their wallets. Payouts already refunded are skipped.
+    Returns the number of payouts refunded.
+    """
+    with transaction.atomic():
+        holds = list(_holds(references).select_for_update().filter(status="success"))
+        changes = []
+        for hold in holds:
+            previous = hold.ledger_entry()
+            hold.status = "reversed"
+            changes.append((previous, hold.ledger_entry()))
+
+        WalletTransaction.objects.bulk_update(holds, ["status"])
+        for previous, current in changes:
+            ledger.apply_transaction_change(previous, current)
+    return len(holds)
+
+
+def _claim(batch_size):
+    """
+    Marks the oldest unsubmitted payouts as submitted and returns them, so
+    concurrent runs never submit the same payout twice. Payouts recorded
+    without account details or without a hold on the wallet (queued before
+    amounts were held) cannot be submitted and are left alone.
+    """
+    held = WalletTransaction.objects.filter(
+        transaction_type="withdraw", paystack_payment_reference=OuterRef("reference_id")
+    )
+    with transaction.atomic():
+        batch = list(
+            Transaction.objects.filter(status="pending", submitted_at__isnull=True)
+            .filter(Exists(held))
+            .exclude(account_number="")
+            .select_for_update(skip_locked=True)
+            .select_related("user")
+            .order_by("date")[:batch_size]
+        )
+        now = timezone.now()
+        for payout in batch:
+            payout.submitted_at = now
+        Transaction.objects.bulk_update(batch, ["submitted_at"])
+    return batch
+
+
+def _post(path, payload):
+    response = paystack.post(path, json=payload)
+    if response.status_code >= 500:
+        # The call failed while being handled and may have taken effect
+        response.raise_for_status()
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+    if response.status_code >= 400 or not body.get("status"):
+        raise PayoutSubmissionError(
+            body.get("message") or f"{path} failed with {response.status_code}."
+        )
+    return body.get("data")
+
+
+def _never_sent(error):
+    """
+    Tells whether a request failed before it could reach Paystack: the
+    connection was refused, the host did not resolve or connecting timed out.
+    """
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0] if error.args else None, "reason", None)
+    return isinstance(error, requests.ConnectionError) and isinstance(
+        reason, NewConnectionError
+    )
+
+
+def _recipients(payouts):
+    """
+    Returns {(bank_code, account_number): recipient_code} for the accounts
+    of the payouts, creating the missing recipients in one bulk call.
+    """
+    accounts = {(payout.bank_code, payout.account_number) for payout in payouts}
+    known = {
+        (recipient.bank_code, recipient.account_number): recipient.recipient_code
+        for recipient in TransferRecipient.objects.filter(
+            account_number__in={account for _, account in accounts}
+        )
+    }
+
+    missing = {}
+    for payout in payouts:
+        account = (payout.bank_code, payout.account_number)
+        if account not in known:
+            missing.setdefault(account, payout.user.name)
+    if not missing:
+        return known
+
+    data = _post(
+        "transferrecipient/bulk",
+        {
+            "batch": [
+                {
+                    "type": "nuban",
+                    "name": name,
+                    "account_number": account_number,
+                    "bank_code": bank_code,
+                    "currency": "NGN",
+                }
+                for (bank_code, account_number), name in missing.items()
+            ]
+        },
+    )
+    created = [
+        TransferRecipient(
+            bank_code=item["details"]["bank_code"],
+            account_number=item["details"]["account_number"],
+            recipient_code=item["recipient_code"],
+            name=item.get("name") or "",
+        )
+        for item in (data or {}).get("success", [])
+    ]
+    TransferRecipient.objects.bulk_create(created, ignore_conflicts=True)
+    known.update({(r.bank_code, r.account_number): r.recipient_code for r in created})
+    return known
+
+
+def _transfer(payouts, recipients):
+    return _post(
+        "transfer/bulk",
+        {
+            "currency": "NGN",
+            "source": "balance",
+            "transfers": [
+                {
+                    "amount": int(payout.amount),
+                    "reference": payout.reference_id,
+                    "recipient": recipients[(payout.bank_code, payout.account_number)],
+                    "reason": "Payout",
+                }
+                for payout in payouts
+            ],
+        },
+    )
+
+
+def _submit(payouts):
+    """
+    Submits claimed payouts and applies the per-item results.
+    Returns a {status: count} mapping.
+    """
+    recipients = _recipients(payouts)
+
+    counts = {}
+    submittable = []
+    for payout in payouts:
+        if (payout.bank_code, payout.account_number) in recipients:
+            submittable.append(payout)
+        else:
+            # Paystack refused to create a recipient for the account
+            payout.status = "declined"
+            counts["declined"] = counts.get("declined", 0) + 1
+
+    results = {}
+    if submittable:
+        try:
+            data = _transfer(submittable, recipients)
+        except requests.RequestException as e:
+            if _never_sent(e):
+                raise
+            raise TransferOutcomeUnknown(str(e)) from e
+        results = {item["reference"]: item for item in data or []}
+
+    for payout in submittable:
+        item = results.get(payout.reference_id)
+        if item is None:
+            # Not acknowledged: left submitted for verify_submitted()
+            status = "unconfirmed"
+        else:
+            payout.transfer_code = item.get("transfer_code") or ""
+            payout.status = TRANSFER_STATUSES.get(item.get("status"), "pending")
+            status = payout.status
+        counts[status] = counts.get(status, 0) + 1
+
+    Transaction.objects.bulk_update(payouts, ["status", "transfer_code"])
+    refund([payout.reference_id for payout in payouts if payout.status == "declined"])
+    return counts
+
+
+def submit_payouts(batch_size=BATCH_SIZE, limit=None):
+    """
+    Submits queued payouts until the queue is empty or limit payouts were
+    claimed. A batch whose bulk call was refused or never reached Paystack
+    is released back to the queue; one whose outcome is unknown is left for
+    verify_submitted(). Either way the run stops, so an outage does not burn
+    through the queue. Returns a {status: count} mapping.
+    """
+    batch_size = min(batch_size, BATCH_SIZE)
+    totals = {}
+    claimed = 0
+    while limit is None or claimed < limit:
+        size = batch_size if limit is None else min(batch_size, limit - claimed)
+        payouts = _claim(size)
+        if not payouts:
+            break
+        claimed += len(payouts)
+
+        try:
+            counts = _submit(payouts)
+        except TransferOutcomeUnknown:
+            raise
+        except (requests.RequestException, PayoutSubmissionError):
+            Transaction.objects.filter(pk__in=[p.pk for p in payouts]).update(
+                submitted_at=None
+            )
+            raise
+
+        for status, count in counts.items():
+            totals[status] = totals.get(status, 0) + count
+    return totals
+
+
+def verify_submitted(older_than=timedelta(minutes=10), limit=None):
+    """
+    Looks up payouts submitted more than older_than ago whose submission was
+    never confirmed, with one transfer/verify call each. Payouts Paystack
+    knows get their transfer code and status, and declined ones are
+    refunded; payouts it does not know are queued for submission again.
+    Payouts whose lookup fails are left for the next run.
+    Returns a {status: count} mapping.
+    """
+    cutoff = timezone.now() - older_than
+    unconfirmed = Transaction.objects.filter(
+        status="pending", transfer_code="", submitted_at__lt=cutoff
+    ).order_by("submitted_at")
+    if limit is not None:
+        unconfirmed = unconfirmed[:limit]
+
+    counts = {}
+    for payout in unconfirmed:
+        status = _verify_transfer(payout)
+        counts[status] = counts.get(status, 0) + 1
+    return counts
+
+
+def _verify_transfer(payout):
+    try:
+        response = paystack.get(
+            f"transfer/verify/{payout.reference_id}", endpoint="transfer/verify"
+        )
+        data = response.json().get("data") if response.status_code == 200 else None
+    except (requests.RequestException, ValueError):
+        return "unverified"
+
+    # Conditional updates: a transfer webhook may have settled it meanwhile
+    unsettled = Transaction.objects.filter(
+        pk=payout.pk, status="pending", transfer_code=""
+    )
+    if response.status_code == 404:
+        unsettled.update(submitted_at=None)
+        return "requeued"
+    if not data:
+        return "unverified"
+
+    status = TRANSFER_STATUSES.get(data.get("status"), "pending")
+    with transaction.atomic():
+        changed = unsettled.update(
+            status=status, transfer_code=data.get("transfer_code") or ""
+        )
+        if changed and status == "declined":
+            refund([payout.reference_id])
+    return status
@@ -1,5 +1,279 @@
-from django.conf import settings
+"""
+Shared HTTP clients for the Paystack API.
+
+Each worker process keeps one requests.Session with a keep-alive connection
+pool, so calls reuse TLS connections instead of opening a new one per request.
+Every call gets connect/read timeouts, idempotent GETs are retried a bounded
+number of times with jittered exponential backoff, and the latency of each
+endpoint is recorded in-process (see PaystackClient.metrics).
+AsyncPaystackClient does the same with httpx for the async views.
+
+Tunable through settings: PAYSTACK_BASE_URL, PAYSTACK_CONNECT_TIMEOUT,
+PAYSTACK_READ_TIMEOUT, PAYSTACK_MAX_RETRIES, PAYSTACK_RETRY_BACKOFF and
+PAYSTACK_POOL_SIZE (PAYSTACK_ASYNC_POOL_SIZE for the async client).
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from collections import deque
+
+import httpx
 import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+LATENCY_SAMPLES = 500
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class LatencyMetrics:
+    """
+    Per-endpoint call counts, errors and latencies of the current process,
+    shared by the sync and async clients.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def record(self, endpoint, elapsed, failed):
+        with self._lock:
+            metric = self._metrics.get(endpoint)
+            if metric is None:
+                metric = self._metrics[endpoint] = {
+                    "count": 0,
+                    "errors": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "samples": deque(maxlen=LATENCY_SAMPLES),
+                }
+            metric["count"] += 1
+            metric["errors"] += failed
+            metric["total_ms"] += elapsed
+            metric["max_ms"] = max(metric["max_ms"], elapsed)
+            metric["samples"].append(elapsed)
+        logger.debug("Paystack %s took %.1fms", endpoint, elapsed)
+
+    def snapshot(self):
+        """
+        Returns call counts, server or network errors and latency statistics
+        (in milliseconds) per endpoint. Percentiles are computed over the
+        most recent LATENCY_SAMPLES calls.
+        """
+        with self._lock:
+            snapshot = {
+                endpoint: dict(metric, samples=sorted(metric["samples"]))
+                for endpoint, metric in self._metrics.items()
+            }
+
+        def percentile(samples, fraction):
+            return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+
+        return {
+            endpoint: {
+                "count": metric["count"],
+                "errors": metric["errors"],
+                "avg_ms": round(metric["total_ms"] / metric["count"], 1),
+                "p50_ms": round(percentile(metric["samples"], 0.5), 1),
+                "p95_ms": round(percentile(metric["samples"], 0.95), 1),
+                "max_ms": round(metric["max_ms"], 1),
+            }
+            for endpoint, metric in snapshot.items()
+        }
+
+    def reset(self):
+        with self._lock:
+            self._metrics = {}
+
+
+latency_metrics = LatencyMetrics()
+
+
+def base_url():
+    return _setting("PAYSTACK_BASE_URL", "https://api.paystack.co/")
+
+
+def timeouts():
+    """
+    Returns the (connect, read) timeouts in seconds.
+    """
+    return (
+        _setting("PAYSTACK_CONNECT_TIMEOUT", 3.05),
+        _setting("PAYSTACK_READ_TIMEOUT", 10),
+    )
+
+
+def _auth_headers(headers=None):
+    return {
+        "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
+        **(headers or {}),
+    }
+
+
+class PaystackClient:
+    """
+    Thin wrapper around a per-process pooled requests.Session.
+    Methods return the requests.Response and raise requests.RequestException
+    on connection errors and timeouts. Jobs calling Paystack from many threads
+    can size the pool with pool_size instead of PAYSTACK_POOL_SIZE.
+    """
+
+    def __init__(self, pool_size=None):
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._pool_size = pool_size
+
+    def _build_session(self):
+        retry = Retry(
+            total=_setting("PAYSTACK_MAX_RETRIES", 2),
+            backoff_factor=_setting("PAYSTACK_RETRY_BACKOFF", 0.3),
+            backoff_jitter=0.3,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        pool_size = self._pool_size or _setting("PAYSTACK_POOL_SIZE", 10)
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=retry
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def session(self):
+        """
+        Returns the session of the current process. Sessions are keyed by pid
+        so workers forked from a preloaded master do not share sockets.
+        """
+        pid = os.getpid()
+        session = self._sessions.get(pid)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(pid)
+                if session is None:
+                    self._sessions = {pid: self._build_session()}
+                    session = self._sessions[pid]
+        return session
+
+    def request(self, method, path, endpoint=None, **kwargs):
+        """
+        Sends a request to the Paystack API.
+        Args:
+            method: The HTTP method.
+            path: The path relative to the API base url, e.g. "bank/resolve".
+            endpoint: The name metrics are recorded under; defaults to path.
+                Pass a name for paths containing ids or references.
+        """
+        headers = _auth_headers(kwargs.pop("headers", None))
+        kwargs.setdefault("timeout", timeouts())
+
+        started = time.perf_counter()
+        failed = True
+        try:
+            response = self.session().request(
+                method, base_url() + path, headers=headers, **kwargs
+            )
+            failed = response.status_code >= 500
+            return response
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            latency_metrics.record(f"{method} {endpoint or path}", elapsed, failed)
+
+    def get(self, path, endpoint=None, **kwargs):
+        return self.request("GET", path, endpoint=endpoint, **kwargs)
+
+    def post(self, path, endpoint=None, **kwargs):
+        return self.request("POST", path, endpoint=endpoint, **kwargs)
+
+    def metrics(self):
+        """
+        Returns the per-endpoint metrics of the current process.
+        """
+        return latency_metrics.snapshot()
+
+
+class AsyncPaystackClient:
+    """
+    httpx based counterpart of PaystackClient for async views. One pooled
+    httpx.AsyncClient is kept per event loop. Methods return the
+    httpx.Response and raise httpx.HTTPError on connection errors and timeouts.
+    """
+
+    def __init__(self):
+        self._clients = weakref.WeakKeyDictionary()
+
+    def client(self):
+        """
+        Returns the client bound to the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            connect, read = timeouts()
+            pool_size = _setting("PAYSTACK_ASYNC_POOL_SIZE", 100)
+            client = self._clients[loop] = httpx.AsyncClient(
+                base_url=base_url(),
+                timeout=httpx.Timeout(read, connect=connect),
+                limits=httpx.Limits(
+                    max_connections=pool_size, max_keepalive_connections=pool_size
+                ),
+            )
+        return client
+
+    async def _send(self, method, path, **kwargs):
+        # Bounded retries with jittered exponential backoff, GETs only
+        retries = _setting("PAYSTACK_MAX_RETRIES", 2) if method == "GET" else 0
+        backoff = _setting("PAYSTACK_RETRY_BACKOFF", 0.3)
+        for attempt in range(retries + 1):
+            try:
+                response = await self.client().request(method, path, **kwargs)
+            except httpx.TransportError:
+                if attempt == retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == retries:
+                    return response
+            await asyncio.sleep(backoff * 2**attempt + random.uniform(0, 0.3))
+
+    async def request(self, method, path, endpoint=None, **kwargs):
+        """
+        Sends a request to the Paystack API; see PaystackClient.request.
+        """
+        headers = _auth_headers(kwargs.pop("headers", None))
+
+        started = time.perf_counter()
+        failed = True
+        try:
+            response = await self._send(method, path, headers=headers, **kwargs)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            latency_metrics.record(f"{method} {endpoint or path}", elapsed, failed)
+
+    async def get(self, path, endpoint=None, **kwargs):
+        return await self.request("GET", path, endpoint=endpoint, **kwargs)
+
+    async def post(self, path, endpoint=None, **kwargs):
+        return await self.request("POST", path, endpoint=endpoint, **kwargs)
+
+
+paystack = PaystackClient()
+async_paystack = AsyncPaystackClient()
 
 
 class Paystack:
@@ -7,20 +281,13 @@ class Paystack:
     Paystack class for handling Paystack payment verification.
     """
 
-    PAYSTACK_SK = settings.PAYSTACK_SECRET_KEY
-    base_url = "https://api.paystack.co/"
-
     def verify_payment(self, ref, *args, **kwargs):
         """
         Verify payment using Paystack API.
         """
-        path = f"transaction/verify/{ref}"
-        headers = {
-            "Authorization": f"Bearer {self.PAYSTACK_SK}",
-            "Content-Type": "application/json",
-        }
-        url = self.base_url + path
-        response = requests.get(url, headers=headers)
+        response = paystack.get(
+            f"transaction/verify/{ref}", endpoint="transaction/verify"
+        )
 
         if response.status_code == 200:
             response_data = response.json()
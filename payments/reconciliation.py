@@ -0,0 +1,176 @@
+"""
+Reconciliation of pending deposits against Paystack.
+
+Deposits left pending longer than a cutoff are verified with
+transaction/verify from a bounded thread pool, under a shared rate limit,
+one keyset batch (by primary key) at a time. After each batch the results are
+written with bulk_update and the last primary key is stored in a
+JobCheckpoint, so an interrupted run resumes where it stopped and memory use
+does not grow with the number of pending rows.
+"""
+
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.db import transaction
+from django.utils import timezone
+
+from . import ledger
+from .models import JobCheckpoint, WalletTransaction
+from .paystack import PaystackClient
+
+JOB_NAME = "reconcile_pending_deposits"
+BATCH_SIZE = 500
+
+# Paystack transaction statuses that are final
+FINAL_STATUSES = {"success", "failed", "abandoned", "reversed"}
+
+
+class RateLimiter:
+    """
+    Spaces calls from any number of threads at least 1/rate seconds apart.
+    """
+
+    def __init__(self, rate):
+        self._interval = 1 / rate if rate else 0
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self):
+        if not self._interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self._interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _verify(client, limiter, reference):
+    """
+    Returns (reference, paystack status or outcome, amount) for one deposit.
+    """
+    limiter.wait()
+    try:
+        response = client.get(
+            f"transaction/verify/{reference}", endpoint="transaction/verify"
+        )
+    except requests.RequestException:
+        return reference, "error", None
+    if response.status_code == 404:
+        return reference, "not_found", None
+    if response.status_code != 200:
+        return reference, "error", None
+    try:
+        data = response.json().get("data") or {}
+    except ValueError:
+        return reference, "error", None
+    return reference, data.get("status") or "error", data.get("amount")
+
+
+def _apply(results):
+    """
+    Writes the final statuses of a batch. Deposits confirmed in the meantime
+    (by a webhook or the verify endpoint) are left untouched.
+    """
+    final = {
+        reference: (status, amount)
+        for reference, status, amount in results
+        if status in FINAL_STATUSES
+    }
+    if not final:
+        return
+    with transaction.atomic():
+        deposits = list(
+            WalletTransaction.objects.select_for_update().filter(
+                paystack_payment_reference__in=final, status="pending"
+            )
+        )
+        changes = []
+        for deposit in deposits:
+            status, amount = final[deposit.paystack_payment_reference]
+            previous = deposit.ledger_entry()
+            deposit.status = status
+            if status == "success" and amount is not None:
+                deposit.amount = amount
+            changes.append((previous, deposit.ledger_entry()))
+
+        WalletTransaction.objects.bulk_update(deposits, ["status", "amount"])
+        for previous, current in changes:
+            ledger.apply_transaction_change(previous, current)
+
+
+def reconcile_pending_deposits(
+    older_than=timedelta(minutes=30),
+    concurrency=32,
+    rate=20,
+    batch_size=BATCH_SIZE,
+    restart=False,
+    limit=None,
+    progress=None,
+):
+    """
+    Verifies pending deposits created before now - older_than.
+    Args:
+        older_than: Only deposits pending for longer than this are verified.
+        concurrency: The number of verification threads.
+        rate: The maximum number of Paystack calls per second (0 for no limit).
+        batch_size: The number of deposits loaded, verified and written at once.
+        restart: Ignore the stored checkpoint and start from the first deposit.
+        limit: Stop after this many deposits; the checkpoint keeps the position.
+        progress: Optional callable receiving the running counters after each batch.
+    Returns:
+        The counters of the run: deposits checked and the number per outcome.
+    """
+    checkpoint, _ = JobCheckpoint.objects.get_or_create(name=JOB_NAME)
+    if restart or not checkpoint.position:
+        checkpoint.position = 0
+        checkpoint.state = {}
+    counters = Counter(checkpoint.state)
+
+    cutoff = timezone.now() - older_than
+    pending = WalletTransaction.objects.filter(
+        transaction_type="deposit", status="pending", timestamp__lt=cutoff
+    ).exclude(paystack_payment_reference="")
+
+    client = PaystackClient(pool_size=concurrency)
+    limiter = RateLimiter(rate)
+    checked = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while limit is None or checked < limit:
+            size = batch_size if limit is None else min(batch_size, limit - checked)
+            batch = list(
+                pending.filter(pk__gt=checkpoint.position)
+                .order_by("pk")
+                .values_list("pk", "paystack_payment_reference")[:size]
+            )
+            if not batch:
+                # Finished: the next run starts from the beginning again
+                checkpoint.position = 0
+                checkpoint.state = {}
+                checkpoint.save()
+                break
+
+            results = list(
+                executor.map(
+                    lambda reference: _verify(client, limiter, reference),
+                    [reference for _, reference in batch],
+                )
+            )
+            _apply(results)
+
+            checked += len(batch)
+            counters["checked"] += len(batch)
+            counters.update(status for _, status, _ in results)
+            checkpoint.position = batch[-1][0]
+            checkpoint.state = dict(counters)
+            checkpoint.save()
+            if progress:
+                progress(dict(counters))
+
+    return dict(counters)
@@ -0,0 +1,199 @@
+"""
+Cached resolution of bank accounts with Paystack bank/resolve.
+
+Results are cached per (bank_code, account_number): resolved accounts for
+ACCOUNT_RESOLUTION_TTL seconds (default one day) and accounts Paystack could
+not resolve for ACCOUNT_RESOLUTION_NEGATIVE_TTL seconds (default five
+minutes). Server and network errors are never cached. Concurrent lookups of
+the same account in one process wait for a single upstream call instead of
+each making their own. Hits and misses are counted per process, see
+AccountResolver.metrics.
+"""
+
+import asyncio
+import threading
+import weakref
+from collections import Counter, namedtuple
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .paystack import async_paystack, paystack
+from .threads import run_in_thread
+
+CACHE_KEY = "account_resolution:{bank_code}:{account_number}"
+
+# Statuses with which Paystack answers accounts it cannot resolve
+NOT_FOUND_STATUSES = (400, 404, 422)
+
+
+class Resolution(namedtuple("Resolution", ["status_code", "data"])):
+    """
+    The status code and body of a bank/resolve response.
+    """
+
+    @property
+    def resolved(self):
+        return self.status_code == 200 and bool(self.data.get("status"))
+
+    @property
+    def not_found(self):
+        return self.status_code in NOT_FOUND_STATUSES
+
+    @property
+    def account_name(self):
+        return (self.data.get("data") or {}).get("account_name") or ""
+
+
+def _ttl(resolution):
+    if resolution.resolved:
+        return getattr(settings, "ACCOUNT_RESOLUTION_TTL", 60 * 60 * 24)
+    if resolution.not_found:
+        return getattr(settings, "ACCOUNT_RESOLUTION_NEGATIVE_TTL", 60 * 5)
+    return None
+
+
+def _key(bank_code, account_number):
+    return CACHE_KEY.format(
+        bank_code=str(bank_code).strip(), account_number=str(account_number).strip()
+    )
+
+
+def _resolution(response):
+    try:
+        data = response.json()
+    except ValueError:
+        data = {"status": False, "message": "Invalid response from Paystack."}
+        return Resolution(502, data)
+    return Resolution(response.status_code, data)
+
+
+class AccountResolver:
+    """
+    Resolves bank accounts through the cache, coalescing concurrent misses.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = Counter()
+        # Upstream calls in flight in this process, by cache key
+        self._inflight = {}
+        self._async_inflight = weakref.WeakKeyDictionary()
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _store(self, key, resolution):
+        ttl = _ttl(resolution)
+        if ttl:
+            cache.set(key, tuple(resolution), ttl)
+
+    def resolve(self, bank_code, account_number):
+        """
+        Returns the Resolution of an account. Raises requests.RequestException
+        when Paystack could not be reached.
+        """
+        key = _key(bank_code, account_number)
+        cached = cache.get(key)
+        if cached is not None:
+            resolution = Resolution(*cached)
+            self._count("hits" if resolution.resolved else "negative_hits")
+            return resolution
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            self._count("coalesced")
+            return future.result()
+
+        self._count("misses")
+        try:
+            response = paystack.get(
+                "bank/resolve",
+                params={"account_number": account_number, "bank_code": bank_code},
+            )
+            resolution = _resolution(response)
+            self._store(key, resolution)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(resolution)
+            return resolution
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    async def aresolve(self, bank_code, account_number):
+        """
+        Async counterpart of resolve(). Raises httpx.HTTPError when Paystack
+        could not be reached.
+        """
+        key = _key(bank_code, account_number)
+        cached = await run_in_thread(cache.get, key)
+        if cached is not None:
+            resolution = Resolution(*cached)
+            self._count("hits" if resolution.resolved else "negative_hits")
+            return resolution
+
+        loop = asyncio.get_running_loop()
+        inflight = self._async_inflight.setdefault(loop, {})
+        future = inflight.get(key)
+        if future is not None:
+            self._count("coalesced")
+            return await asyncio.shield(future)
+
+        self._count("misses")
+        future = inflight[key] = loop.create_future()
+        try:
+            response = await async_paystack.get(
+                "bank/resolve",
+                params={"account_number": account_number, "bank_code": bank_code},
+            )
+            resolution = _resolution(response)
+            ttl = _ttl(resolution)
+            if ttl:
+                await run_in_thread(cache.set, key, tuple(resolution), ttl)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieved here so an exception nobody awaited is not logged
+            future.exception()
+            raise
+        else:
+            future.set_result(resolution)
+            return resolution
+        finally:
+            del inflight[key]
+
+    def metrics(self):
+        """
+        Returns the cache hits (positive and negative), misses (upstream
+        calls) and lookups coalesced into another call of this process.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = sum(counters.values())
+        return {
+            "hits": counters.get("hits", 0),
+            "negative_hits": counters.get("negative_hits", 0),
+            "misses": counters.get("misses", 0),
+            "coalesced": counters.get("coalesced", 0),
+            "hit_ratio": (
+                round(1 - counters.get("misses", 0) / lookups, 3) if lookups else None
+            ),
+        }
+
+    def reset(self):
+        with self._lock:
+            self._counters = Counter()
+
+
+account_resolver = AccountResolver()
@@ -1,11 +1,11 @@
 from .models import Wallet, WalletTransaction, Transaction
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from django.conf import settings
-from django.db.models import Sum
-
 import requests
 
+from . import history, payouts
+from .paystack import paystack
+
 User = get_user_model()
 
 
@@ -14,13 +14,10 @@ class WalletSerializer(serializers.ModelSerializer):
     Serializers to validate the user's wallet
     """
 
-    balance = serializers.SerializerMethodField()
-
-    def get_balance(self, obj):
-        bal = WalletTransaction.objects.filter(wallet=obj, status="success").aggregate(
-            Sum("amount")
-        )["amount__sum"]
-        return bal
+    # Rendered as a JSON number, as clients of wallet_info expect
+    balance = serializers.DecimalField(
+        max_digits=20, decimal_places=2, read_only=True, coerce_to_string=False
+    )
 
     class Meta:
         model = Wallet
@@ -47,10 +44,17 @@ class DepositSerializer(serializers.Serializer):
         user = self.context["request"].user
         wallet = Wallet.objects.get(user=user)
         data = self.validated_data
-        url = "https://api.paystack.co/transaction/initialize"
-        headers = {"authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}"}
-        r = requests.post(url, headers=headers, data=data)
-        response = r.json()
+        try:
+            r = paystack.post("transaction/initialize", data=data)
+            response = r.json()
+        except (requests.RequestException, ValueError):
+            raise serializers.ValidationError(
+                {"detail": "Failed to initialize transaction with Paystack."}
+            )
+        if not response.get("status"):
+            raise serializers.ValidationError(
+                {"detail": response.get("message", "Paystack declined the request.")}
+            )
         WalletTransaction.objects.create(
             wallet=wallet,
             transaction_type="deposit",
@@ -75,6 +79,60 @@ class WalletTransactionSerializer(serializers.ModelSerializer):
         ]
 
 
+class TransactionHistoryQuerySerializer(serializers.Serializer):
+    """
+    Serializer for the filters and cursor of the transaction history.
+    """
+
+    type = serializers.ChoiceField(
+        choices=WalletTransaction.TRANSACTION_TYPES, required=False
+    )
+    status = serializers.CharField(max_length=100, required=False)
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+    cursor = serializers.CharField(required=False)
+    page_size = serializers.IntegerField(
+        min_value=1, max_value=history.MAX_PAGE_SIZE, default=history.PAGE_SIZE
+    )
+
+    def validate_cursor(self, value):
+        try:
+            history.decode_cursor(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
+
+class TransactionHistorySerializer(WalletTransactionSerializer):
+    running_balance = serializers.DecimalField(
+        max_digits=20, decimal_places=2, read_only=True
+    )
+
+    class Meta(WalletTransactionSerializer.Meta):
+        fields = WalletTransactionSerializer.Meta.fields + ["running_balance"]
+
+
+class PayoutRequestSerializer(serializers.Serializer):
+    """
+    Serializer for payout requests. The amount is in kobo, like deposits
+    and wallet balances.
+    """
+
+    account_number = serializers.CharField(max_length=20)
+    bank_code = serializers.CharField(max_length=10)
+    amount = serializers.IntegerField(validators=[is_amount])
+    payment_method = serializers.ChoiceField(
+        choices=Transaction.PAYMENT_METHOD_CHOICES, default="bank_transfer"
+    )
+
+    def validate_amount(self, value):
+        if value > payouts.max_amount():
+            raise serializers.ValidationError(
+                f"Payouts are limited to {payouts.max_amount()} kobo."
+            )
+        return value
+
+
 class TransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Transaction
@@ -1,3 +1,859 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import hmac
+import json
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import requests
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from useraccounts.models import CustomUser
+
+from . import banks, events, ledger, paystack, payouts, reconciliation
+from .models import (
+    BankDirectorySnapshot,
+    PaystackEvent,
+    Transaction,
+    Wallet,
+    WalletBalanceCheckpoint,
+    WalletTransaction,
+)
+from .resolution import AccountResolver, Resolution
+
+DEPOSIT_AMOUNT = Decimal("5000")
+
+
+def paystack_response(payload, status_code=200):
+    response = mock.Mock(status_code=status_code)
+    response.json.return_value = payload
+    return response
+
+
+def verification(reference, amount=DEPOSIT_AMOUNT):
+    return {
+        "status": True,
+        "message": "Verification successful",
+        "data": {"status": "success", "reference": reference, "amount": int(amount)},
+    }
+
+
+def charge_success(reference, amount=DEPOSIT_AMOUNT, currency="NGN"):
+    return {
+        "event": "charge.success",
+        "data": {
+            "id": reference,
+            "reference": reference,
+            "amount": int(amount),
+            "currency": currency,
+        },
+    }
+
+
+class WalletTestMixin:
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            "member@example.com", "password", name="Member", user_type="individual"
+        )
+        self.wallet = Wallet.objects.get(user=self.user)
+
+    def create_deposit(self, reference="ref-1", amount=DEPOSIT_AMOUNT):
+        return WalletTransaction.objects.create(
+            wallet=self.wallet,
+            transaction_type="deposit",
+            amount=amount,
+            paystack_payment_reference=reference,
+        )
+
+    def apply_webhook(self, reference, amount=DEPOSIT_AMOUNT):
+        payload = charge_success(reference, amount)
+        events.record_event(json.dumps(payload).encode())
+        events.process_events()
+
+    def assertBalance(self, expected):
+        wallet = Wallet.objects.get(pk=self.wallet.pk)
+        self.assertEqual(wallet.balance, Decimal(expected))
+        self.assertEqual(
+            ledger.balance_at(self.wallet.pk, timezone.now()), wallet.balance
+        )
+
+
+class WalletTestCase(WalletTestMixin, TestCase):
+    pass
+
+
+class WalletLedgerTests(WalletTestCase):
+    def test_stale_save_after_webhook_credits_once(self):
+        deposit = self.create_deposit()
+        stale = WalletTransaction.objects.get(pk=deposit.pk)
+
+        self.apply_webhook("ref-1")
+        stale.status = "success"
+        stale.amount = DEPOSIT_AMOUNT
+        stale.save()
+
+        self.assertBalance(DEPOSIT_AMOUNT)
+
+    def test_stale_delete_removes_the_stored_credit(self):
+        deposit = self.create_deposit()
+        stale = WalletTransaction.objects.get(pk=deposit.pk)
+
+        self.apply_webhook("ref-1")
+        stale.delete()
+
+        self.assertBalance(0)
+
+    def test_settle_pending_only_settles_once(self):
+        deposit = self.create_deposit()
+        stale = WalletTransaction.objects.get(pk=deposit.pk)
+
+        self.assertTrue(ledger.settle_pending(deposit, "success", DEPOSIT_AMOUNT))
+        self.assertFalse(ledger.settle_pending(stale, "success", DEPOSIT_AMOUNT))
+
+        self.assertBalance(DEPOSIT_AMOUNT)
+
+
+class WalletInfoTests(WalletTestCase):
+    def test_balance_is_a_json_number(self):
+        self.create_deposit()
+        self.apply_webhook("ref-1")
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.get("/api/v1/payments/wallet_info/")
+
+        self.assertEqual(response.status_code, 200)
+        balance = json.loads(response.content)["balance"]
+        self.assertIsInstance(balance, float)
+        self.assertEqual(balance, 5000.0)
+
+
+class TransactionHistoryTests(WalletTestCase):
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        for days_ago, transaction_type, amount, status in (
+            (5, "deposit", "1000", "success"),
+            (4, "deposit", "500", "failed"),
+            (3, "withdraw", "-300", "success"),
+            (2, "deposit", "200", "success"),
+            (1, "withdraw", "-100", "pending"),
+        ):
+            WalletTransaction.objects.create(
+                wallet=self.wallet,
+                transaction_type=transaction_type,
+                amount=Decimal(amount),
+                status=status,
+                timestamp=now - timedelta(days=days_ago),
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def page(self, **params):
+        response = self.client.get(reverse("transaction-history"), params)
+        self.assertEqual(response.status_code, 200)
+        rows = [
+            (Decimal(row["amount"]), Decimal(row["running_balance"]))
+            for row in response.data["results"]
+        ]
+        return rows, response.data["next_cursor"]
+
+    def all_pages(self, **params):
+        rows, cursor = self.page(**params)
+        while cursor:
+            more, cursor = self.page(cursor=cursor, **params)
+            rows += more
+        return rows
+
+    def test_pages_carry_the_balance_after_each_transaction(self):
+        expected = [(-100, 900), (200, 900), (-300, 700), (500, 1000), (1000, 1000)]
+
+        self.assertEqual(self.all_pages(page_size=2), expected)
+
+    def test_filtered_out_transactions_still_count_towards_balances(self):
+        rows, cursor = self.page(type="withdraw")
+
+        self.assertEqual(rows, [(-100, 900), (-300, 700)])
+        self.assertIsNone(cursor)
+
+    def test_checkpoints_give_the_same_balances(self):
+        expected = self.all_pages(page_size=2)
+        WalletBalanceCheckpoint.objects.create(
+            wallet=self.wallet,
+            taken_at=timezone.now() - timedelta(days=2, hours=12),
+            balance=Decimal("700"),
+        )
+
+        self.assertEqual(self.all_pages(page_size=2), expected)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(
+            reverse("transaction-history"), {"cursor": "not-a-cursor"}
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+
+class VerifyDepositTests(WalletTestCase):
+    def setUp(self):
+        super().setUp()
+        self.deposit = self.create_deposit()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def webhook_during_verification(self, *args, **kwargs):
+        # The webhook lands while the view waits for Paystack
+        self.apply_webhook("ref-1")
+        return paystack_response(verification("ref-1"))
+
+    def test_webhook_during_verification_credits_once(self):
+        with mock.patch(
+            "payments.views.VerifyDeposit._verify_transaction_with_paystack",
+            side_effect=self.webhook_during_verification,
+        ):
+            response = self.client.get("/api/v1/payments/deposit/verify/ref-1/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertBalance(DEPOSIT_AMOUNT)
+
+    def test_repeated_verification_credits_once(self):
+        with mock.patch(
+            "payments.views.VerifyDeposit._verify_transaction_with_paystack",
+            return_value=paystack_response(verification("ref-1")),
+        ):
+            for _ in range(2):
+                response = self.client.get("/api/v1/payments/deposit/verify/ref-1/")
+                self.assertEqual(response.status_code, 200)
+
+        self.assertBalance(DEPOSIT_AMOUNT)
+
+
+class AsyncVerifyDepositTests(WalletTestMixin, TransactionTestCase):
+    # Async views query from their own threads, which only see committed rows
+
+    def setUp(self):
+        super().setUp()
+        self.create_deposit()
+
+    async def webhook_during_verification(self, *args, **kwargs):
+        await sync_to_async(self.apply_webhook)("ref-1")
+        return paystack_response(verification("ref-1"))
+
+    def test_webhook_during_verification_credits_once(self):
+        with mock.patch(
+            "payments.async_views.async_paystack.get",
+            new=mock.AsyncMock(side_effect=self.webhook_during_verification),
+        ):
+            response = self.client.get(
+                "/api/v1/payments/async/deposit/verify/ref-1/",
+                HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertBalance(DEPOSIT_AMOUNT)
+
+
+RESOLVED = Resolution(
+    200, {"status": True, "data": {"account_name": "MEMBER", "account_number": "0"}}
+)
+
+
+@mock.patch("payments.views.account_resolver.resolve", return_value=RESOLVED)
+class PayoutTests(WalletTestCase):
+    def setUp(self):
+        super().setUp()
+        WalletTransaction.objects.create(
+            wallet=self.wallet,
+            transaction_type="deposit",
+            amount=DEPOSIT_AMOUNT,
+            paystack_payment_reference="ref-1",
+            status="success",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def request_payout(self, **data):
+        return self.client.post(
+            "/api/v1/payments/payout/",
+            {"account_number": "0123456789", "bank_code": "058", **data},
+            format="json",
+        )
+
+    def submit(self, transfer_status, error=None):
+        sent = []
+
+        def post(path, payload):
+            if path == "transferrecipient/bulk":
+                return {
+                    "success": [
+                        {
+                            "recipient_code": f"RCP_{item['account_number']}",
+                            "details": item,
+                        }
+                        for item in payload["batch"]
+                    ]
+                }
+            sent.extend(payload["transfers"])
+            if error is not None:
+                raise error
+            return [
+                {
+                    "reference": item["reference"],
+                    "status": transfer_status,
+                    "transfer_code": f"TRF_{item['reference']}",
+                }
+                for item in payload["transfers"]
+            ]
+
+        with mock.patch("payments.payouts._post", side_effect=post):
+            payouts.submit_payouts()
+        return sent
+
+    def verify(self, response):
+        payout = Transaction.objects.get()
+        Transaction.objects.filter(pk=payout.pk).update(
+            submitted_at=timezone.now() - timedelta(hours=1)
+        )
+        with mock.patch("payments.payouts.paystack.get", return_value=response):
+            return payouts.verify_submitted()
+
+    def test_amount_is_validated(self, resolve):
+        for data in ({}, {"amount": 0}, {"amount": -100}, {"amount": "lots"}):
+            self.assertEqual(self.request_payout(**data).status_code, 400)
+        with self.settings(PAYOUT_MAX_AMOUNT=1000):
+            self.assertEqual(self.request_payout(amount=1001).status_code, 400)
+
+        self.assertFalse(Transaction.objects.exists())
+        self.assertBalance(DEPOSIT_AMOUNT)
+
+    def test_insufficient_balance_is_rejected(self, resolve):
+        response = self.request_payout(amount=int(DEPOSIT_AMOUNT) + 1)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Transaction.objects.exists())
+        self.assertBalance(DEPOSIT_AMOUNT)
+
+    def test_payout_holds_the_amount(self, resolve):
+        self.assertEqual(self.request_payout(amount=3000).status_code, 201)
+        self.assertBalance(2000)
+
+        # The remaining balance does not cover a second payout
+        self.assertEqual(self.request_payout(amount=3000).status_code, 400)
+        self.assertBalance(2000)
+
+    def test_transfers_are_sent_in_kobo(self, resolve):
+        self.request_payout(amount=3000)
+
+        sent = self.submit("pending")
+
+        self.assertEqual([transfer["amount"] for transfer in sent], [3000])
+        self.assertBalance(2000)
+
+    def test_declined_submission_is_refunded(self, resolve):
+        self.request_payout(amount=3000)
+
+        self.submit("failed")
+
+        self.assertEqual(Transaction.objects.get().status, "declined")
+        self.assertBalance(DEPOSIT_AMOUNT)
+
+    def test_failed_transfer_webhook_is_refunded_once(self, resolve):
+        self.request_payout(amount=3000)
+        self.submit("pending")
+        reference = Transaction.objects.get().reference_id
+
+        for event in ("transfer.failed", "transfer.reversed"):
+            payload = {"event": event, "data": {"id": 1, "reference": reference}}
+            events.record_event(json.dumps(payload).encode())
+            events.process_events()
+
+        self.assertEqual(Transaction.objects.get().status, "declined")
+        self.assertBalance(DEPOSIT_AMOUNT)
+
+    def test_successful_transfer_keeps_the_debit(self, resolve):
+        self.request_payout(amount=3000)
+        self.submit("success")
+
+        self.assertEqual(Transaction.objects.get().status, "approved")
+        self.assertBalance(2000)
+
+    def test_payouts_without_a_hold_are_not_submitted(self, resolve):
+        Transaction.objects.create(
+            user=self.user,
+            reference_id="legacy",
+            amount=3000,
+            payment_method="bank_transfer",
+            account_number="0123456789",
+            bank_code="058",
+        )
+
+        self.assertEqual(self.submit("pending"), [])
+        self.assertIsNone(Transaction.objects.get().submitted_at)
+
+    def test_refused_connection_releases_the_batch(self, resolve):
+        self.request_payout(amount=3000)
+        refused = requests.ConnectionError(
+            MaxRetryError(None, "/transfer/bulk", NewConnectionError(None, "refused"))
+        )
+
+        with self.assertRaises(requests.ConnectionError):
+            self.submit("pending", error=refused)
+
+        self.assertIsNone(Transaction.objects.get().submitted_at)
+        self.assertEqual(len(self.submit("pending")), 1)
+
+    def test_timed_out_submission_is_verified_not_resubmitted(self, resolve):
+        self.request_payout(amount=3000)
+
+        with self.assertRaises(payouts.TransferOutcomeUnknown):
+            self.submit("pending", error=requests.ReadTimeout())
+        self.assertEqual(self.submit("pending"), [])
+
+        reference = Transaction.objects.get().reference_id
+        accepted = {"status": "success", "reference": reference, "transfer_code": "T"}
+        counts = self.verify(paystack_response({"status": True, "data": accepted}))
+
+        self.assertEqual(counts, {"approved": 1})
+        payout = Transaction.objects.get()
+        self.assertEqual((payout.status, payout.transfer_code), ("approved", "T"))
+        self.assertEqual(self.submit("pending"), [])
+        self.assertBalance(2000)
+
+    def test_unknown_transfer_is_queued_again(self, resolve):
+        self.request_payout(amount=3000)
+        with self.assertRaises(payouts.TransferOutcomeUnknown):
+            self.submit("pending", error=requests.ReadTimeout())
+
+        counts = self.verify(paystack_response({"status": False}, status_code=404))
+
+        self.assertEqual(counts, {"requeued": 1})
+        self.assertEqual(len(self.submit("pending")), 1)
+
+    def test_failed_transfer_found_by_verification_is_refunded(self, resolve):
+        self.request_payout(amount=3000)
+        with self.assertRaises(payouts.TransferOutcomeUnknown):
+            self.submit("pending", error=requests.ReadTimeout())
+
+        failed = {"status": "failed", "transfer_code": "T"}
+        self.verify(paystack_response({"status": True, "data": failed}))
+
+        self.assertEqual(Transaction.objects.get().status, "declined")
+        self.assertBalance(DEPOSIT_AMOUNT)
+
+
+@override_settings(PAYSTACK_SECRET_KEY="sk_test_webhook")
+class PaystackWebhookTests(WalletTestCase):
+    def deliver(self, payload, signature=None):
+        body = json.dumps(payload).encode()
+        if signature is None:
+            signature = hmac.new(b"sk_test_webhook", body, hashlib.sha512).hexdigest()
+        return self.client.post(
+            "/api/v1/payments/webhooks/paystack/",
+            body,
+            content_type="application/json",
+            HTTP_X_PAYSTACK_SIGNATURE=signature,
+        )
+
+    def test_unsigned_events_are_rejected(self):
+        response = self.deliver(charge_success("ref-1"), signature="forged")
+
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(PaystackEvent.objects.exists())
+
+    def test_retried_delivery_is_recorded_and_applied_once(self):
+        self.create_deposit()
+
+        for _ in range(2):
+            self.assertEqual(self.deliver(charge_success("ref-1")).status_code, 200)
+        self.assertEqual(PaystackEvent.objects.count(), 1)
+
+        self.assertEqual(events.process_events(), {"applied": 1})
+        self.assertEqual(events.process_events(), {})
+        self.assertEqual(WalletTransaction.objects.get().status, "success")
+        self.assertBalance(DEPOSIT_AMOUNT)
+
+    def test_event_before_its_deposit_is_retried(self):
+        self.deliver(charge_success("ref-1"))
+        self.assertEqual(events.process_events(), {"unmatched": 1})
+
+        self.create_deposit()
+        events.process_events(retry_unmatched=True)
+
+        self.assertEqual(PaystackEvent.objects.get().outcome, "applied")
+        self.assertBalance(DEPOSIT_AMOUNT)
+
+    def test_other_events_are_ignored(self):
+        self.deliver({"event": "subscription.create", "data": {"id": 7}})
+
+        self.assertEqual(events.process_events(), {"ignored": 1})
+
+    def test_charges_that_differ_from_the_deposit_are_rejected(self):
+        self.create_deposit()
+
+        overpaid = charge_success("ref-1", amount=DEPOSIT_AMOUNT * 10)
+        foreign = charge_success("ref-1", currency="USD")
+        foreign["data"]["id"] = "ref-1-usd"
+        for payload in (overpaid, foreign):
+            self.deliver(payload)
+        with self.assertLogs("payments.events", "WARNING"):
+            self.assertEqual(events.process_events(), {"rejected": 2})
+
+        self.assertEqual(WalletTransaction.objects.get().status, "pending")
+        self.assertBalance(0)
+
+    def test_late_transfer_event_does_not_flip_a_final_payout(self):
+        self.create_deposit()
+        self.apply_webhook("ref-1")
+        payout = payouts.create_payout(
+            self.user, 3000, "0123456789", "058", "bank_transfer"
+        )
+
+        for event_id, event in ((1, "transfer.failed"), (2, "transfer.success")):
+            self.deliver(
+                {
+                    "event": event,
+                    "data": {"id": event_id, "reference": payout.reference_id},
+                }
+            )
+        with self.assertLogs("payments.events", "WARNING"):
+            self.assertEqual(events.process_events(), {"applied": 1, "rejected": 1})
+
+        self.assertEqual(Transaction.objects.get().status, "declined")
+        self.assertBalance(DEPOSIT_AMOUNT)
+
+
+class ReconciliationTests(WalletTestCase):
+    def create_stale_deposit(self, reference, age=timedelta(hours=1)):
+        deposit = self.create_deposit(reference)
+        WalletTransaction.objects.filter(pk=deposit.pk).update(
+            timestamp=timezone.now() - age
+        )
+        return deposit
+
+    def reconcile(self, statuses, **kwargs):
+        # Called from the verification threads, which must not query
+        def get(path, endpoint=None):
+            reference = path.rsplit("/", 1)[1]
+            status = statuses[reference]
+            if status == "error":
+                return paystack_response({}, status_code=500)
+            payload = verification(reference)
+            payload["data"]["status"] = status
+            return paystack_response(payload)
+
+        with mock.patch("payments.reconciliation.PaystackClient") as client:
+            client.return_value.get.side_effect = get
+            counters = reconciliation.reconcile_pending_deposits(rate=0, **kwargs)
+        return counters, [
+            call.args[0] for call in client.return_value.get.call_args_list
+        ]
+
+    def statuses(self):
+        return dict(
+            WalletTransaction.objects.values_list(
+                "paystack_payment_reference", "status"
+            )
+        )
+
+    def test_final_statuses_are_applied(self):
+        for reference in ("ref-a", "ref-b", "ref-c"):
+            self.create_stale_deposit(reference)
+        self.create_deposit("ref-recent")
+
+        counters, _ = self.reconcile(
+            {"ref-a": "success", "ref-b": "failed", "ref-c": "error"}
+        )
+
+        self.assertEqual(counters["checked"], 3)
+        self.assertEqual(
+            self.statuses(),
+            {
+                "ref-a": "success",
+                "ref-b": "failed",
+                "ref-c": "pending",
+                "ref-recent": "pending",
+            },
+        )
+        self.assertBalance(DEPOSIT_AMOUNT)
+
+    def test_deposit_settled_meanwhile_is_credited_once(self):
+        self.create_stale_deposit("ref-1")
+        apply = reconciliation._apply
+
+        def webhook_before_apply(results):
+            # The webhook lands while the batch is being verified
+            self.apply_webhook("ref-1")
+            apply(results)
+
+        with mock.patch(
+            "payments.reconciliation._apply", side_effect=webhook_before_apply
+        ):
+            self.reconcile({"ref-1": "success"})
+
+        self.assertBalance(DEPOSIT_AMOUNT)
+
+    def test_interrupted_run_resumes_from_its_checkpoint(self):
+        for reference in ("ref-a", "ref-b"):
+            self.create_stale_deposit(reference)
+        statuses = {"ref-a": "abandoned", "ref-b": "success"}
+
+        _, first = self.reconcile(statuses, limit=1)
+        _, second = self.reconcile(statuses)
+
+        self.assertEqual(
+            first + second,
+            ["transaction/verify/ref-a", "transaction/verify/ref-b"],
+        )
+        self.assertEqual(self.statuses(), {"ref-a": "abandoned", "ref-b": "success"})
+        self.assertBalance(DEPOSIT_AMOUNT)
+
+    def test_charge_after_abandoned_checkout_is_credited(self):
+        self.create_stale_deposit("ref-1")
+        self.reconcile({"ref-1": "abandoned"})
+        self.assertEqual(self.statuses(), {"ref-1": "abandoned"})
+
+        # The customer completes the checkout later
+        self.apply_webhook("ref-1")
+
+        self.assertEqual(self.statuses(), {"ref-1": "success"})
+        self.assertEqual(PaystackEvent.objects.get().outcome, "applied")
+        self.assertBalance(DEPOSIT_AMOUNT)
+
+
+BANKS = {"status": True, "data": [{"name": "Bank", "code": "058", "slug": "bank"}]}
+
+
+class BankDirectoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = banks.BankDirectory()
+
+    def test_cold_start_fails_fast_while_another_worker_fetches(self):
+        cache.add(banks.LOCK_KEY, True, banks.LOCK_TIMEOUT)
+
+        with mock.patch("payments.banks.paystack.get") as get:
+            with self.assertRaises(banks.BankDirectoryUnavailable):
+                self.directory.by_code("058")
+        get.assert_not_called()
+
+    def test_warm_fetches_and_snapshots_the_list(self):
+        with mock.patch(
+            "payments.banks.paystack.get", return_value=paystack_response(BANKS)
+        ):
+            self.assertTrue(self.directory.warm())
+
+        self.assertEqual(BankDirectorySnapshot.objects.get().payload, BANKS)
+        self.assertEqual(self.directory.by_code("058")["slug"], "bank")
+
+    def test_snapshot_seeds_a_cold_cache(self):
+        BankDirectorySnapshot.objects.create(
+            source="paystack", payload=BANKS, fetched_at=timezone.now()
+        )
+
+        with mock.patch("payments.banks.paystack.get") as get:
+            self.assertEqual(self.directory.by_slug("bank")["code"], "058")
+        get.assert_not_called()
+
+
+class FakePaystackHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def respond(self):
+        server = self.server
+        server.received.append(
+            (
+                self.command,
+                self.path,
+                self.headers["Authorization"],
+                self.client_address[1],
+            )
+        )
+        status = server.statuses.pop(0) if server.statuses else 200
+        body = json.dumps({"status": status == 200}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = respond
+
+    def log_message(self, *args):
+        pass
+
+
+class PaystackClientTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FakePaystackHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+
+    def setUp(self):
+        self.server.received = []
+        self.server.statuses = []
+        overrides = self.settings(
+            PAYSTACK_BASE_URL=f"http://127.0.0.1:{self.server.server_port}/",
+            PAYSTACK_SECRET_KEY="sk_test",
+            PAYSTACK_MAX_RETRIES=2,
+            PAYSTACK_RETRY_BACKOFF=0,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        paystack.latency_metrics.reset()
+
+    def run_async(self, *calls):
+        async def send():
+            client = paystack.AsyncPaystackClient()
+            try:
+                return [await getattr(client, method)(path) for method, path in calls]
+            finally:
+                await client.client().aclose()
+
+        return asyncio.run(send())
+
+    def test_requests_reuse_one_authenticated_connection(self):
+        client = paystack.PaystackClient()
+
+        client.get("bank")
+        client.post("transfer")
+
+        (_, _, auth, port), (_, _, _, second_port) = self.server.received
+        self.assertEqual(auth, "Bearer sk_test")
+        self.assertEqual(port, second_port)
+        self.assertEqual(client.metrics()["GET bank"]["count"], 1)
+
+    def test_gets_are_retried_a_bounded_number_of_times(self):
+        self.server.statuses = [503, 502, 503, 200]
+
+        response = paystack.PaystackClient().get("bank")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.server.received), 3)
+        self.assertEqual(paystack.latency_metrics.snapshot()["GET bank"]["errors"], 1)
+
+    def test_posts_are_not_retried(self):
+        self.server.statuses = [503]
+
+        response = paystack.PaystackClient().post("transfer")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.server.received), 1)
+
+    def test_async_gets_are_retried_and_posts_are_not(self):
+        self.server.statuses = [503, 200, 503]
+
+        get, post = self.run_async(("get", "bank"), ("post", "transfer"))
+
+        self.assertEqual((get.status_code, post.status_code), (200, 503))
+        self.assertEqual(
+            [(method, path) for method, path, _, _ in self.server.received],
+            [("GET", "/bank"), ("GET", "/bank"), ("POST", "/transfer")],
+        )
+
+
+RESOLVED_ACCOUNT = {"status": True, "data": {"account_name": "Ada Obi"}}
+
+
+class AccountResolverTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.resolver = AccountResolver()
+
+    def test_resolved_accounts_are_cached(self):
+        with mock.patch(
+            "payments.resolution.paystack.get",
+            return_value=paystack_response(RESOLVED_ACCOUNT),
+        ) as get:
+            first = self.resolver.resolve("058", "0123456789")
+            second = self.resolver.resolve("058", " 0123456789")
+
+        get.assert_called_once()
+        self.assertEqual(second, first)
+        self.assertEqual(second.account_name, "Ada Obi")
+        self.assertEqual(self.resolver.metrics()["hits"], 1)
+
+    def test_unknown_accounts_are_cached_briefly(self):
+        with mock.patch(
+            "payments.resolution.paystack.get",
+            return_value=paystack_response({"status": False}, status_code=422),
+        ) as get, self.settings(ACCOUNT_RESOLUTION_NEGATIVE_TTL=60):
+            self.resolver.resolve("058", "0123456789")
+            resolution = self.resolver.resolve("058", "0123456789")
+
+        get.assert_called_once()
+        self.assertTrue(resolution.not_found)
+        self.assertEqual(self.resolver.metrics()["negative_hits"], 1)
+
+    def test_server_errors_are_not_cached(self):
+        with mock.patch(
+            "payments.resolution.paystack.get",
+            return_value=paystack_response({"status": False}, status_code=500),
+        ) as get:
+            self.resolver.resolve("058", "0123456789")
+            self.resolver.resolve("058", "0123456789")
+
+        self.assertEqual(get.call_count, 2)
+
+    def test_concurrent_lookups_share_one_call(self):
+        release = threading.Event()
+
+        def slow_get(*args, **kwargs):
+            release.wait(5)
+            return paystack_response(RESOLVED_ACCOUNT)
+
+        results = []
+
+        def resolve():
+            results.append(self.resolver.resolve("058", "0123456789"))
+
+        with mock.patch(
+            "payments.resolution.paystack.get", side_effect=slow_get
+        ) as get:
+            threads = [threading.Thread(target=resolve) for _ in range(2)]
+            threads[0].start()
+            while not self.resolver._inflight:
+                time.sleep(0.01)
+            threads[1].start()
+            while not self.resolver.metrics()["coalesced"]:
+                time.sleep(0.01)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+
+        get.assert_called_once()
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0], results[1])
+
+    def test_concurrent_async_lookups_share_one_call(self):
+        async def slow_get(*args, **kwargs):
+            await asyncio.sleep(0.05)
+            return paystack_response(RESOLVED_ACCOUNT)
+
+        async def resolve_twice():
+            return await asyncio.gather(
+                self.resolver.aresolve("058", "0123456789"),
+                self.resolver.aresolve("058", "0123456789"),
+            )
+
+        with mock.patch(
+            "payments.resolution.async_paystack.get", side_effect=slow_get
+        ) as get:
+            first, second = asyncio.run(resolve_twice())
+
+        get.assert_called_once()
+        self.assertEqual(first, second)
+        self.assertEqual(self.resolver.metrics()["coalesced"], 1)
@@ -0,0 +1,56 @@
+"""
+Blocking work of the async views.
+
+sync_to_async runs functions on one shared thread by default
+(thread_sensitive=True), and so does Django's async ORM, so the database and
+cache calls of concurrent async requests queue behind each other. Functions
+passed to run_in_thread() run on a dedicated pool of ASYNC_VIEW_THREADS
+threads (16 by default) instead. Each call must be self-contained: it runs
+entirely on one pool thread, with that thread's own database connection,
+which is closed afterwards when it is unusable or older than CONN_MAX_AGE.
+The pool size therefore also bounds the connections a worker opens.
+"""
+
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "ASYNC_VIEW_THREADS", 16),
+                    thread_name_prefix="async-view",
+                )
+    return _executor
+
+
+def _closing_connections(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return wrapper
+
+
+async def run_in_thread(func, *args, **kwargs):
+    """
+    Runs func(*args, **kwargs) on the pool and returns its result.
+    """
+    call = sync_to_async(
+        _closing_connections(func), thread_sensitive=False, executor=executor()
+    )
+    return await call(*args, **kwargs)
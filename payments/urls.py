@@ -6,9 +6,19 @@ from .views import (
     WalletInfo,
     BankListView,
     ListDepositTransactions,
+    TransactionHistoryView,
     VerifyBankAccountView,
     PayoutView,
     ValidateAccountView,
+    PaystackMetricsView,
+    PaystackWebhookView,
+)
+from .async_views import (
+    AsyncDepositFunds,
+    AsyncVerifyDeposit,
+    AsyncBankListView,
+    AsyncVerifyBankAccountView,
+    AsyncValidateAccountView,
 )
 
 
@@ -18,7 +28,20 @@ urlpatterns = [
     path("deposit/verify/<str:reference>/", VerifyDeposit.as_view()),
     path("banks/", BankListView.as_view(), name="bank-list"),
     path("transactions/", ListDepositTransactions.as_view()),
+    path(
+        "transactions/history/",
+        TransactionHistoryView.as_view(),
+        name="transaction-history",
+    ),
     path("verify_bank_account/", VerifyBankAccountView.as_view()),
     path("payout/", PayoutView.as_view(), name="payout"),
     path("validate-account/", ValidateAccountView.as_view(), name="validate-account"),
+    path("webhooks/paystack/", PaystackWebhookView.as_view(), name="paystack-webhook"),
+    path("paystack/metrics/", PaystackMetricsView.as_view(), name="paystack-metrics"),
+    # Async variants of the Paystack-bound endpoints, for ASGI deployments
+    path("async/deposit/", AsyncDepositFunds.as_view()),
+    path("async/deposit/verify/<str:reference>/", AsyncVerifyDeposit.as_view()),
+    path("async/banks/", AsyncBankListView.as_view()),
+    path("async/verify_bank_account/", AsyncVerifyBankAccountView.as_view()),
+    path("async/validate-account/", AsyncValidateAccountView.as_view()),
 ]
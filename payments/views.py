@@ -2,17 +2,25 @@ from .serializers import (
     DepositSerializer,
     WalletSerializer,
     WalletTransactionSerializer,
+    TransactionSerializer,
+    PayoutRequestSerializer,
+    TransactionHistoryQuerySerializer,
+    TransactionHistorySerializer,
 )
-from .models import Wallet, WalletTransaction
+from .models import Wallet, WalletTransaction, PaystackEvent
+from .paystack import paystack
+from .banks import BankDirectoryUnavailable, bank_directory
+from .resolution import account_resolver
+from . import events, history, ledger, payouts
 from rest_framework.generics import RetrieveAPIView, CreateAPIView
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.conf import settings
+import os
 import requests
 from rest_framework import status
 from django.shortcuts import get_object_or_404
-from rest_framework.permissions import IsAuthenticated
-from django.core.cache import cache
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from referrals.permissions import IsAdmin
 
 
 class WalletInfo(RetrieveAPIView):
@@ -59,9 +67,21 @@ class VerifyDeposit(APIView):
             paystack_payment_reference=reference,
             wallet__user=request.user,
         )
-        response = self._verify_transaction_with_paystack(reference)
+        if transaction.status in ledger.UNSETTLED_STATUSES:
+            # Apply a charge.success webhook that arrived but was not processed yet
+            events.process_events(
+                PaystackEvent.objects.filter(reference=reference), retry_unmatched=True
+            )
+            transaction.refresh_from_db()
+        if transaction.status == "success":
+            return Response(deposit_status(transaction))
+
+        try:
+            response = self._verify_transaction_with_paystack(reference)
+        except requests.RequestException:
+            response = None
 
-        if response.status_code != 200:
+        if response is None or response.status_code != 200:
             return Response(
                 {"detail": "Failed to verify transaction with Paystack."},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -75,36 +95,44 @@ class VerifyDeposit(APIView):
         return Response(resp_data, status=status.HTTP_400_BAD_REQUEST)
 
     def _verify_transaction_with_paystack(self, reference):
-        url = f"https://api.paystack.co/transaction/verify/{reference}"
-        headers = {"Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}"}
-        return requests.get(url, headers=headers)
+        return paystack.get(
+            f"transaction/verify/{reference}", endpoint="transaction/verify"
+        )
 
     def _update_transaction(self, transaction, resp_data):
-        status = resp_data["data"]["status"]
-        amount = resp_data["data"]["amount"]
-        transaction.status = status
-        transaction.amount = amount
-        transaction.save()
+        # Conditional on the deposit still being pending, so a webhook or a
+        # concurrent verification that settled it meanwhile is not credited
+        # a second time
+        ledger.settle_pending(
+            transaction, resp_data["data"]["status"], resp_data["data"]["amount"]
+        )
+
+
+def deposit_status(transaction):
+    """
+    Returns a verification payload for a deposit already confirmed locally,
+    shaped like Paystack's transaction/verify response.
+    """
+    return {
+        "status": True,
+        "message": "Verification successful",
+        "data": {
+            "status": transaction.status,
+            "amount": transaction.amount,
+            "reference": transaction.paystack_payment_reference,
+        },
+    }
 
 
 class BankListView(APIView):
     def get(self, request):
-        url = "https://api.paystack.co/bank"
-        headers = {"Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}"}
-
-        banks = cache.get("bank_list")
-        if not banks:
-            try:
-                response = requests.get(url, headers=headers)
-                response.raise_for_status()
-                banks = response.json()
-                cache.set("bank_list", banks, 60 * 60)
-                return Response(response.json(), status=status.HTTP_200_OK)
-            except requests.RequestException as e:
-                return Response(
-                    {"error": "Failed to fetch banks from Paystack", "details": str(e)},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                )
+        try:
+            banks = bank_directory.payload()
+        except BankDirectoryUnavailable as e:
+            return Response(
+                {"error": "Failed to fetch banks from Paystack", "details": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
 
         return Response(banks, status=status.HTTP_200_OK)
 
@@ -121,6 +149,37 @@ class ListDepositTransactions(APIView):
         return Response(serializer.data)
 
 
+class TransactionHistoryView(APIView):
+    """
+    View for the paged transaction history of the user's wallet, newest
+    first, with the balance after each transaction.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = TransactionHistoryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        wallet = get_object_or_404(Wallet, user=request.user)
+        transactions, next_cursor = history.transaction_history(
+            wallet,
+            transaction_type=params.get("type"),
+            status=params.get("status"),
+            since=params.get("since"),
+            until=params.get("until"),
+            cursor=params.get("cursor"),
+            page_size=params["page_size"],
+        )
+        return Response(
+            {
+                "results": TransactionHistorySerializer(transactions, many=True).data,
+                "next_cursor": next_cursor,
+            }
+        )
+
+
 class VerifyBankAccountView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -134,21 +193,15 @@ class VerifyBankAccountView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        url = "https://api.paystack.co/bank/resolve"
-        headers = {
-            "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
-        }
-        params = {
-            "account_number": account_number,
-            "bank_code": bank_code,
-        }
-
-        response = requests.get(url, headers=headers, params=params)
+        try:
+            resolution = account_resolver.resolve(bank_code, account_number)
+        except requests.RequestException as e:
+            return Response(
+                {"error": "Failed to reach Paystack", "details": str(e)},
+                status=status.HTTP_502_BAD_GATEWAY,
+            )
 
-        if response.status_code == 200:
-            return Response(response.json(), status=status.HTTP_200_OK)
-        else:
-            return Response(response.json(), status=response.status_code)
+        return Response(resolution.data, status=resolution.status_code)
 
 
 class ValidateAccountView(APIView):
@@ -156,36 +209,32 @@ class ValidateAccountView(APIView):
         bank_code = request.data.get("bank_code")
         account_number = request.data.get("account_number")
 
-        # Get the cached bank list
-        banks = cache.get("bank_list")
-        if not banks:
+        try:
+            bank = bank_directory.by_code(bank_code)
+        except BankDirectoryUnavailable:
             return Response(
                 {"error": "Bank list not available"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
-
-        # Validate the bank code against the cached bank list
-        bank = next((bank for bank in banks["data"] if bank["code"] == bank_code), None)
         if not bank:
             return Response(
                 {"error": "Bank not found"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Prepare the URL with query parameters
-        url = f"https://api.paystack.co/bank/resolve?account_number={account_number}&bank_code={bank_code}"
-
-        headers = {
-            "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
-        }
-
-        response = requests.get(url, headers=headers)
+        try:
+            resolution = account_resolver.resolve(bank_code, account_number)
+        except requests.RequestException:
+            return Response(
+                {"error": "Failed to validate account"},
+                status=status.HTTP_502_BAD_GATEWAY,
+            )
 
-        if response.status_code == 200:
-            data = response.json()
-            return Response(data)
+        if resolution.status_code == 200:
+            return Response(resolution.data)
         else:
             return Response(
-                {"error": "Failed to validate account"}, status=response.status_code
+                {"error": "Failed to validate account"},
+                status=resolution.status_code,
             )
 
 
@@ -199,30 +248,28 @@ class PayoutView(APIView):
         return Response(serializer.data)
 
     def post(self, request):
-        account_number = request.data.get("account_number")
-        bank_code = request.data.get("bank_code")
-        amount = request.data.get("amount")
-        payment_method = request.data.get("payment_method")
+        serializer = PayoutRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        payout = serializer.validated_data
 
         # Verify the account number with Paystack
-        headers = {
-            "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
-        }
-        verify_url = f"https://api.paystack.co/bank/resolve?account_number={account_number}&bank_code={bank_code}"
-        response = requests.get(verify_url, headers=headers)
-        data = response.json()
-
-        if data["status"]:
-            # Create a transaction record
-            transaction = Transaction.objects.create(
-                user=request.user,
-                reference_id="some_unique_reference_id",  # Generate this in your logic
-                amount=amount,
-                payment_method=payment_method,
-                status="pending",
-            )
+        try:
+            resolved = account_resolver.resolve(
+                payout["bank_code"], payout["account_number"]
+            ).resolved
+        except requests.RequestException:
+            resolved = False
+
+        if resolved:
+            # Queue the payout and hold its amount; submit_payouts sends it
+            try:
+                transaction = payouts.create_payout(request.user, **payout)
+            except payouts.InsufficientBalance:
+                return Response(
+                    {"error": "Insufficient balance"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
 
-            # Save the transaction details
             serializer = TransactionSerializer(transaction)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         else:
@@ -230,3 +277,46 @@ class PayoutView(APIView):
                 {"error": "Account verification failed"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+
+
+class PaystackMetricsView(APIView):
+    """
+    View for the Paystack call counts and latencies of the serving worker.
+    """
+
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        return Response(
+            {
+                "pid": os.getpid(),
+                "endpoints": paystack.metrics(),
+                "account_resolution": account_resolver.metrics(),
+            }
+        )
+
+
+class PaystackWebhookView(APIView):
+    """
+    Endpoint receiving Paystack webhook events. Signed events are recorded
+    and acknowledged immediately; process_paystack_events applies them.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        body = request.body
+        if not events.valid_signature(
+            body, request.headers.get("x-paystack-signature")
+        ):
+            return Response(
+                {"detail": "Invalid signature."}, status=status.HTTP_401_UNAUTHORIZED
+            )
+        try:
+            events.record_event(body)
+        except ValueError:
+            return Response(
+                {"detail": "Invalid payload."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(status=status.HTTP_200_OK)
@@ -1,6 +1,13 @@
 from django.contrib import admin
 
-from .models import Product, SupportTicket, UserRanking, Staff, ShareRequest
+from .models import (
+    Product,
+    SupportTicket,
+    UserRanking,
+    Staff,
+    ShareRequest,
+    ClickEvent,
+)
 
 
 @admin.register(Product)
@@ -11,6 +18,8 @@ class ProductAdmin(admin.ModelAdmin):
 
     list_display = ["product_name", "company", "date_created", "date_updated"]
     list_filter = ["company"]
+    # Maintained by referrals.counters; Product.save() does not write them
+    readonly_fields = Product.COUNTER_FIELDS
 
 
 @admin.register(SupportTicket)
@@ -51,3 +60,14 @@ class ShareRequestAdmin(admin.ModelAdmin):
 
     list_display = ["user", "product", "status"]
     list_filter = ["status"]
+
+
+@admin.register(ClickEvent)
+class ClickEventAdmin(admin.ModelAdmin):
+    """
+    Admin class for the ClickEvent model.
+    """
+
+    list_display = ["product", "sharer", "clicked_at"]
+    date_hierarchy = "clicked_at"
+    readonly_fields = ["product", "sharer", "clicked_at", "referrer"]
@@ -0,0 +1,154 @@
+"""
+Materialized catalogue of the active products.
+
+Each active product has a CatalogueEntry holding its serialized JSON. When a
+product is saved or deleted, or a company renamed (see referrals.signals),
+only the affected entries are re-serialized and the catalogue is marked
+stale. Publishing joins the stored entries, newest first, into one JSON
+document that is cached as bytes together with an ETag derived from its
+content; serving the catalogue is a cache read, and neither the ORM nor a
+serializer is involved.
+
+A stale catalogue is republished by the next read, at most once every
+CATALOGUE_PUBLISH_INTERVAL seconds (default five), so a burst of product
+edits costs one publish instead of one per edit; in between, readers get
+the previous document. The cached document also expires after
+CATALOGUE_CACHE_TTL seconds (default five minutes). The rebuild_catalogue
+management command re-serializes every entry and publishes once.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import CatalogueEntry, Product
+from .serializers import CatalogueProductSerializer
+
+CACHE_KEY = "catalogue:active"
+STALE_KEY = "catalogue:stale"
+PUBLISH_LOCK_KEY = "catalogue:publishing"
+BATCH_SIZE = 500
+
+
+def cache_ttl():
+    return getattr(settings, "CATALOGUE_CACHE_TTL", 60 * 5)
+
+
+def publish_interval():
+    return getattr(settings, "CATALOGUE_PUBLISH_INTERVAL", 5)
+
+
+def _entry(product):
+    payload = json.dumps(
+        CatalogueProductSerializer(product).data,
+        cls=DjangoJSONEncoder,
+        separators=(",", ":"),
+    )
+    return CatalogueEntry(
+        product_id=product.pk, date_created=product.date_created, payload=payload
+    )
+
+
+def _write_entries(products):
+    CatalogueEntry.objects.bulk_create(
+        [_entry(product) for product in products],
+        update_conflicts=True,
+        unique_fields=["product"],
+        update_fields=["date_created", "payload", "updated_at"],
+    )
+
+
+def publish():
+    """
+    Assembles the catalogue from its entries and caches it.
+    Returns (etag, body).
+    """
+    payloads = (
+        CatalogueEntry.objects.order_by("-date_created", "-product_id")
+        .values_list("payload", flat=True)
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    body = b'{"products":[' + ",".join(payloads).encode() + b"]}"
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    cache.set(CACHE_KEY, (etag, body), cache_ttl())
+    return etag, body
+
+
+def mark_stale():
+    # Outlives the cached document, so a stale flag never expires first
+    cache.set(STALE_KEY, True, cache_ttl())
+
+
+def get():
+    """
+    Returns the (etag, body) of the catalogue, publishing it when it is not
+    cached, or when it is stale and was not published within the interval.
+    """
+    cached = cache.get(CACHE_KEY)
+    if cached is not None and not cache.get(STALE_KEY):
+        return cached
+    if cached is None or cache.add(PUBLISH_LOCK_KEY, True, publish_interval()):
+        # Cleared first: an edit made while publishing marks it stale again
+        cache.delete(STALE_KEY)
+        return publish()
+    return cached
+
+
+def refresh_product(product_id):
+    """
+    Re-serializes the entry of one product, removing it when the product is
+    no longer active or was deleted, and marks the catalogue stale.
+    """
+    product = (
+        Product.objects.select_related("company")
+        .filter(pk=product_id, status="active")
+        .first()
+    )
+    if product is None:
+        CatalogueEntry.objects.filter(product_id=product_id).delete()
+    else:
+        _write_entries([product])
+    mark_stale()
+
+
+def refresh_company(company_id):
+    """
+    Re-serializes the entries of the active products of a company, e.g.
+    after it was renamed, and marks the catalogue stale.
+    """
+    products = list(
+        Product.objects.select_related("company").filter(
+            company_id=company_id, status="active"
+        )
+    )
+    if products:
+        _write_entries(products)
+        mark_stale()
+
+
+def rebuild():
+    """
+    Re-serializes the entries of all active products, drops the others and
+    publishes the catalogue. Returns the number of entries.
+    """
+    active = Product.objects.filter(status="active")
+    CatalogueEntry.objects.exclude(product__in=active).delete()
+
+    written, last_pk = 0, None
+    while True:
+        batch = active.select_related("company").order_by("pk")
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        batch = list(batch[:BATCH_SIZE])
+        if not batch:
+            break
+        _write_entries(batch)
+        written += len(batch)
+        last_pk = batch[-1].pk
+
+    cache.delete(STALE_KEY)
+    publish()
+    return written
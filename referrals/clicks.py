@@ -0,0 +1,198 @@
+"""
+Write-behind recording of clicks on product share links.
+
+The redirect view only appends the click to an in-process ClickBuffer and
+answers straight away. A background thread flushes the buffer every
+CLICK_FLUSH_INTERVAL seconds, or as soon as CLICK_FLUSH_SIZE clicks are
+waiting: one traffic increment per product (see referrals.counters) and one
+bulk insert of ClickEvent rows. Clicks still buffered when the worker exits
+are flushed by an atexit hook. If the database is unavailable the clicks are
+kept for the next flush, up to CLICK_BUFFER_LIMIT of them.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections, transaction
+from django.utils import timezone
+
+from . import counters
+from .models import ClickEvent, Product
+from useraccounts.models import CustomUser
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class ClickBuffer:
+    """
+    Thread-safe buffer of (product_id, sharer_id, clicked_at, referrer)
+    tuples with a flushing thread per process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._clicks = []
+        self._wakeup = threading.Event()
+        self._pid = None
+
+    def _ensure_flusher(self):
+        # Started lazily, and again in forked workers, which lose the thread
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(
+                target=self._run, name="click-flusher", daemon=True
+            ).start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(_setting("CLICK_FLUSH_INTERVAL", 5))
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush product clicks")
+            finally:
+                connections.close_all()
+
+    def record(self, product_id, sharer_id, referrer=""):
+        self._ensure_flusher()
+        with self._lock:
+            self._clicks.append((product_id, sharer_id, timezone.now(), referrer))
+            pending = len(self._clicks)
+        if pending >= _setting("CLICK_FLUSH_SIZE", 1000):
+            self._wakeup.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._clicks)
+
+    def _requeue(self, clicks):
+        limit = _setting("CLICK_BUFFER_LIMIT", 100_000)
+        with self._lock:
+            self._clicks[:0] = clicks
+            dropped = len(self._clicks) - limit
+            if dropped > 0:
+                del self._clicks[:dropped]
+        if dropped > 0:
+            logger.error("Dropped %d product clicks that could not be saved", dropped)
+
+    def flush(self):
+        """
+        Writes the buffered clicks. Returns the number of clicks written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                clicks, self._clicks = self._clicks, []
+            if not clicks:
+                return 0
+
+            try:
+                written = self._write(clicks)
+            except DatabaseError:
+                self._requeue(clicks)
+                raise
+            return written
+
+    def _write(self, clicks):
+        # Products or sharers deleted since the click would fail the insert
+        products = set(
+            Product.objects.filter(pk__in={click[0] for click in clicks}).values_list(
+                "pk", flat=True
+            )
+        )
+        sharers = set(
+            CustomUser.objects.filter(
+                pk__in={click[1] for click in clicks}
+            ).values_list("pk", flat=True)
+        )
+        clicks = [click for click in clicks if click[0] in products]
+
+        with transaction.atomic():
+            for product_id, count in Counter(click[0] for click in clicks).items():
+                counters.increment(product_id, "traffic", count)
+            ClickEvent.objects.bulk_create(
+                [
+                    ClickEvent(
+                        product_id=product_id,
+                        sharer_id=sharer_id if sharer_id in sharers else None,
+                        clicked_at=clicked_at,
+                        referrer=referrer[:255],
+                    )
+                    for product_id, sharer_id, clicked_at, referrer in clicks
+                ],
+                batch_size=1000,
+            )
+        return len(clicks)
+
+
+def product_link_key(product_id):
+    return f"product_link:{product_id}"
+
+
+def _target(product_value, link):
+    # Phone and WhatsApp products store a number rather than a URL
+    link = link.strip()
+    if product_value in ("phone", "whatsapp"):
+        number = "".join(char for char in link if char.isdigit())
+        if not number:
+            return ""
+        if product_value == "phone":
+            plus = "+" if link.startswith("+") else ""
+            return f"tel:{plus}{number}"
+        return f"https://wa.me/{number}"
+
+    scheme = urlsplit(link).scheme
+    if link and not scheme:
+        return f"https://{link}"
+    if scheme not in ("http", "https"):
+        return ""
+    return link
+
+
+def product_link(product_id):
+    """
+    Returns the URL an active product's share links redirect to: its
+    http(s) link, a tel: URL for phone products or a wa.me URL for WhatsApp
+    products. Returns None when the product does not exist, is not active or
+    its link is unusable. Cached for PRODUCT_LINK_CACHE_TTL seconds so
+    redirects need no query; saving or deleting the product clears the entry.
+    """
+    key = product_link_key(product_id)
+    link = cache.get(key)
+    if link is None:
+        product = (
+            Product.objects.filter(pk=product_id, status="active")
+            .values_list("product_value", "product_link")
+            .first()
+        )
+        link = _target(*product) if product else ""
+        cache.set(key, link, _setting("PRODUCT_LINK_CACHE_TTL", 300))
+    return link or None
+
+
+click_buffer = ClickBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    if not click_buffer.pending():
+        return
+    try:
+        click_buffer.flush()
+    except Exception:
+        logger.exception("Failed to flush product clicks on exit")
@@ -0,0 +1,188 @@
+"""
+Contention-free counters for Product.shares, traffic and pending_shares.
+
+By default an increment is a single atomic UPDATE ... SET field = field + n
+on the product row. For products hot enough that even that serializes
+writers, PRODUCT_COUNTER_SHARDS > 1 switches to sharded mode: increments go
+to one of N ProductCounterShard rows picked at random, and fold() (see the
+fold_product_counters management command) periodically moves the slot values
+back into the Product fields.
+
+Reads through values() return the Product field plus any unfolded slot
+values, cached for PRODUCT_COUNTER_CACHE_TTL seconds. Since a fold only moves
+counts between the two, a cached total stays correct across folds.
+"""
+
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Greatest
+
+from .models import Product, ProductCounterShard
+
+FIELDS = Product.COUNTER_FIELDS
+CACHE_KEY = "product_counters:{product_id}"
+BATCH_SIZE = 1000
+
+
+def shards():
+    return getattr(settings, "PRODUCT_COUNTER_SHARDS", 1)
+
+
+def cache_ttl():
+    return getattr(settings, "PRODUCT_COUNTER_CACHE_TTL", 10)
+
+
+def _check_field(field):
+    if field not in FIELDS:
+        raise ValueError(f"{field!r} is not a product counter.")
+
+
+def _increment_shard(product_id, field, amount, slot):
+    slots = ProductCounterShard.objects.filter(
+        product_id=product_id, field=field, slot=slot
+    )
+    if slots.update(value=F("value") + amount):
+        return
+    try:
+        with transaction.atomic():
+            ProductCounterShard.objects.create(
+                product_id=product_id, field=field, slot=slot, value=amount
+            )
+    except IntegrityError:
+        # Another writer created the slot first
+        slots.update(value=F("value") + amount)
+
+
+def increment(product_id, field, amount=1):
+    """
+    Adds amount (which may be negative) to a counter of a product without
+    reading it first, so concurrent increments are never lost.
+    """
+    _check_field(field)
+    count = shards()
+    if count > 1:
+        _increment_shard(product_id, field, amount, random.randrange(count))
+        return
+
+    products = Product.objects.filter(pk=product_id)
+    if amount < 0:
+        # The fields are unsigned: never take a counter below zero
+        products = products.filter(**{f"{field}__gte": -amount})
+    products.update(**{field: F(field) + amount})
+
+
+def decrement(product_id, field, amount=1):
+    increment(product_id, field, -amount)
+
+
+def _totals_many(product_ids):
+    totals = {
+        row.pop("pk"): row
+        for row in Product.objects.filter(pk__in=product_ids).values("pk", *FIELDS)
+    }
+    unfolded = (
+        ProductCounterShard.objects.filter(product_id__in=totals)
+        .values("product_id", "field")
+        .annotate(total=Sum("value"))
+        .values_list("product_id", "field", "total")
+    )
+    for product_id, field, total in unfolded:
+        totals[product_id][field] = max(totals[product_id][field] + total, 0)
+    return totals
+
+
+def values(product_id):
+    """
+    Returns {field: value} for the counters of a product, including
+    increments not folded yet, or None when the product does not exist.
+    """
+    return values_many([product_id]).get(product_id)
+
+
+def values_many(product_ids):
+    """
+    Returns {product_id: {field: value}} like values() for many products,
+    with one cache round-trip and one query for the ones not cached.
+    """
+    keys = {
+        CACHE_KEY.format(product_id=product_id): product_id
+        for product_id in product_ids
+    }
+    cached = cache.get_many(keys)
+    totals = {keys[key]: value for key, value in cached.items()}
+    missing = [product_id for key, product_id in keys.items() if key not in cached]
+    if missing:
+        fetched = _totals_many(missing)
+        cache.set_many(
+            {CACHE_KEY.format(product_id=pk): value for pk, value in fetched.items()},
+            cache_ttl(),
+        )
+        totals.update(fetched)
+    return totals
+
+
+def prefetch(products):
+    """
+    Loads the counters of many products at once for current().
+    """
+    if shards() > 1:
+        totals = values_many([product.pk for product in products])
+        for product in products:
+            product._counter_values = totals.get(product.pk, {})
+
+
+def current(product):
+    """
+    Returns {field: value} for the counters of a loaded product. Only
+    sharded mode needs a lookup; otherwise the loaded fields are current.
+    """
+    if shards() > 1:
+        if hasattr(product, "_counter_values"):
+            return product._counter_values
+        return values(product.pk) or {}
+    return {field: getattr(product, field) for field in FIELDS}
+
+
+def fold(batch_size=BATCH_SIZE):
+    """
+    Moves the slot values into the Product fields, a batch of products at a
+    time. Returns the number of products updated.
+    """
+    folded = 0
+    while True:
+        with transaction.atomic():
+            product_ids = list(
+                ProductCounterShard.objects.exclude(value=0)
+                .order_by("product_id")
+                .values_list("product_id", flat=True)
+                .distinct()[:batch_size]
+            )
+            if not product_ids:
+                return folded
+
+            # Locked so increments made meanwhile wait instead of being reset
+            slots = list(
+                ProductCounterShard.objects.select_for_update()
+                .filter(product_id__in=product_ids)
+                .exclude(value=0)
+                .values_list("pk", "product_id", "field", "value")
+            )
+            deltas = {}
+            for _, product_id, field, value in slots:
+                product_deltas = deltas.setdefault(product_id, {})
+                product_deltas[field] = product_deltas.get(field, 0) + value
+            for product_id, product_deltas in deltas.items():
+                Product.objects.filter(pk=product_id).update(
+                    **{
+                        field: Greatest(F(field) + delta, 0)
+                        for field, delta in product_deltas.items()
+                    }
+                )
+            ProductCounterShard.objects.filter(
+                pk__in=[slot[0] for slot in slots]
+            ).update(value=0)
+        folded += len(deltas)
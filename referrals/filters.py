@@ -0,0 +1,38 @@
+import django_filters
+from rest_framework.pagination import CursorPagination
+
+from .models import Product
+
+
+class ProductFilter(django_filters.FilterSet):
+    """
+    Filters for the product list.
+    """
+
+    created_after = django_filters.IsoDateTimeFilter(
+        field_name="date_created", lookup_expr="gte"
+    )
+    created_before = django_filters.IsoDateTimeFilter(
+        field_name="date_created", lookup_expr="lt"
+    )
+    product_value_min = django_filters.CharFilter(
+        field_name="product_value", lookup_expr="gte"
+    )
+    product_value_max = django_filters.CharFilter(
+        field_name="product_value", lookup_expr="lte"
+    )
+
+    class Meta:
+        model = Product
+        fields = ["status", "product_value", "company"]
+
+
+class ProductCursorPagination(CursorPagination):
+    """
+    Newest products first, paged with an opaque cursor.
+    """
+
+    ordering = ("-date_created", "-uuid")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
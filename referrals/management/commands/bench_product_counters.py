@@ -0,0 +1,106 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+from django.test import override_settings
+
+from referrals import counters
+from referrals.models import Product
+from useraccounts.models import CustomUser
+
+BENCH_EMAIL = "counter-bench@example.com"
+
+
+def _naive_increment(product_id):
+    # What the share views used to do: read, add one, write the whole row
+    product = Product.objects.get(pk=product_id)
+    product.shares += 1
+    Product.objects.filter(pk=product_id).update(shares=product.shares)
+
+
+def _counter_increment(product_id):
+    counters.increment(product_id, "shares")
+
+
+class Command(BaseCommand):
+    """
+    Hammers one product's share counter from many threads with the old
+    read-modify-write, the atomic update and the sharded counters, and
+    reports throughput and lost updates for each.
+    """
+
+    help = "Benchmark product share counters under concurrent increments."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument(
+            "--increments", type=int, default=200, help="Increments per thread."
+        )
+        parser.add_argument(
+            "--shards", type=int, default=16, help="Slots used in sharded mode."
+        )
+
+    def _run(self, product_id, increment, threads, increments):
+        errors = 0
+        barrier = threading.Barrier(threads)
+
+        def work():
+            nonlocal errors
+            barrier.wait()
+            try:
+                for _ in range(increments):
+                    try:
+                        increment(product_id)
+                    except OperationalError:
+                        # e.g. SQLite's "database is locked"
+                        errors += 1
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=work) for _ in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return time.perf_counter() - started, errors
+
+    def handle(self, *args, **options):
+        threads, increments = options["threads"], options["increments"]
+        company, _ = CustomUser.objects.get_or_create(
+            email=BENCH_EMAIL,
+            defaults={"name": "Counter Bench", "user_type": "company"},
+        )
+        modes = {
+            "read-modify-write": (_naive_increment, 1),
+            "atomic update": (_counter_increment, 1),
+            f"sharded ({options['shards']} slots)": (
+                _counter_increment,
+                options["shards"],
+            ),
+        }
+        try:
+            for name, (increment, shards) in modes.items():
+                product = Product.objects.create(
+                    product_name="Counter bench",
+                    company=company,
+                    description="",
+                    product_link="https://example.com",
+                )
+                with override_settings(PRODUCT_COUNTER_SHARDS=shards):
+                    elapsed, errors = self._run(
+                        product.pk, increment, threads, increments
+                    )
+                    counters.fold()
+                counted = Product.objects.values_list("shares", flat=True).get(
+                    pk=product.pk
+                )
+                attempted = threads * increments - errors
+                self.stdout.write(
+                    f"{name}: {threads * increments / elapsed:.0f} increments/s, "
+                    f"{attempted - counted} lost of {attempted}, {errors} errors"
+                )
+        finally:
+            Product.objects.filter(company=company).delete()
+            company.delete()
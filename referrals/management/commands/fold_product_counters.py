@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from referrals import counters
+
+
+class Command(BaseCommand):
+    """
+    Folds sharded product counter slots back into the Product fields.
+    """
+
+    help = (
+        "Fold sharded product counters into Product.shares, traffic and pending_shares."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=counters.BATCH_SIZE)
+        parser.add_argument(
+            "--follow",
+            action="store_true",
+            help="Keep running and fold every --interval seconds.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=60,
+            help="Seconds to wait between folds when --follow is set.",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            total += counters.fold(batch_size=options["batch_size"])
+            if not options["follow"]:
+                break
+            time.sleep(options["interval"])
+        self.stdout.write(self.style.SUCCESS(f"Folded counters of {total} products."))
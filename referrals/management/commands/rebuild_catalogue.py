@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from referrals import catalogue
+
+
+class Command(BaseCommand):
+    """
+    Re-serializes the catalogue entries of all active products.
+    """
+
+    help = "Rebuild the materialized catalogue of active products."
+
+    def handle(self, *args, **options):
+        written = catalogue.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f"Catalogue rebuilt with {written} products.")
+        )
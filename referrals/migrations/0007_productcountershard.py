@@ -0,0 +1,59 @@
+# Generated by Django 5.0.8 on 2026-10-17 07:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("referrals", "0006_sharerequest"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductCounterShard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "field",
+                    models.CharField(
+                        choices=[
+                            ("shares", "shares"),
+                            ("traffic", "traffic"),
+                            ("pending_shares", "pending_shares"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("slot", models.PositiveSmallIntegerField()),
+                ("value", models.BigIntegerField(default=0)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="counter_shards",
+                        to="referrals.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Product Counter Shard",
+                "verbose_name_plural": "Product Counter Shards",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="productcountershard",
+            constraint=models.UniqueConstraint(
+                fields=("product", "field", "slot"), name="unique_product_counter_slot"
+            ),
+        ),
+    ]
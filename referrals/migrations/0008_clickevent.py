@@ -0,0 +1,59 @@
+# Generated by Django 5.0.8 on 2026-10-17 07:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("referrals", "0007_productcountershard"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ClickEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("clicked_at", models.DateTimeField()),
+                ("referrer", models.CharField(blank=True, max_length=255)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="click_events",
+                        to="referrals.product",
+                    ),
+                ),
+                (
+                    "sharer",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Click Event",
+                "verbose_name_plural": "Click Events",
+                "indexes": [
+                    models.Index(
+                        fields=["product", "clicked_at"],
+                        name="click_event_product_time",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.8 on 2026-10-17 07:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("referrals", "0009_sharerequest_moderation"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["status", "date_created"], name="product_status_created"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["company", "status"], name="product_company_status"
+            ),
+        ),
+    ]
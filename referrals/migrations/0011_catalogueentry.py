@@ -0,0 +1,36 @@
+# Generated by Django 5.0.8 on 2026-10-17 07:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("referrals", "0010_product_listing_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CatalogueEntry",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="catalogue_entry",
+                        serialize=False,
+                        to="referrals.product",
+                    ),
+                ),
+                ("date_created", models.DateTimeField(db_index=True)),
+                ("payload", models.TextField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Catalogue Entry",
+                "verbose_name_plural": "Catalogue Entries",
+            },
+        ),
+    ]
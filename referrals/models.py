@@ -49,6 +49,9 @@ class Product(models.Model):
     )
     pending_shares = models.PositiveIntegerField(default=0)
 
+    # Maintained by referrals.counters with atomic updates only
+    COUNTER_FIELDS = ("shares", "traffic", "pending_shares")
+
     class Meta:
         """
         Meta class for the Product model.
@@ -56,6 +59,50 @@ class Product(models.Model):
 
         verbose_name = "Product"
         verbose_name_plural = "Products"
+        indexes = [
+            models.Index(
+                fields=["status", "date_created"], name="product_status_created"
+            ),
+            models.Index(fields=["company", "status"], name="product_company_status"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded counters so save() can refuse to overwrite them
+        instance._loaded_counters = instance._counters()
+        return instance
+
+    def _counters(self):
+        return {field: self.__dict__.get(field) for field in self.COUNTER_FIELDS}
+
+    def save(self, *args, **kwargs):
+        """
+        Save the product without writing back the counters, whose loaded
+        values may be stale by the time the product is saved. Counters are
+        changed through referrals.counters; saving a product whose counters
+        were modified raises ValueError instead of dropping the change.
+        """
+        if not self._state.adding:
+            update_fields = kwargs.get("update_fields")
+            changed = [
+                field
+                for field, value in self._counters().items()
+                if value != getattr(self, "_loaded_counters", {}).get(field, value)
+            ]
+            if changed or set(update_fields or ()) & set(self.COUNTER_FIELDS):
+                raise ValueError(
+                    "Product counters are changed with referrals.counters, "
+                    "not by saving the product."
+                )
+            if update_fields is None:
+                kwargs["update_fields"] = [
+                    field.name
+                    for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name not in self.COUNTER_FIELDS
+                ]
+        super().save(*args, **kwargs)
+        self._loaded_counters = self._counters()
 
     def __str__(self):
         """
@@ -67,6 +114,60 @@ class Product(models.Model):
         return self.product_name
 
 
+class CatalogueEntry(models.Model):
+    """
+    Pre-serialized JSON of an active product, maintained by
+    referrals.catalogue.
+    """
+
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="catalogue_entry",
+    )
+    date_created = models.DateTimeField(db_index=True)
+    payload = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Catalogue Entry"
+        verbose_name_plural = "Catalogue Entries"
+
+    def __str__(self):
+        return f"Catalogue entry of {self.product_id}"
+
+
+class ProductCounterShard(models.Model):
+    """
+    One slot of a sharded product counter. Increments land on a random slot,
+    so concurrent writers rarely contend for the same row; the slot values
+    are folded back into the Product field periodically.
+    """
+
+    FIELD_CHOICES = [(field, field) for field in Product.COUNTER_FIELDS]
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="counter_shards"
+    )
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    slot = models.PositiveSmallIntegerField()
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Product Counter Shard"
+        verbose_name_plural = "Product Counter Shards"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "field", "slot"],
+                name="unique_product_counter_slot",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} {self.field}[{self.slot}] = {self.value}"
+
+
 class SupportTicket(models.Model):
     """
     A model representing a support ticket.
@@ -339,6 +440,14 @@ class ShareRequest(models.Model):
         ("rejected", "Rejected"),
     ]
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    moderated_by = models.ForeignKey(
+        get_user_model(),
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="moderated_share_requests",
+    )
+    moderated_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         verbose_name = "Share Request"
@@ -346,3 +455,30 @@ class ShareRequest(models.Model):
 
     def __str__(self):
         return f"{self.user.name} - {self.product.product_name} - {self.status}"
+
+
+class ClickEvent(models.Model):
+    """
+    A click on a product share link. Written in batches by referrals.clicks.
+    """
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="click_events"
+    )
+    sharer = models.ForeignKey(
+        get_user_model(), null=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    clicked_at = models.DateTimeField()
+    referrer = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        verbose_name = "Click Event"
+        verbose_name_plural = "Click Events"
+        indexes = [
+            models.Index(
+                fields=["product", "clicked_at"], name="click_event_product_time"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} via {self.sharer_id} at {self.clicked_at}"
@@ -1,9 +1,20 @@
+from urllib.parse import urljoin
+
+from django.conf import settings
 from rest_framework import serializers
+from . import counters, shares
 from .models import Product, SupportTicket, UserRanking, Staff, TicketReply
 from useraccounts.models import CustomUser
 from uuid import UUID
 
 
+class ProductListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        products = list(data.all() if hasattr(data, "all") else data)
+        counters.prefetch(products)
+        return super().to_representation(products)
+
+
 class ProductSerializer(serializers.ModelSerializer):
     """
     Serializer for the Product model.
@@ -14,7 +25,8 @@ class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = "__all__"
-        read_only_fields = ("company",)
+        read_only_fields = ("company",) + Product.COUNTER_FIELDS
+        list_serializer_class = ProductListSerializer
 
     def get_company_name(self, obj):
         """
@@ -22,6 +34,11 @@ class ProductSerializer(serializers.ModelSerializer):
         """
         return obj.company.name if obj.company else None
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data.update(counters.current(instance))
+        return data
+
     def validate(self, data):
         """
         Validates the data provided in the request.
@@ -38,6 +55,24 @@ class ProductSerializer(serializers.ModelSerializer):
         return data
 
 
+class CatalogueProductSerializer(ProductSerializer):
+    """
+    Serializer for products in the active catalogue. The counters change too
+    often to be part of a snapshot and are left out. Entries are serialized
+    outside a request, so image URLs are made absolute with SITE_URL.
+    """
+
+    class Meta(ProductSerializer.Meta):
+        fields = None
+        exclude = Product.COUNTER_FIELDS
+
+    def to_representation(self, instance):
+        data = serializers.ModelSerializer.to_representation(self, instance)
+        if data.get("product_image"):
+            data["product_image"] = urljoin(settings.SITE_URL, data["product_image"])
+        return data
+
+
 class SupportTicketReplySerializer(serializers.ModelSerializer):
     """
     Serializer for the SupportTicketReply model.
@@ -190,3 +225,14 @@ class StaffSerializer(serializers.ModelSerializer):
         instance.user.save()
 
         return super().update(instance, validated_data)
+
+
+class ShareModerationSerializer(serializers.Serializer):
+    """
+    Serializer for moderating share requests in bulk.
+    """
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), min_length=1, max_length=shares.MAX_BATCH
+    )
+    action = serializers.ChoiceField(choices=list(shares.ACTIONS))
@@ -0,0 +1,120 @@
+"""
+Moderation of share requests in batches.
+
+The pending requests among a batch are locked with SELECT ... FOR UPDATE and
+exactly those rows are transitioned, so two moderators acting on the same
+request at once cannot both transition it: the second one finds it no longer
+pending once the first commits. Product counters are then incremented once per product and the Promote and Earn bonuses of the
+approved sharers are written with bulk_create/bulk_update.
+"""
+
+from collections import Counter
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from useraccounts import earnings
+from useraccounts.models import IndividualProfile, UserEarnings
+from useraccounts.registry import earnings_types
+
+from . import counters
+from .models import ShareRequest
+
+BONUS_NAME = "Promote and Earn Bonus"
+BONUS_AMOUNT = Decimal("1000.00")
+MAX_BATCH = 1000
+
+ACTIONS = {"approve": "approved", "reject": "rejected"}
+
+
+def _award_bonuses(approved):
+    """
+    Sets the Promote and Earn bonus of the sharers of the approved requests,
+    given as (user_id, product_name) pairs in request order. Returns the ids
+    of the users whose bonus was written.
+    """
+    descriptions = {
+        user_id: f"{BONUS_NAME} for sharing {product_name}"
+        for user_id, product_name in approved
+    }
+    # Only sharers with an individual profile earn the bonus
+    profile_ids = set(
+        IndividualProfile.objects.filter(pk__in=descriptions).values_list(
+            "pk", flat=True
+        )
+    )
+    bonus_type = earnings_types.get_or_create(BONUS_NAME)
+
+    existing = list(
+        UserEarnings.objects.filter(
+            individual_profile_id__in=profile_ids, earnings_type=bonus_type
+        )
+    )
+    changed = []
+    for bonus in existing:
+        previous = bonus.rollup_values()
+        bonus.amount = BONUS_AMOUNT
+        bonus.description = descriptions[bonus.individual_profile_id]
+        changed.append((previous, bonus))
+    UserEarnings.objects.bulk_update(existing, ["amount", "description"])
+
+    has_bonus = {bonus.individual_profile_id for bonus in existing}
+    created = UserEarnings.objects.bulk_create(
+        [
+            UserEarnings(
+                individual_profile_id=profile_id,
+                earnings_type=bonus_type,
+                amount=BONUS_AMOUNT,
+                description=descriptions[profile_id],
+            )
+            for profile_id in profile_ids - has_bonus
+        ]
+    )
+    changed.extend((None, bonus) for bonus in created)
+
+    # bulk writes skip the signals that maintain the earnings rollup
+    for previous, bonus in changed:
+        earnings.apply_earning_change(previous, bonus.rollup_values())
+    return profile_ids
+
+
+def moderate(share_request_ids, action, moderator):
+    """
+    Approves or rejects the pending share requests among the given ids.
+    Returns {"transitioned": [...], "skipped": [...], "bonuses": n} where
+    skipped lists the ids that were not pending or do not exist.
+    """
+    status = ACTIONS[action]
+    ids = list(dict.fromkeys(share_request_ids))
+    now = timezone.now()
+
+    with transaction.atomic():
+        transitioned = list(
+            ShareRequest.objects.select_for_update(of=("self",))
+            .filter(pk__in=ids, status="pending")
+            .order_by("pk")
+            .values_list("pk", "user_id", "product_id", "product__product_name")
+        )
+        ShareRequest.objects.filter(pk__in=[pk for pk, _, _, _ in transitioned]).update(
+            status=status, moderated_by=moderator, moderated_at=now
+        )
+
+        per_product = Counter(product_id for _, _, product_id, _ in transitioned)
+        for product_id, count in per_product.items():
+            counters.decrement(product_id, "pending_shares", count)
+            if status == "approved":
+                counters.increment(product_id, "shares", count)
+
+        rewarded = set()
+        if status == "approved" and transitioned:
+            rewarded = _award_bonuses(
+                [(user_id, name) for _, user_id, _, name in transitioned]
+            )
+
+    moved = {pk for pk, _, _, _ in transitioned}
+    return {
+        "transitioned": [pk for pk in ids if pk in moved],
+        "skipped": [pk for pk in ids if pk not in moved],
+        "bonuses": len(rewarded),
+    }
@@ -0,0 +1,36 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import catalogue, clicks
+from .models import Product
+from useraccounts.models import CustomUser
+
+
+def _product_changed(product_id):
+    catalogue.refresh_product(product_id)
+    cache.delete(clicks.product_link_key(product_id))
+
+
+@receiver(post_save, sender=Product)
+def refresh_catalogue_on_save(sender, instance, raw, **kwargs):
+    if raw:
+        # Fixtures are picked up by the rebuild_catalogue command
+        return
+    transaction.on_commit(lambda: _product_changed(instance.pk))
+
+
+@receiver(post_delete, sender=Product)
+def refresh_catalogue_on_delete(sender, instance, **kwargs):
+    transaction.on_commit(lambda: _product_changed(instance.pk))
+
+
+@receiver(post_save, sender=CustomUser)
+def refresh_catalogue_on_company_rename(sender, instance, raw, update_fields, **kwargs):
+    # Catalogue entries embed the company name
+    if raw or instance.user_type != "company":
+        return
+    if update_fields is not None and "name" not in update_fields:
+        return
+    transaction.on_commit(lambda: catalogue.refresh_company(instance.pk))
@@ -1,3 +1,374 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import catalogue, clicks, counters, shares
+from .models import Product, ProductCounterShard, ShareRequest
+from useraccounts.models import CustomUser, IndividualProfile, UserEarnings
+
+
+class ProductRedirectTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.company = CustomUser.objects.create_user(
+            "company@example.com", "password", name="Company", user_type="company"
+        )
+        record = mock.patch.object(clicks.click_buffer, "record")
+        self.record = record.start()
+        self.addCleanup(record.stop)
+
+    def create_product(self, link, product_value="website", status="active"):
+        return Product.objects.create(
+            product_name="Product",
+            company=self.company,
+            description="",
+            product_value=product_value,
+            product_link=link,
+            status=status,
+        )
+
+    def redirect(self, product):
+        return self.client.get(
+            reverse("product-redirect", args=[product.pk, self.company.pk])
+        )
+
+    def assertRedirectsTo(self, product, url):
+        response = self.redirect(product)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response["Location"], url)
+
+    def test_website_links_get_a_scheme(self):
+        self.assertRedirectsTo(
+            self.create_product("example.com/shop"), "https://example.com/shop"
+        )
+
+    def test_phone_numbers_redirect_to_tel(self):
+        self.assertRedirectsTo(
+            self.create_product("+234 801 234 5678", "phone"), "tel:+2348012345678"
+        )
+
+    def test_whatsapp_numbers_redirect_to_wa_me(self):
+        self.assertRedirectsTo(
+            self.create_product("+234 801-234-5678", "whatsapp"),
+            "https://wa.me/2348012345678",
+        )
+
+    def test_unusable_links_are_not_found(self):
+        for product in (
+            self.create_product("javascript:alert(1)"),
+            self.create_product("no number", "phone"),
+        ):
+            self.assertEqual(self.redirect(product).status_code, 404)
+        self.record.assert_not_called()
+
+    def test_inactive_products_are_not_found(self):
+        for status in ("pending", "declined"):
+            product = self.create_product("https://example.com", status=status)
+            self.assertEqual(self.redirect(product).status_code, 404)
+        self.record.assert_not_called()
+
+    def test_saving_a_product_clears_its_cached_link(self):
+        product = self.create_product("https://example.com/old")
+        self.assertRedirectsTo(product, "https://example.com/old")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.product_link = "https://example.com/new"
+            product.save()
+        self.assertRedirectsTo(product, "https://example.com/new")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.status = "declined"
+            product.save()
+        self.assertEqual(self.redirect(product).status_code, 404)
+
+
+class ShareModerationTests(TestCase):
+    def setUp(self):
+        company = CustomUser.objects.create_user(
+            "company@example.com", "password", name="Company", user_type="company"
+        )
+        self.admin = CustomUser.objects.create_user(
+            "admin@example.com", "password", name="Admin", user_type="admin"
+        )
+        self.sharer = CustomUser.objects.create_user(
+            "sharer@example.com", "password", name="Sharer", user_type="individual"
+        )
+        IndividualProfile.objects.create(user=self.sharer, gender="female")
+        self.product = Product.objects.create(
+            product_name="Product",
+            company=company,
+            description="",
+            product_link="https://example.com",
+            status="active",
+            pending_shares=2,
+        )
+        self.share_requests = [
+            ShareRequest.objects.create(user=self.sharer, product=self.product)
+            for _ in range(2)
+        ]
+        self.client = APIClient()
+
+    def approve(self, user, share_request):
+        self.client.force_authenticate(user)
+        return self.client.post(
+            reverse("share-approval"),
+            {"share_request_id": share_request.pk, "action": "approve"},
+            format="json",
+        )
+
+    def counters(self):
+        return Product.objects.values("shares", "pending_shares").get(
+            pk=self.product.pk
+        )
+
+    def test_only_admins_approve(self):
+        response = self.approve(self.sharer, self.share_requests[0])
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(ShareRequest.objects.filter(status="pending").count(), 2)
+        self.assertFalse(UserEarnings.objects.exists())
+
+    def test_approval_transitions_once(self):
+        self.assertEqual(
+            self.approve(self.admin, self.share_requests[0]).status_code, 200
+        )
+        self.assertEqual(
+            self.approve(self.admin, self.share_requests[0]).status_code, 409
+        )
+
+        self.assertEqual(self.counters(), {"shares": 1, "pending_shares": 1})
+        self.assertEqual(UserEarnings.objects.get().amount, shares.BONUS_AMOUNT)
+
+    def test_batches_stamped_at_the_same_time_stay_apart(self):
+        first, second = (share_request.pk for share_request in self.share_requests)
+        now = timezone.now()
+
+        with mock.patch("referrals.shares.timezone.now", return_value=now):
+            shares.moderate([first], "approve", self.admin)
+            result = shares.moderate([first, second], "approve", self.admin)
+
+        self.assertEqual(result["transitioned"], [second])
+        self.assertEqual(result["skipped"], [first])
+        self.assertEqual(self.counters(), {"shares": 2, "pending_shares": 0})
+
+
+@override_settings(SITE_URL="https://api.example.com")
+class CatalogueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.company = CustomUser.objects.create_user(
+            "company@example.com", "password", name="Company", user_type="company"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.company)
+
+    def create_product(self, name, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Product.objects.create(
+                product_name=name,
+                company=self.company,
+                description="",
+                product_link="https://example.com",
+                status="active",
+                **fields,
+            )
+
+    def products(self):
+        return json.loads(catalogue.get()[1])["products"]
+
+    def test_unchanged_catalogue_is_not_modified(self):
+        self.create_product("Product")
+        response = self.client.get(reverse("catalogue"))
+        self.assertEqual(response.status_code, 200)
+
+        revalidated = self.client.get(
+            reverse("catalogue"), HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated["ETag"], response["ETag"])
+
+    def test_edits_are_published_once_per_interval(self):
+        product = self.create_product("Old name")
+        catalogue.get()
+
+        with mock.patch.object(
+            catalogue, "publish", wraps=catalogue.publish
+        ) as publish:
+            for name in ("New name", "Newer name"):
+                with self.captureOnCommitCallbacks(execute=True):
+                    product.product_name = name
+                    product.save()
+            self.assertEqual(self.products()[0]["product_name"], "Newer name")
+
+            with self.captureOnCommitCallbacks(execute=True):
+                product.status = "declined"
+                product.save()
+            # Published within the interval: the previous document is served
+            self.assertEqual(len(self.products()), 1)
+
+        self.assertEqual(publish.call_count, 1)
+        cache.delete(catalogue.PUBLISH_LOCK_KEY)
+        self.assertEqual(self.products(), [])
+
+    def test_image_urls_are_absolute(self):
+        self.create_product("Product", product_image="product_images/product.png")
+
+        self.assertEqual(
+            self.products()[0]["product_image"],
+            "https://api.example.com/media/product_images/product.png",
+        )
+
+    def test_company_rename_reaches_the_catalogue(self):
+        self.create_product("Product")
+        catalogue.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.company.name = "Renamed"
+            self.company.save()
+
+        self.assertEqual(self.products()[0]["company_name"], "Renamed")
+
+
+class ProductCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        company = CustomUser.objects.create_user(
+            "company@example.com", "password", name="Company", user_type="company"
+        )
+        self.product = Product.objects.create(
+            product_name="Product",
+            company=company,
+            description="",
+            product_link="https://example.com",
+        )
+
+    def stored(self):
+        return Product.objects.values(*Product.COUNTER_FIELDS).get(pk=self.product.pk)
+
+    def test_increments_are_applied_in_the_database(self):
+        counters.increment(self.product.pk, "shares", 3)
+        counters.decrement(self.product.pk, "shares")
+        # Never below zero
+        counters.decrement(self.product.pk, "traffic")
+
+        self.assertEqual(
+            self.stored(), {"shares": 2, "traffic": 0, "pending_shares": 0}
+        )
+
+    def test_unknown_fields_are_refused(self):
+        with self.assertRaises(ValueError):
+            counters.increment(self.product.pk, "product_name")
+
+    @override_settings(PRODUCT_COUNTER_SHARDS=4, PRODUCT_COUNTER_CACHE_TTL=0)
+    def test_sharded_increments_are_folded(self):
+        for _ in range(10):
+            counters.increment(self.product.pk, "traffic")
+        counters.decrement(self.product.pk, "traffic", 2)
+
+        self.assertEqual(self.stored()["traffic"], 0)
+        self.assertEqual(counters.values(self.product.pk)["traffic"], 8)
+
+        self.assertEqual(counters.fold(), 1)
+
+        self.assertEqual(self.stored()["traffic"], 8)
+        self.assertEqual(counters.values(self.product.pk)["traffic"], 8)
+        self.assertFalse(ProductCounterShard.objects.exclude(value=0).exists())
+
+    def test_saving_a_product_keeps_concurrent_increments(self):
+        product = Product.objects.get(pk=self.product.pk)
+        counters.increment(self.product.pk, "shares", 5)
+
+        product.product_name = "Renamed"
+        product.save()
+
+        self.assertEqual(self.stored()["shares"], 5)
+
+    def test_saving_modified_counters_is_refused(self):
+        product = Product.objects.get(pk=self.product.pk)
+        product.shares = 10
+
+        with self.assertRaises(ValueError):
+            product.save()
+        with self.assertRaises(ValueError):
+            product.save(update_fields=["shares"])
+        self.assertEqual(self.stored()["shares"], 0)
+
+
+class ProductListTests(TestCase):
+    def setUp(self):
+        self.company = CustomUser.objects.create_user(
+            "company@example.com", "password", name="Company", user_type="company"
+        )
+        self.member = CustomUser.objects.create_user(
+            "member@example.com", "password", name="Member", user_type="individual"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+
+    def create_product(self, name, status="active", product_value="website"):
+        return Product.objects.create(
+            product_name=name,
+            company=self.company,
+            description="",
+            product_value=product_value,
+            product_link="https://example.com",
+            status=status,
+        )
+
+    def names(self, **params):
+        response = self.client.get(reverse("product-list"), params)
+        self.assertEqual(response.status_code, 200)
+        return [product["product_name"] for product in response.data["results"]]
+
+    def test_regular_users_only_see_active_products(self):
+        self.create_product("Active")
+        pending = self.create_product("Pending", status="pending")
+
+        self.assertEqual(self.names(), ["Active"])
+        self.assertEqual(self.names(status="pending"), [])
+        response = self.client.get(reverse("product-detail", args=[pending.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_pages_follow_the_cursor(self):
+        for i in range(3):
+            self.create_product(f"Product {i}")
+
+        response = self.client.get(reverse("product-list"), {"page_size": 2})
+        first = [product["product_name"] for product in response.data["results"]]
+        response = self.client.get(response.data["next"])
+        second = [product["product_name"] for product in response.data["results"]]
+
+        self.assertEqual(first, ["Product 2", "Product 1"])
+        self.assertEqual(second, ["Product 0"])
+        self.assertIsNone(response.data["next"])
+
+    def test_listing_does_not_query_per_product(self):
+        for i in range(5):
+            self.create_product(f"Product {i}")
+        self.names()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.names()), 5)
+
+    def test_filters(self):
+        old = self.create_product("Old", product_value="phone")
+        self.create_product("New", product_value="website")
+        self.create_product("Chat", product_value="whatsapp")
+        Product.objects.filter(pk=old.pk).update(
+            date_created=timezone.now() - timedelta(days=30)
+        )
+        week_ago = (timezone.now() - timedelta(days=7)).isoformat()
+
+        self.assertEqual(self.names(created_before=week_ago), ["Old"])
+        self.assertEqual(self.names(created_after=week_ago), ["Chat", "New"])
+        self.assertEqual(self.names(product_value="phone"), ["Old"])
+        self.assertEqual(self.names(product_value_min="website"), ["Chat", "New"])
+        self.assertEqual(self.names(product_value_max="website"), ["New", "Old"])
+        self.assertEqual(self.names(company=self.member.pk), [])
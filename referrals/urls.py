@@ -11,6 +11,10 @@ from .views import (
     ShareProductView,
     ShareRequestView,
     ShareApprovalView,
+    ShareModerationView,
+    DownlineStatsView,
+    LeaderboardView,
+    CatalogueView,
 )
 
 router = DefaultRouter()
@@ -33,4 +37,12 @@ urlpatterns = [
     path("product/share/", ShareProductView.as_view(), name="share-product"),
     path("product/share-request/", ShareRequestView.as_view(), name="share-request"),
     path("product/share-approval/", ShareApprovalView.as_view(), name="share-approval"),
+    path(
+        "product/share-requests/moderate/",
+        ShareModerationView.as_view(),
+        name="share-moderation",
+    ),
+    path("downline/stats/", DownlineStatsView.as_view(), name="downline-stats"),
+    path("leaderboard/<str:board>/", LeaderboardView.as_view(), name="leaderboard"),
+    path("catalogue/", CatalogueView.as_view(), name="catalogue"),
 ]
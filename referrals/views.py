@@ -3,12 +3,16 @@ from decimal import Decimal
 import requests
 import logging
 from rest_framework.decorators import action
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.filters import OrderingFilter
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.generics import GenericAPIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 
+from . import catalogue, clicks, counters, shares
+from .filters import ProductCursorPagination, ProductFilter
 from .permissions import IsCompanyOrAdmin, IsAdmin
 from .models import (
     Product,
@@ -25,11 +29,24 @@ from .serializers import (
     VerifyAccountSerializer,
     StaffSerializer,
     SupportTicketReplySerializer,
+    ShareModerationSerializer,
 )
 from rest_framework import permissions
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from useraccounts.models import IndividualProfile, UserEarnings
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    HttpResponseRedirect,
+)
+from django.utils.http import parse_etags
+from django.views import View
+from payments.banks import BankDirectoryUnavailable, bank_directory
+from payments.resolution import account_resolver
+from useraccounts import genealogy, leaderboards
+from useraccounts.models import CustomUser, IndividualProfile, UserEarnings
+from useraccounts.registry import earnings_types
 from useraccounts.serializers import IndividualProfileSerializer
 
 logger = logging.getLogger(__name__)
@@ -40,9 +57,12 @@ class ProductViewSet(viewsets.ModelViewSet):
     ViewSet for the Product model.
     """
 
-    queryset = Product.objects.all()
+    queryset = Product.objects.select_related("company")
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = ProductFilter
+    pagination_class = ProductCursorPagination
 
     def get_permissions(self):
         if self.action in ["create", "update", "partial_update", "destroy"]:
@@ -53,12 +73,14 @@ class ProductViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
+        products = Product.objects.select_related("company")
         if user.user_type == "admin":
-            return Product.objects.all()
+            return products
         elif user.user_type == "company":
-            return Product.objects.filter(company=user)
+            return products.filter(company=user)
         else:
-            return Product.objects.all()  # Regular users can view all products
+            # Regular users only ever see active products, whatever they ask
+            return products.filter(status="active")
 
     def perform_create(self, serializer):
         serializer.save(company=self.request.user)
@@ -164,39 +186,40 @@ class VerifyAccountView(GenericAPIView):
         account_number = serializer.validated_data.get("account_number")
         bank_code = serializer.validated_data.get("bank_code")
 
-        # Replace with your actual Bearer token and API URL
-        headers = {
-            "Authorization": "Bearer Your_Bearer_Token",
-        }
-
-        params = {
-            "account_number": account_number,
-            "bank_code": bank_code,
-        }
-
         try:
-            response = requests.get(
-                "http://nubapi.test/api/verify", headers=headers, params=params
-            )
-            response.raise_for_status()  # Raises an HTTPError for bad responses
-            data = response.json()
-
-            return Response(
-                {
-                    "account_name": data["account_name"],
-                    "first_name": data["first_name"],
-                    "last_name": data["last_name"],
-                    "other_name": data["other_name"],
-                    "account_number": data["account_number"],
-                    "bank_code": data["bank_code"],
-                    "bank_name": data["Bank_name"],
-                }
-            )
+            resolution = account_resolver.resolve(bank_code, account_number)
         except requests.RequestException as e:
+            return Response({"error": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+
+        if not resolution.resolved:
             return Response(
-                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {"error": resolution.data.get("message", "Account not found.")},
+                status=(
+                    status.HTTP_400_BAD_REQUEST
+                    if resolution.not_found
+                    else status.HTTP_502_BAD_GATEWAY
+                ),
             )
 
+        try:
+            bank = bank_directory.by_code(bank_code) or {}
+        except BankDirectoryUnavailable:
+            bank = {}
+
+        # Paystack returns the name as one string, e.g. "DOE JOHN ADA"
+        names = resolution.account_name.split()
+        return Response(
+            {
+                "account_name": resolution.account_name,
+                "first_name": names[1] if len(names) > 1 else "",
+                "last_name": names[0] if names else "",
+                "other_name": " ".join(names[2:]),
+                "account_number": account_number,
+                "bank_code": bank_code,
+                "bank_name": bank.get("name", ""),
+            }
+        )
+
 
 class StaffViewSet(viewsets.ModelViewSet):
     """
@@ -237,12 +260,86 @@ class ReferralIndividualProfileViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = IndividualProfile.objects.all()
     serializer_class = IndividualProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [OrderingFilter]
+    ordering_fields = ["total_earnings", "approved_referrals", "rank"]
 
     def get_queryset(self):
         user = self.request.user
+        profiles = IndividualProfile.objects.select_related("user")
         if user.user_type == "admin":
-            return IndividualProfile.objects.all()
-        return IndividualProfile.objects.filter(user=user)
+            return profiles.all()
+        return profiles.filter(user=user)
+
+
+class DownlineStatsView(APIView):
+    """
+    View for the per-level size and status breakdown of a referral network.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Returns the downline statistics of the caller, or of the user given
+        by the user_id query parameter when the caller is an admin.
+        """
+        user_id = request.query_params.get("user_id")
+        if user_id is None:
+            user_id = request.user.id
+        elif request.user.user_type != "admin":
+            return Response(
+                {"error": "Only admins can view another user's network"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        else:
+            try:
+                user_id = int(user_id)
+            except ValueError:
+                return Response(
+                    {"error": "Invalid user_id"}, status=status.HTTP_400_BAD_REQUEST
+                )
+            if not CustomUser.objects.filter(pk=user_id).exists():
+                return Response(
+                    {"error": "User not found"}, status=status.HTTP_404_NOT_FOUND
+                )
+
+        return Response(genealogy.downline_stats(user_id))
+
+
+class LeaderboardView(APIView):
+    """
+    View for the precomputed top recruiters and top earners leaderboards.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, board, *args, **kwargs):
+        """
+        Returns the top of the board for the current period (week, month or
+        all, given by the period query parameter), when that top list was
+        computed, and the caller's current position.
+        """
+        if board not in leaderboards.BOARDS:
+            return Response(
+                {"error": "Leaderboard not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        period = request.query_params.get("period", "week")
+        if period not in leaderboards.PERIODS:
+            return Response(
+                {"error": "Invalid period"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        top = leaderboards.top(board, period)
+        return Response(
+            {
+                "board": board,
+                "period": period,
+                "period_key": leaderboards.period_key(period),
+                "top": top["rows"],
+                "top_refreshed_at": top["refreshed_at"],
+                "me": leaderboards.position(board, period, request.user.id),
+            }
+        )
 
 
 class ShareProductView(APIView):
@@ -257,9 +354,7 @@ class ShareProductView(APIView):
         except Product.DoesNotExist:
             return Response({"error": "Product not found"}, status=404)
 
-        # Update the number of shares
-        product.shares += 1
-        product.save()
+        counters.increment(product.pk, "shares")
 
         # Calculate the bonus
         bonus_amount = Decimal("1000.00")
@@ -268,7 +363,7 @@ class ShareProductView(APIView):
         individual_profile = IndividualProfile.objects.get(user=user)
         UserEarnings.objects.update_or_create(
             individual_profile=individual_profile,
-            earnings_type="promote_and_earn_bonus",
+            earnings_type=earnings_types.get_or_create("Promote and Earn Bonus"),
             defaults={
                 "amount": bonus_amount,
                 "description": f"Promote and Earn Bonus for sharing {product.product_name}",
@@ -297,6 +392,7 @@ class ShareRequestView(APIView):
             return Response({"error": "Product not found"}, status=404)
 
         ShareRequest.objects.create(user=user, product=product)
+        counters.increment(product.pk, "pending_shares")
 
         return Response({"message": "Share request submitted successfully"})
 
@@ -306,48 +402,85 @@ class ShareApprovalView(APIView):
     View for handling share requests.
     """
 
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsAdmin]
 
     def post(self, request, *args, **kwargs):
         share_request_id = request.data.get("share_request_id")
         action = request.data.get("action")  # "approve" or "reject"
 
-        try:
-            share_request = ShareRequest.objects.get(id=share_request_id)
-        except ShareRequest.DoesNotExist:
+        if action not in shares.ACTIONS:
+            return Response(
+                {"error": "Invalid action"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if not ShareRequest.objects.filter(id=share_request_id).exists():
             return Response({"error": "Share request not found"}, status=404)
 
-        if action == "approve":
-            share_request.status = "approved"
-            share_request.save()
-
-            product = share_request.product
-            product.shares += 1
-            product.save()
-
-            # Calculate the bonus
-            bonus_amount = Decimal("1000.00")
-
-            # Create or update the promote and earn bonus entry
-            individual_profile = IndividualProfile.objects.get(user=share_request.user)
-            UserEarnings.objects.update_or_create(
-                individual_profile=individual_profile,
-                earnings_type="promote_and_earn_bonus",
-                defaults={
-                    "amount": bonus_amount,
-                    "description": f"Promote and Earn Bonus for sharing {product.product_name}",
-                },
+        result = shares.moderate([share_request_id], action, request.user)
+        if not result["transitioned"]:
+            return Response(
+                {"error": "Share request is not pending"},
+                status=status.HTTP_409_CONFLICT,
             )
 
+        if action == "approve":
             return Response(
-                {"message": "Share request approved", "bonus": bonus_amount}
+                {"message": "Share request approved", "bonus": shares.BONUS_AMOUNT}
             )
+        return Response({"message": "Share request rejected"})
+
+
+class ShareModerationView(APIView):
+    """
+    View for approving or rejecting share requests in bulk. Only requests
+    still pending are transitioned; the response lists which ones were.
+    """
+
+    permission_classes = [IsAuthenticated, IsAdmin]
 
-        elif action == "reject":
-            share_request.status = "rejected"
-            share_request.save()
+    def post(self, request, *args, **kwargs):
+        serializer = ShareModerationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = shares.moderate(
+            serializer.validated_data["ids"],
+            serializer.validated_data["action"],
+            request.user,
+        )
+        return Response(result)
 
-            return Response({"message": "Share request rejected"})
 
+class CatalogueView(APIView):
+    """
+    View for the catalogue of active products, served from its cached
+    snapshot. Clients revalidate with If-None-Match and get a 304 while the
+    catalogue is unchanged.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        etag, body = catalogue.get()
+        if etag in parse_etags(request.headers.get("if-none-match", "")):
+            response = HttpResponseNotModified()
         else:
-            return Response({"error": "Invalid action"}, status=400)
+            response = HttpResponse(body, content_type="application/json")
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+
+class ProductLinkRedirect(HttpResponseRedirect):
+    allowed_schemes = ["http", "https", "tel"]
+
+
+class ProductRedirectView(View):
+    """
+    Short share link of a product. Redirects to the product link at once and
+    leaves recording the click to the click buffer.
+    """
+
+    def get(self, request, product, sharer):
+        link = clicks.product_link(product)
+        if link is None:
+            raise Http404("Product not found")
+        clicks.click_buffer.record(product, sharer, request.headers.get("referer", ""))
+        return ProductLinkRedirect(link)
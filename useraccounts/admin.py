@@ -6,8 +6,11 @@ from .models import (
     CompanyProfile,
     UserEarnings,
     EarningsType,
+    DailyEarnings,
+    LeaderboardEntry,
 )
 from .forms import UserCreationForm, UserChangeForm
+from .utils import approve_users
 
 
 class UserAdmin(BaseUserAdmin):
@@ -19,7 +22,7 @@ class UserAdmin(BaseUserAdmin):
     add_form = UserCreationForm
 
     list_display = ("email", "name", "user_type", "is_staff", "is_active")
-    list_filter = ("user_type", "is_staff", "is_active")
+    list_filter = ("user_type", "status", "is_staff", "is_active")
     fieldsets = (
         (None, {"fields": ("email", "password")}),
         (
@@ -61,6 +64,12 @@ class UserAdmin(BaseUserAdmin):
     )
     search_fields = ("email",)
     ordering = ("email",)
+    actions = ["approve_selected_users"]
+
+    @admin.action(description="Approve selected pending users")
+    def approve_selected_users(self, request, queryset):
+        approved_ids = approve_users(queryset)
+        self.message_user(request, f"Approved {len(approved_ids)} pending users.")
 
 
 admin.site.register(CustomUser, UserAdmin)
@@ -92,6 +101,8 @@ class IndividualProfileAdmin(admin.ModelAdmin):
         "membership_type",
         "total_earnings",
     )
+    list_select_related = ("user", "sponsor")
+    readonly_fields = ("approved_referrals", "total_earnings")
 
 
 @admin.register(UserEarnings)
@@ -110,3 +121,35 @@ class EarningsTypeAdmin(admin.ModelAdmin):
     """
 
     list_display = ("bonus_name", "status")
+
+
+@admin.register(DailyEarnings)
+class DailyEarningsAdmin(admin.ModelAdmin):
+    """
+    Admin class for the DailyEarnings rollup.
+    """
+
+    list_display = ("individual_profile", "date", "earnings_type", "amount", "count")
+    list_filter = ("earnings_type",)
+    list_select_related = ("individual_profile__user", "earnings_type")
+    date_hierarchy = "date"
+    readonly_fields = ("individual_profile", "date", "earnings_type", "amount", "count")
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(LeaderboardEntry)
+class LeaderboardEntryAdmin(admin.ModelAdmin):
+    """
+    Admin class for LeaderboardEntry.
+    """
+
+    list_display = ("board", "period_key", "user", "score")
+    list_filter = ("board", "period_key")
+    list_select_related = ("user",)
+    ordering = ("board", "period_key", "-score")
+    readonly_fields = ("board", "period_key", "user", "score")
+
+    def has_add_permission(self, request):
+        return False
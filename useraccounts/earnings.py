@@ -0,0 +1,146 @@
+"""
+Incremental maintenance of the DailyEarnings rollup and of
+IndividualProfile.total_earnings.
+
+UserEarnings saves and deletes are applied through the receivers in
+useraccounts.signals; code that changes earnings with queryset updates must
+call record_earnings_change itself. The rebuild_earnings_rollup management
+command recomputes the rollup from the raw earnings and check_earnings_totals
+audits the profile totals.
+"""
+
+from decimal import Decimal
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from . import leaderboards
+from .models import DailyEarnings, IndividualProfile, UserEarnings
+
+BATCH_SIZE = 5000
+
+
+def record_earnings_change(
+    profile_id, date, earnings_type_id, amount_delta, count_delta=0
+):
+    """
+    Adds amount_delta and count_delta to the rollup row of the given
+    profile, day and earnings type, and amount_delta to the profile total.
+    """
+    amount_delta = Decimal(str(amount_delta or 0))
+    if not amount_delta and not count_delta:
+        return
+
+    if amount_delta:
+        IndividualProfile.objects.filter(pk=profile_id).update(
+            total_earnings=F("total_earnings") + amount_delta
+        )
+        leaderboards.record_earnings(profile_id, amount_delta)
+
+    rollups = DailyEarnings.objects.filter(
+        individual_profile_id=profile_id, date=date, earnings_type_id=earnings_type_id
+    )
+    changes = {
+        "amount": F("amount") + amount_delta,
+        "count": F("count") + count_delta,
+    }
+    if rollups.update(**changes) or count_delta <= 0:
+        return
+
+    try:
+        with transaction.atomic():
+            DailyEarnings.objects.create(
+                individual_profile_id=profile_id,
+                date=date,
+                earnings_type_id=earnings_type_id,
+                amount=amount_delta,
+                count=count_delta,
+            )
+    except IntegrityError:
+        # Another transaction created the row first
+        rollups.update(**changes)
+
+
+def apply_earning_change(previous, current):
+    """
+    Moves an earning's contribution from its previous rollup values to its
+    current ones. Either side may be None for creations and deletions.
+    """
+    if previous == current:
+        return
+    if previous is not None:
+        profile_id, date, earnings_type_id, amount = previous
+        amount = Decimal(str(amount or 0))
+        record_earnings_change(profile_id, date, earnings_type_id, -amount, -1)
+    if current is not None:
+        profile_id, date, earnings_type_id, amount = current
+        record_earnings_change(profile_id, date, earnings_type_id, amount, 1)
+
+
+def rebuild(profile_ids=None):
+    """
+    Recomputes the rollup from UserEarnings, for every profile or only the
+    given ones. Returns the number of rollup rows written.
+    """
+    rollups = DailyEarnings.objects.all()
+    earnings = UserEarnings.objects.all()
+    if profile_ids is not None:
+        rollups = rollups.filter(individual_profile_id__in=profile_ids)
+        earnings = earnings.filter(individual_profile_id__in=profile_ids)
+
+    rows = (
+        earnings.values("individual_profile_id", "date", "earnings_type_id")
+        .annotate(total=Sum("amount"), entries=Count("pk"))
+        .order_by()
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    written = 0
+    with transaction.atomic():
+        rollups.delete()
+        while batch := list(islice(rows, BATCH_SIZE)):
+            DailyEarnings.objects.bulk_create(
+                [
+                    DailyEarnings(
+                        individual_profile_id=row["individual_profile_id"],
+                        date=row["date"],
+                        earnings_type_id=row["earnings_type_id"],
+                        amount=row["total"],
+                        count=row["entries"],
+                    )
+                    for row in batch
+                ]
+            )
+            written += len(batch)
+    return written
+
+
+def drifted_totals(profile_ids=None):
+    """
+    Yields (profile_id, stored_total, actual_total) for every profile whose
+    total_earnings differs from the sum of its UserEarnings.
+    """
+    profiles = IndividualProfile.objects.all()
+    if profile_ids is not None:
+        profiles = profiles.filter(pk__in=profile_ids)
+    rows = (
+        profiles.annotate(actual=Sum("earnings__amount"))
+        .values_list("pk", "total_earnings", "actual")
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    for profile_id, stored, actual in rows:
+        actual = actual or Decimal("0.00")
+        if stored != actual:
+            yield profile_id, stored, actual
+
+
+def fix_total(profile_id):
+    """
+    Resets the stored total of a profile to the sum of its UserEarnings.
+    """
+    with transaction.atomic():
+        profile = IndividualProfile.objects.select_for_update().get(pk=profile_id)
+        actual = profile.earnings.aggregate(total=Sum("amount"))["total"]
+        IndividualProfile.objects.filter(pk=profile.pk).update(
+            total_earnings=actual or Decimal("0.00")
+        )
@@ -0,0 +1,195 @@
+"""
+Maintenance and queries for the referral genealogy closure table.
+
+Every IndividualProfile.save() keeps ReferralGenealogy in sync with the
+sponsor foreign key, and deleting a user detaches the downline it sponsored
+(see signals.py); other writes that bypass save() (queryset updates,
+fixtures) can be repaired with the rebuild_genealogy management command.
+"""
+
+from itertools import islice
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import CustomUser, IndividualProfile, ReferralGenealogy
+
+BATCH_SIZE = 5000
+DOWNLINE_STATS_CACHE_TIMEOUT = 60 * 60
+
+
+def _bulk_insert(rows):
+    rows = iter(rows)
+    while batch := list(islice(rows, BATCH_SIZE)):
+        ReferralGenealogy.objects.bulk_create(
+            [
+                ReferralGenealogy(ancestor_id=a, descendant_id=d, depth=depth)
+                for a, d, depth in batch
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def _ancestors(user_id):
+    """
+    Returns (ancestor_id, depth) pairs for user_id, including the user itself at depth 0.
+    """
+    ancestors = list(
+        ReferralGenealogy.objects.filter(descendant_id=user_id).values_list(
+            "ancestor_id", "depth"
+        )
+    )
+    # Sponsors without an individual profile are roots of their own tree
+    return ancestors or [(user_id, 0)]
+
+
+def relink(user_id, sponsor_id):
+    """
+    Places user_id and its whole downline under sponsor_id.
+    Used both when a profile is created and when its sponsor changes.
+    """
+    with transaction.atomic():
+        subtree = dict(
+            ReferralGenealogy.objects.filter(ancestor_id=user_id).values_list(
+                "descendant_id", "depth"
+            )
+        )
+        if not subtree:
+            subtree = {user_id: 0}
+            _bulk_insert([(user_id, user_id, 0)])
+
+        if sponsor_id in subtree:
+            raise ValueError("A member cannot be sponsored by their own downline.")
+
+        # Detach the subtree from its previous upline
+        subtree_ids = ReferralGenealogy.objects.filter(ancestor_id=user_id).values(
+            "descendant_id"
+        )
+        ReferralGenealogy.objects.filter(descendant_id__in=subtree_ids).exclude(
+            ancestor_id__in=subtree_ids
+        ).delete()
+
+        if sponsor_id:
+            _bulk_insert(
+                (ancestor_id, descendant_id, ancestor_depth + 1 + descendant_depth)
+                for ancestor_id, ancestor_depth in _ancestors(sponsor_id)
+                for descendant_id, descendant_depth in subtree.items()
+            )
+
+
+def rebuild():
+    """
+    Rebuilds the whole closure table from IndividualProfile.sponsor.
+    Returns the number of profiles linked.
+    """
+    parents = dict(IndividualProfile.objects.values_list("user_id", "sponsor_id"))
+
+    def rows():
+        for user_id in parents:
+            yield user_id, user_id, 0
+            seen = {user_id}
+            node, depth = parents[user_id], 0
+            while node and node not in seen:
+                depth += 1
+                yield node, user_id, depth
+                seen.add(node)
+                node = parents.get(node)
+
+    with transaction.atomic():
+        ReferralGenealogy.objects.all().delete()
+        _bulk_insert(rows())
+    return len(parents)
+
+
+def downline(user_id, max_depth=None):
+    """
+    Returns the genealogy links of every member below user_id.
+    """
+    links = ReferralGenealogy.objects.filter(ancestor_id=user_id, depth__gt=0)
+    if max_depth is not None:
+        links = links.filter(depth__lte=max_depth)
+    return links
+
+
+def network_size(user_id):
+    """
+    Returns the number of members in the downline of user_id.
+    """
+    return downline(user_id).count()
+
+
+def level_counts(user_id):
+    """
+    Returns a {depth: member count} mapping for the downline of user_id.
+    """
+    return dict(
+        downline(user_id)
+        .values_list("depth")
+        .annotate(total=Count("pk"))
+        .order_by("depth")
+    )
+
+
+def upline(user_id):
+    """
+    Returns the ids of the sponsors above user_id, nearest first.
+    """
+    return list(
+        ReferralGenealogy.objects.filter(descendant_id=user_id, depth__gt=0)
+        .order_by("depth")
+        .values_list("ancestor_id", flat=True)
+    )
+
+
+def _downline_stats_key(user_id):
+    return f"downline_stats:{user_id}"
+
+
+def downline_stats(user_id):
+    """
+    Returns per-level counts, a status breakdown and the network size of the
+    downline of user_id. Computed with one grouped query and cached until a
+    member of the downline signs up, moves or changes status.
+    """
+    key = _downline_stats_key(user_id)
+    stats = cache.get(key)
+    if stats is not None:
+        return stats
+
+    statuses = [choice for choice, _ in CustomUser.STATUS_CHOICES]
+    levels = {}
+    rows = (
+        downline(user_id)
+        .values_list("depth", "descendant__status")
+        .annotate(total=Count("pk"))
+        .order_by("depth")
+    )
+    for depth, status, total in rows:
+        level = levels.setdefault(
+            depth, {"level": depth, "total": 0, **dict.fromkeys(statuses, 0)}
+        )
+        level["total"] += total
+        level[status] = level.get(status, 0) + total
+
+    stats = {
+        "user_id": user_id,
+        "network_size": sum(level["total"] for level in levels.values()),
+        "status_breakdown": {
+            status: sum(level[status] for level in levels.values())
+            for status in statuses
+        },
+        "levels": list(levels.values()),
+    }
+    cache.set(key, stats, DOWNLINE_STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_downline_stats(sponsor_ids):
+    """
+    Drops the cached downline statistics of the given sponsors once the
+    current transaction commits.
+    """
+    keys = [_downline_stats_key(sponsor_id) for sponsor_id in sponsor_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
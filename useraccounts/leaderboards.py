@@ -0,0 +1,199 @@
+"""
+Precomputed "top recruiters" and "top earners" leaderboards.
+
+Scores are kept per member and period (ISO week, month and all time) in
+LeaderboardEntry and are updated incrementally as referrals are approved
+(useraccounts.utils.apply_referral_approvals) and earnings are recorded
+(useraccounts.earnings.record_earnings_change).
+
+Reads never aggregate: the top of a board is served from the cache along
+with the time it was computed, and a member's position is computed on every
+read as one plus the number of entries with a higher score, a range count on
+the (board, period_key, score) index, so it is never stale. The
+refresh_leaderboards management command refills the cached top lists.
+"""
+
+from decimal import Decimal
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import IndividualProfile, LeaderboardEntry
+
+BOARDS = [board for board, _ in LeaderboardEntry.BOARD_CHOICES]
+PERIODS = ["week", "month", "all"]
+BATCH_SIZE = 5000
+
+
+def leaderboard_size():
+    return getattr(settings, "LEADERBOARD_SIZE", 100)
+
+
+def cache_timeout():
+    return getattr(settings, "LEADERBOARD_CACHE_TIMEOUT", 5 * 60)
+
+
+def period_key(period, on_date=None):
+    """
+    Returns the key of the period containing on_date (today by default),
+    e.g. "week:2026-W42", "month:2026-10" or "all".
+    """
+    on_date = on_date or timezone.localdate()
+    if period == "week":
+        year, week, _ = on_date.isocalendar()
+        return f"week:{year}-W{week:02d}"
+    if period == "month":
+        return f"month:{on_date.year}-{on_date.month:02d}"
+    if period == "all":
+        return "all"
+    raise ValueError(f"Unknown leaderboard period: {period}")
+
+
+def record(board, user_id, delta, on_date=None):
+    """
+    Adds delta to the member's score on every period of the board that
+    contains on_date.
+    """
+    delta = Decimal(str(delta or 0))
+    if not delta:
+        return
+
+    for period in PERIODS:
+        key = period_key(period, on_date)
+        entries = LeaderboardEntry.objects.filter(
+            board=board, period_key=key, user_id=user_id
+        )
+        if entries.update(score=F("score") + delta):
+            continue
+        try:
+            with transaction.atomic():
+                LeaderboardEntry.objects.create(
+                    board=board, period_key=key, user_id=user_id, score=delta
+                )
+        except IntegrityError:
+            # Another transaction created the entry first
+            entries.update(score=F("score") + delta)
+
+
+def record_earnings(profile_id, delta):
+    """
+    Adds an earnings change of the given individual profile to the earners
+    board. Changes count towards the periods in which they are made, not the
+    date of the earnings row they adjust.
+    """
+    # IndividualProfile is keyed by its user
+    record("earnings", profile_id, delta)
+
+
+def _top_key(board, key):
+    return f"leaderboard:{board}:{key}"
+
+
+def _entry_row(position, user_id, name, score):
+    return {
+        "position": position,
+        "user_id": user_id,
+        "name": name,
+        "score": float(score),
+    }
+
+
+def _ranked(rows):
+    """
+    Prefixes rows ordered by descending score (their last item) with their
+    competition rank: members with equal scores share a position.
+    """
+    rank, previous = 0, None
+    for index, row in enumerate(rows, start=1):
+        if row[-1] != previous:
+            rank, previous = index, row[-1]
+        yield (rank, *row)
+
+
+def _compute_top(board, key):
+    entries = (
+        LeaderboardEntry.objects.filter(board=board, period_key=key, score__gt=0)
+        .order_by("-score", "user_id")
+        .values_list("user_id", "user__name", "score")
+    )
+    return {
+        "refreshed_at": timezone.now(),
+        "rows": [_entry_row(*row) for row in _ranked(entries[: leaderboard_size()])],
+    }
+
+
+def top(board, period):
+    """
+    Returns {"refreshed_at": ..., "rows": [...]}, the cached top of the board
+    for the current period and when it was computed, computing it from the
+    (board, period_key, score) index on a cache miss.
+    """
+    key = period_key(period)
+    cache_key = _top_key(board, key)
+    cached = cache.get(cache_key)
+    if cached is None:
+        cached = _compute_top(board, key)
+        cache.set(cache_key, cached, cache_timeout())
+    return cached
+
+
+def position(board, period, user_id):
+    """
+    Returns the member's current position and score for the current period,
+    or None when the member has not scored in it yet. Members with equal
+    scores share a position.
+    """
+    key = period_key(period)
+    entries = LeaderboardEntry.objects.filter(board=board, period_key=key)
+    score = entries.filter(user_id=user_id).values_list("score", flat=True).first()
+    if score is None or score <= 0:
+        return None
+
+    rank = entries.filter(score__gt=score).count() + 1
+    return {"position": rank, "user_id": user_id, "score": float(score)}
+
+
+def refresh(boards=None, periods=None):
+    """
+    Refills the cached top lists of the current periods.
+    Returns the number of lists refreshed.
+    """
+    refreshed = 0
+    for board in boards or BOARDS:
+        for period in periods or PERIODS:
+            key = period_key(period)
+            cache.set(_top_key(board, key), _compute_top(board, key), cache_timeout())
+            refreshed += 1
+    return refreshed
+
+
+def rebuild():
+    """
+    Recomputes the all-time scores from stored data: the recruits board from
+    IndividualProfile.approved_referrals and the earners board from
+    IndividualProfile.total_earnings. Approval dates are not stored and the
+    earnings rollup books adjustments to the date of the adjusted row, so the
+    weekly and monthly boards are only built incrementally.
+    Returns the number of entries written.
+    """
+    totals = IndividualProfile.objects.values_list(
+        "user_id", "approved_referrals", "total_earnings"
+    ).filter(Q(approved_referrals__gt=0) | Q(total_earnings__gt=0))
+    entries = (
+        LeaderboardEntry(board=board, period_key="all", user_id=user_id, score=score)
+        for user_id, approved, earned in totals.iterator(chunk_size=BATCH_SIZE)
+        for board, score in (("recruits", Decimal(approved)), ("earnings", earned))
+        if score > 0
+    )
+
+    written = 0
+    with transaction.atomic():
+        LeaderboardEntry.objects.filter(period_key="all").delete()
+        while batch := list(islice(entries, BATCH_SIZE)):
+            LeaderboardEntry.objects.bulk_create(batch)
+            written += len(batch)
+    return written
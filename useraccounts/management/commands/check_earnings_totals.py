@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from useraccounts import earnings
+
+
+class Command(BaseCommand):
+    """
+    Compares IndividualProfile.total_earnings with the sum of UserEarnings.
+    """
+
+    help = "Check the stored total earnings of every profile against the raw earnings."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profile",
+            type=int,
+            action="append",
+            dest="profiles",
+            help="Only check the given individual profile (user id, may be repeated).",
+        )
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Reset drifted totals to the sum of their earnings.",
+        )
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for profile_id, stored, actual in earnings.drifted_totals(
+            profile_ids=options["profiles"]
+        ):
+            drifted += 1
+            self.stdout.write(f"Profile {profile_id}: stored={stored} actual={actual}")
+            if options["fix"]:
+                earnings.fix_total(profile_id)
+
+        if drifted and not options["fix"]:
+            raise CommandError(f"{drifted} profiles have drifted total earnings.")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{drifted} drifted totals {'fixed' if drifted else 'found'}."
+            )
+        )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from useraccounts.ranks import evaluate_ranks
+
+
+class Command(BaseCommand):
+    """
+    Promotes every member who qualifies for a higher rank.
+    """
+
+    help = "Evaluate rank promotions for the whole network."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            dest="users",
+            help="Only evaluate the given user id (may be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        promoted = evaluate_ranks(user_ids=options["users"])
+        for rank, count in promoted.items():
+            self.stdout.write(f"{rank}: {count} promoted")
+        self.stdout.write(
+            self.style.SUCCESS(f"Promoted {sum(promoted.values())} members.")
+        )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from useraccounts import earnings
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the DailyEarnings rollup from UserEarnings.
+    """
+
+    help = "Rebuild the daily earnings rollup, e.g. after a backfill or fixture load."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profile",
+            type=int,
+            action="append",
+            dest="profiles",
+            help="Only rebuild the given individual profile (user id, may be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        written = earnings.rebuild(profile_ids=options["profiles"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} daily earnings rows."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from useraccounts import genealogy
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the referral genealogy closure table from IndividualProfile.sponsor.
+    """
+
+    help = (
+        "Rebuild the referral genealogy from sponsor links, e.g. after loading "
+        "fixtures or bulk updates that bypassed IndividualProfile.save()."
+    )
+
+    def handle(self, *args, **options):
+        linked = genealogy.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt genealogy for {linked} profiles.")
+        )
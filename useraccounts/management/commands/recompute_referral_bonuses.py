@@ -0,0 +1,95 @@
+from django.core.management.base import BaseCommand, CommandError
+from decimal import Decimal
+
+from django.db.models import Count, Sum
+
+from useraccounts.models import IndividualProfile, UserEarnings
+from useraccounts.utils import (
+    DIRECT_REFERRAL_BONUS,
+    MATCHING_BONUS,
+    calculate_and_create_bonuses,
+)
+
+
+class Command(BaseCommand):
+    """
+    Recounts approved referrals from scratch and rewrites the referral bonuses
+    of every sponsor whose incremental counter or bonus earnings have drifted.
+    """
+
+    help = "Recompute approved-referral counters and referral bonuses from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sponsor",
+            type=int,
+            action="append",
+            dest="sponsors",
+            help="Only audit the given sponsor user id (may be repeated).",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rewrite the bonuses of every audited sponsor, not only drifted ones.",
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Report drifted sponsors without writing anything.",
+        )
+
+    def handle(self, *args, **options):
+        profiles = IndividualProfile.objects.select_related("user")
+        if options["sponsors"]:
+            profiles = profiles.filter(user_id__in=options["sponsors"])
+
+        actual_counts = dict(
+            IndividualProfile.objects.filter(
+                sponsor__isnull=False, user__status="approved"
+            )
+            .values_list("sponsor")
+            .annotate(total=Count("pk"))
+        )
+        bonuses = {}
+        for profile_id, bonus_name, amount in (
+            UserEarnings.objects.filter(
+                earnings_type__bonus_name__in=[
+                    "Direct Referral Bonus",
+                    "Matching Bonus",
+                ]
+            )
+            .values_list("individual_profile", "earnings_type__bonus_name")
+            .annotate(amount=Sum("amount"))
+        ):
+            bonuses[profile_id, bonus_name] = amount
+
+        audited = drifted = 0
+        for profile in profiles.iterator(chunk_size=2000):
+            audited += 1
+            actual = actual_counts.get(profile.user_id, 0)
+            direct = bonuses.get((profile.pk, "Direct Referral Bonus"), Decimal(0))
+            matching = bonuses.get((profile.pk, "Matching Bonus"), Decimal(0))
+            if (
+                actual != profile.approved_referrals
+                or direct != DIRECT_REFERRAL_BONUS * actual
+                or matching != MATCHING_BONUS * (actual // 2)
+            ):
+                drifted += 1
+                self.stdout.write(
+                    f"{profile.user.email}: counter={profile.approved_referrals} "
+                    f"actual={actual} direct_bonus={direct} "
+                    f"matching_bonus={matching}"
+                )
+            elif not options["all"]:
+                continue
+
+            if not options["check"]:
+                calculate_and_create_bonuses(profile.user)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Audited {audited} sponsors, {drifted} drifted.")
+        )
+        if options["check"] and drifted:
+            raise CommandError(
+                f"{drifted} sponsors have drifted referral counters or bonuses."
+            )
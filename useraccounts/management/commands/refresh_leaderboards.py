@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from useraccounts import leaderboards
+
+
+class Command(BaseCommand):
+    """
+    Refills the cached leaderboard top lists. Meant to run every few minutes.
+    """
+
+    help = "Refresh the cached leaderboard top lists."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--board",
+            action="append",
+            dest="boards",
+            choices=leaderboards.BOARDS,
+            help="Only refresh the given board (may be repeated).",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Recompute the all-time scores from stored data before refreshing.",
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            written = leaderboards.rebuild()
+            self.stdout.write(f"Rebuilt {written} leaderboard entries.")
+        refreshed = leaderboards.refresh(boards=options["boards"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Refreshed {refreshed} leaderboard top lists.")
+        )
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.8 on 2026-10-17 07:11
+
+from django.db import migrations, models
+
+
+def populate_approved_referrals(apps, schema_editor):
+    IndividualProfile = apps.get_model("useraccounts", "IndividualProfile")
+
+    counts = (
+        IndividualProfile.objects.filter(sponsor__isnull=False, user__status="approved")
+        .values("sponsor")
+        .annotate(total=models.Count("pk"))
+    )
+    for row in counts:
+        IndividualProfile.objects.filter(user_id=row["sponsor"]).update(
+            approved_referrals=row["total"]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("useraccounts", "0017_remove_userearnings_old_earnings_type"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="individualprofile",
+            name="approved_referrals",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_approved_referrals, migrations.RunPython.noop),
+    ]
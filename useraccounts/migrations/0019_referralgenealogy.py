@@ -0,0 +1,89 @@
+# Generated by Django 5.0.8 on 2026-10-17 07:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_genealogy(apps, schema_editor):
+    IndividualProfile = apps.get_model("useraccounts", "IndividualProfile")
+    ReferralGenealogy = apps.get_model("useraccounts", "ReferralGenealogy")
+
+    parents = dict(IndividualProfile.objects.values_list("user_id", "sponsor_id"))
+    links = []
+    for user_id in parents:
+        links.append(
+            ReferralGenealogy(ancestor_id=user_id, descendant_id=user_id, depth=0)
+        )
+        seen = {user_id}
+        node, depth = parents[user_id], 0
+        while node and node not in seen:
+            depth += 1
+            links.append(
+                ReferralGenealogy(ancestor_id=node, descendant_id=user_id, depth=depth)
+            )
+            seen.add(node)
+            node = parents.get(node)
+    ReferralGenealogy.objects.bulk_create(links, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("useraccounts", "0018_individualprofile_approved_referrals"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReferralGenealogy",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("depth", models.PositiveIntegerField()),
+                (
+                    "ancestor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="downline_links",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "descendant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="upline_links",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Referral Genealogy",
+                "verbose_name_plural": "Referral Genealogy",
+                "indexes": [
+                    models.Index(
+                        fields=["ancestor", "depth"],
+                        name="useraccount_ancesto_b2b8f6_idx",
+                    ),
+                    models.Index(
+                        fields=["descendant", "depth"],
+                        name="useraccount_descend_739307_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="referralgenealogy",
+            constraint=models.UniqueConstraint(
+                fields=("ancestor", "descendant"), name="unique_genealogy_link"
+            ),
+        ),
+        migrations.RunPython(populate_genealogy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.0.8 on 2026-10-17 07:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_daily_earnings(apps, schema_editor):
+    UserEarnings = apps.get_model("useraccounts", "UserEarnings")
+    DailyEarnings = apps.get_model("useraccounts", "DailyEarnings")
+
+    rows = (
+        UserEarnings.objects.values("individual_profile_id", "date", "earnings_type_id")
+        .annotate(total=models.Sum("amount"), entries=models.Count("pk"))
+        .order_by()
+    )
+    DailyEarnings.objects.bulk_create(
+        [
+            DailyEarnings(
+                individual_profile_id=row["individual_profile_id"],
+                date=row["date"],
+                earnings_type_id=row["earnings_type_id"],
+                amount=row["total"],
+                count=row["entries"],
+            )
+            for row in rows
+        ],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("useraccounts", "0019_referralgenealogy"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyEarnings",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                (
+                    "amount",
+                    models.DecimalField(decimal_places=2, default=0.0, max_digits=14),
+                ),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "earnings_type",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_earnings",
+                        to="useraccounts.earningstype",
+                    ),
+                ),
+                (
+                    "individual_profile",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_earnings",
+                        to="useraccounts.individualprofile",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Daily Earnings",
+                "verbose_name_plural": "Daily Earnings",
+                "indexes": [
+                    models.Index(
+                        fields=["date", "earnings_type"],
+                        name="useraccount_date_975b25_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="dailyearnings",
+            constraint=models.UniqueConstraint(
+                fields=("individual_profile", "date", "earnings_type"),
+                name="unique_daily_earnings",
+            ),
+        ),
+        migrations.RunPython(populate_daily_earnings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.8 on 2026-10-17 07:16
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def populate_total_earnings(apps, schema_editor):
+    IndividualProfile = apps.get_model("useraccounts", "IndividualProfile")
+    UserEarnings = apps.get_model("useraccounts", "UserEarnings")
+
+    totals = (
+        UserEarnings.objects.filter(individual_profile=models.OuterRef("pk"))
+        .values("individual_profile")
+        .annotate(total=models.Sum("amount"))
+        .values("total")
+    )
+    IndividualProfile.objects.update(
+        total_earnings=Coalesce(
+            models.Subquery(totals),
+            models.Value(0),
+            output_field=models.DecimalField(max_digits=14, decimal_places=2),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("useraccounts", "0020_dailyearnings"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="individualprofile",
+            name="total_earnings",
+            field=models.DecimalField(
+                db_index=True, decimal_places=2, default=0.0, max_digits=14
+            ),
+        ),
+        migrations.RunPython(populate_total_earnings, migrations.RunPython.noop),
+    ]
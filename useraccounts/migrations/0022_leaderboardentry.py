@@ -0,0 +1,100 @@
+# Generated by Django 5.0.8 on 2026-10-17 07:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_all_time_leaderboards(apps, schema_editor):
+    IndividualProfile = apps.get_model("useraccounts", "IndividualProfile")
+    LeaderboardEntry = apps.get_model("useraccounts", "LeaderboardEntry")
+
+    profiles = IndividualProfile.objects.values_list(
+        "user_id", "approved_referrals", "total_earnings"
+    )
+    entries = []
+    for user_id, approved_referrals, total_earnings in profiles.iterator():
+        if approved_referrals:
+            entries.append(
+                LeaderboardEntry(
+                    board="recruits",
+                    period_key="all",
+                    user_id=user_id,
+                    score=approved_referrals,
+                )
+            )
+        if total_earnings:
+            entries.append(
+                LeaderboardEntry(
+                    board="earnings",
+                    period_key="all",
+                    user_id=user_id,
+                    score=total_earnings,
+                )
+            )
+    LeaderboardEntry.objects.bulk_create(entries, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("useraccounts", "0021_individualprofile_total_earnings"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeaderboardEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "board",
+                    models.CharField(
+                        choices=[
+                            ("recruits", "Top Recruiters"),
+                            ("earnings", "Top Earners"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("period_key", models.CharField(max_length=20)),
+                (
+                    "score",
+                    models.DecimalField(decimal_places=2, default=0.0, max_digits=14),
+                ),
+                ("position", models.PositiveIntegerField(blank=True, null=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="leaderboard_entries",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Leaderboard Entry",
+                "verbose_name_plural": "Leaderboard Entries",
+                "indexes": [
+                    models.Index(
+                        fields=["board", "period_key", "-score"],
+                        name="useraccount_board_bcbe25_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="leaderboardentry",
+            constraint=models.UniqueConstraint(
+                fields=("board", "period_key", "user"), name="unique_leaderboard_entry"
+            ),
+        ),
+        migrations.RunPython(populate_all_time_leaderboards, migrations.RunPython.noop),
+    ]
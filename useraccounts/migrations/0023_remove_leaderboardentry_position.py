@@ -0,0 +1,17 @@
+# Generated by Django 5.0.8 on 2026-10-17 08:46
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("useraccounts", "0022_leaderboardentry"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="leaderboardentry",
+            name="position",
+        ),
+    ]
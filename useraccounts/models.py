@@ -3,11 +3,11 @@ from django.contrib.auth.models import (
     BaseUserManager,
     PermissionsMixin,
 )
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import FileExtensionValidator
 from django.utils.translation import gettext_lazy as _
 from .validators import validate_profile_picture
-from .utils import calculate_and_create_bonuses
+from .utils import apply_referral_approvals
 
 
 class CustomUserManager(BaseUserManager):
@@ -93,14 +93,42 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         """
         Save the user model instance.
         """
-        if self.pk:
-            old_status = CustomUser.objects.get(pk=self.pk).status
-            if old_status != "approved" and self.status == "approved":
-                # Status has changed to approved
-                sponsor = self.individual_profile.sponsor
-                if sponsor:
-                    calculate_and_create_bonuses(sponsor)
-        super().save(*args, **kwargs)
+        from . import genealogy
+        from .ranks import evaluate_upline_ranks
+
+        update_fields = kwargs.get("update_fields")
+        newly_approved = False
+        with transaction.atomic():
+            if self.pk and (update_fields is None or "status" in update_fields):
+                # Read the stored status under a lock: an instance loaded
+                # before a concurrent approval must not apply its transition
+                # from a stale status
+                old_status = (
+                    CustomUser.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values_list("status", flat=True)
+                    .first()
+                )
+                if old_status != self.status:
+                    genealogy.invalidate_downline_stats(genealogy.upline(self.pk))
+                was_approved = old_status == "approved"
+                is_approved = self.status == "approved"
+                if was_approved != is_approved:
+                    # Status has changed to or from approved
+                    sponsor_id = (
+                        IndividualProfile.objects.filter(user_id=self.pk)
+                        .values_list("sponsor_id", flat=True)
+                        .first()
+                    )
+                    if sponsor_id:
+                        apply_referral_approvals(
+                            sponsor_id, delta=1 if is_approved else -1
+                        )
+                        newly_approved = is_approved
+            super().save(*args, **kwargs)
+            if newly_approved:
+                # After the save, so the network sizes count this approval
+                evaluate_upline_ranks([self.pk])
 
     def __str__(self):
         """
@@ -141,14 +169,47 @@ class IndividualProfile(models.Model):
     membership_type = models.CharField(
         max_length=20, choices=MEMBERSHIP_TYPE_CHOICES, default="individual package"
     )
+    # Maintained incrementally by apply_referral_approvals
+    approved_referrals = models.PositiveIntegerField(default=0)
+    # Running total of UserEarnings, maintained by useraccounts.earnings
+    total_earnings = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0.00, db_index=True
+    )
+    # Counters only changed through queryset updates, so save() never writes
+    # back a possibly stale in-memory value
+    DENORMALIZED_FIELDS = ("approved_referrals", "total_earnings")
 
-    @property
-    def total_earnings(self):
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored sponsor so save() can detect re-parenting
+        instance._loaded_sponsor_id = instance.__dict__.get("sponsor_id")
+        return instance
+
+    def save(self, *args, **kwargs):
         """
-        Calculate the total earnings for the individual profile.
-        :return: Decimal total earnings
+        Save the profile and keep the referral genealogy in sync with its sponsor.
         """
-        return self.earnings.aggregate(total=models.Sum("amount"))["total"] or 0.00
+        from . import genealogy
+
+        creating = self._state.adding
+        if not creating and not args and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DENORMALIZED_FIELDS
+            ]
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if creating or self.sponsor_id != getattr(
+                self, "_loaded_sponsor_id", self.sponsor_id
+            ):
+                previous_upline = [] if creating else genealogy.upline(self.user_id)
+                genealogy.relink(self.user_id, self.sponsor_id)
+                genealogy.invalidate_downline_stats(
+                    set(previous_upline) | set(genealogy.upline(self.user_id))
+                )
+        self._loaded_sponsor_id = self.sponsor_id
 
     class Meta:
         verbose_name = "Individual Profile"
@@ -227,6 +288,25 @@ class UserEarnings(models.Model):
         verbose_name = "User Earning"
         verbose_name_plural = "Users Earnings"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored values so the rollup can be adjusted by delta
+        instance._loaded_values = instance.rollup_values()
+        return instance
+
+    def rollup_values(self):
+        """
+        Returns the (individual_profile_id, date, earnings_type_id, amount)
+        tuple this earning contributes to the daily earnings rollup.
+        """
+        return (
+            self.__dict__.get("individual_profile_id"),
+            self.__dict__.get("date"),
+            self.__dict__.get("earnings_type_id"),
+            self.__dict__.get("amount"),
+        )
+
     def __str__(self):
         """
         Return a string representation of the earning.
@@ -237,3 +317,106 @@ class UserEarnings(models.Model):
     @property
     def earnings_type_name(self):
         return self.earnings_type.bonus_name if self.earnings_type else None
+
+
+class DailyEarnings(models.Model):
+    """
+    Rollup of UserEarnings per individual profile, day and earnings type.
+    Maintained incrementally by useraccounts.earnings.
+    """
+
+    individual_profile = models.ForeignKey(
+        IndividualProfile, on_delete=models.CASCADE, related_name="daily_earnings"
+    )
+    date = models.DateField()
+    earnings_type = models.ForeignKey(
+        EarningsType,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name="daily_earnings",
+    )
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Daily Earnings"
+        verbose_name_plural = "Daily Earnings"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["individual_profile", "date", "earnings_type"],
+                name="unique_daily_earnings",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["date", "earnings_type"]),
+        ]
+
+    def __str__(self):
+        return f"{self.individual_profile_id} - {self.amount} on {self.date}"
+
+
+class ReferralGenealogy(models.Model):
+    """
+    Closure table of the referral tree built from IndividualProfile.sponsor.
+    Holds one row per (ancestor, descendant) pair, including a depth 0 row
+    for every member, so subtree and upline queries are a single lookup.
+    """
+
+    ancestor = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="downline_links"
+    )
+    descendant = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="upline_links"
+    )
+    depth = models.PositiveIntegerField()
+
+    class Meta:
+        verbose_name = "Referral Genealogy"
+        verbose_name_plural = "Referral Genealogy"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["ancestor", "descendant"], name="unique_genealogy_link"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["ancestor", "depth"]),
+            models.Index(fields=["descendant", "depth"]),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Score of a member on a leaderboard for one period (a week, a month or
+    all time). Scores are maintained incrementally by useraccounts.leaderboards,
+    which ranks members with the (board, period_key, score) index.
+    """
+
+    BOARD_CHOICES = [
+        ("recruits", "Top Recruiters"),
+        ("earnings", "Top Earners"),
+    ]
+    board = models.CharField(max_length=20, choices=BOARD_CHOICES)
+    period_key = models.CharField(max_length=20)
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="leaderboard_entries"
+    )
+    score = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+
+    class Meta:
+        verbose_name = "Leaderboard Entry"
+        verbose_name_plural = "Leaderboard Entries"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["board", "period_key", "user"],
+                name="unique_leaderboard_entry",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["board", "period_key", "-score"]),
+        ]
+
+    def __str__(self):
+        return f"{self.board} {self.period_key}: {self.user_id} ({self.score})"
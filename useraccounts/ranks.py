@@ -0,0 +1,95 @@
+"""
+Set-based evaluation of IndividualProfile.rank promotions.
+
+An approved member is promoted to the highest rank whose requirements they
+meet: approved direct recruits, approved members in their whole downline and
+total earnings. Ranks are never lowered here.
+
+The business has not defined the requirements of the IndividualProfile
+ranks yet, and the referrals UserRanking tiers (silver to platinum) are a
+different ladder, so promotions are off until RANK_REQUIREMENTS is set,
+e.g.:
+
+    RANK_REQUIREMENTS = {
+        "field marshall": {"recruits": 2, "network_size": 6, "earnings": 0},
+        "business builder": {"recruits": 4, "network_size": 30, "earnings": 0},
+    }
+
+Ranks missing from the setting are never awarded.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import IndividualProfile, ReferralGenealogy
+
+
+def rank_requirements():
+    return getattr(settings, "RANK_REQUIREMENTS", {})
+
+
+def _approved_network_size():
+    network = (
+        ReferralGenealogy.objects.filter(
+            ancestor_id=OuterRef("user_id"),
+            depth__gt=0,
+            descendant__status="approved",
+        )
+        .values("ancestor_id")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(network), Value(0))
+
+
+def evaluate_ranks(user_ids=None):
+    """
+    Promotes every qualifying member, or only the given ones, with one
+    UPDATE per rank. Only rows whose rank actually changes are written.
+    Args:
+        user_ids: Optional ids (or a values() subquery) of the members to evaluate.
+    Returns:
+        A {rank: number of members promoted to it} mapping.
+    """
+    ranks = [rank for rank, _ in IndividualProfile.RANK_CHOICES]
+    requirements = rank_requirements()
+    promoted = {}
+
+    with transaction.atomic():
+        # Highest rank first, so members end up at the best rank they qualify for
+        for position in range(len(ranks) - 1, 0, -1):
+            rank = ranks[position]
+            if rank not in requirements:
+                continue
+            requirement = requirements[rank]
+
+            profiles = IndividualProfile.objects.filter(
+                user__status="approved",
+                rank__in=ranks[:position],
+                approved_referrals__gte=requirement.get("recruits", 0),
+                total_earnings__gte=requirement.get("earnings", 0),
+            )
+            if user_ids is not None:
+                profiles = profiles.filter(user_id__in=user_ids)
+            if requirement.get("network_size"):
+                profiles = profiles.alias(network_size=_approved_network_size()).filter(
+                    network_size__gte=requirement["network_size"]
+                )
+
+            promoted[rank] = profiles.update(rank=rank)
+
+    return promoted
+
+
+def evaluate_upline_ranks(user_ids):
+    """
+    Re-evaluates the sponsors above the given members, whose recruits and
+    network size change when those members are approved.
+    """
+    return evaluate_ranks(
+        user_ids=ReferralGenealogy.objects.filter(
+            descendant_id__in=user_ids, depth__gt=0
+        ).values("ancestor_id")
+    )
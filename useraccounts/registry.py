@@ -0,0 +1,102 @@
+"""
+Process-wide registry of EarningsType rows.
+
+The rows are loaded once per worker and reloaded when the version stamp kept
+in the Django cache changes. Saving or deleting an EarningsType bumps the
+stamp (see useraccounts.signals), so with a shared cache backend every
+worker notices the change within VERSION_CHECK_INTERVAL seconds.
+"""
+
+import threading
+import time
+from uuid import uuid4
+
+from django.core.cache import cache
+
+from .models import EarningsType
+
+VERSION_KEY = "earnings_types:version"
+VERSION_CHECK_INTERVAL = 1
+
+
+class EarningsTypeRegistry:
+    """
+    Lookups of EarningsType by id and by bonus name without a query per call.
+    The returned instances are shared between threads and must not be modified.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        # (by_id, by_name) mappings, replaced as a whole on reload
+        self._maps = None
+
+    def _remote_version(self):
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, uuid4().hex, None)
+            version = cache.get(VERSION_KEY)
+        return version
+
+    def _load(self):
+        maps = self._maps
+        now = time.monotonic()
+        if maps is not None and now - self._checked_at < VERSION_CHECK_INTERVAL:
+            return maps
+
+        version = self._remote_version()
+        with self._lock:
+            if self._maps is None or version != self._version:
+                types = list(EarningsType.objects.order_by("id"))
+                self._maps = (
+                    {earnings_type.pk: earnings_type for earnings_type in types},
+                    {
+                        earnings_type.bonus_name: earnings_type
+                        for earnings_type in types
+                    },
+                )
+                self._version = version
+            self._checked_at = now
+            return self._maps
+
+    def all(self):
+        """
+        Returns every earnings type, ordered by id.
+        """
+        by_id, _ = self._load()
+        return list(by_id.values())
+
+    def get(self, pk):
+        """
+        Returns the earnings type with the given id, or None.
+        """
+        by_id, _ = self._load()
+        return by_id.get(pk)
+
+    def by_name(self, bonus_name):
+        """
+        Returns the earnings type with the given bonus name, or None.
+        """
+        _, by_name = self._load()
+        return by_name.get(bonus_name)
+
+    def get_or_create(self, bonus_name):
+        """
+        Returns the earnings type with the given bonus name, creating it if needed.
+        """
+        earnings_type = self.by_name(bonus_name)
+        if earnings_type is None:
+            earnings_type, _ = EarningsType.objects.get_or_create(bonus_name=bonus_name)
+        return earnings_type
+
+    def invalidate(self):
+        """
+        Drops the local copy and bumps the version stamp seen by other workers.
+        """
+        cache.set(VERSION_KEY, uuid4().hex, None)
+        with self._lock:
+            self._maps = None
+
+
+earnings_types = EarningsTypeRegistry()
@@ -74,7 +74,7 @@ class IndividualProfileSerializer(serializers.ModelSerializer):
     rank = serializers.CharField(required=False, allow_blank=True)
     membership_type = serializers.CharField(required=False, allow_blank=True)
     state = serializers.CharField(source="user.state", required=False, allow_blank=True)
-    total_earnings = serializers.FloatField(required=False, read_only=False)
+    total_earnings = serializers.FloatField(read_only=True)
     city = serializers.CharField(source="user.city", required=False, allow_blank=True)
     password = serializers.CharField(source="user.password", write_only=True)
 
@@ -93,7 +93,8 @@ class IndividualProfileSerializer(serializers.ModelSerializer):
         for attr, value in user_data.items():
             if value is not None:  # Only update if a value is provided
                 setattr(user, attr, value)
-        user.save()
+        # Only the submitted fields, so a stale status is never written back
+        user.save(update_fields=list(user_data))
 
         for attr, value in validated_data.items():
             if value is not None:  # Only update if a value is provided
@@ -161,7 +162,8 @@ class CompanyProfileSerializer(serializers.ModelSerializer):
         for attr, value in user_data.items():
             if value is not None:  # Only update if a value is provided
                 setattr(user, attr, value)
-        user.save()
+        # Only the submitted fields, so a stale status is never written back
+        user.save(update_fields=list(user_data))
 
         for attr, value in validated_data.items():
             if value is not None:  # Only update if a value is provided
@@ -302,3 +304,41 @@ class EarningsTypeSerializer(serializers.ModelSerializer):
     class Meta:
         model = EarningsType
         fields = "__all__"
+
+
+class UserApprovalSerializer(serializers.Serializer):
+    """
+    Serializer selecting the pending users of a bulk approval, either by id
+    or with a filter.
+    """
+
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False
+    )
+    all_pending = serializers.BooleanField(required=False, default=False)
+    sponsor_id = serializers.IntegerField(required=False)
+    date_joined_from = serializers.DateField(required=False)
+    date_joined_to = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if not data.get("user_ids") and not data.get("all_pending"):
+            raise serializers.ValidationError(
+                "Provide user_ids or set all_pending to approve by filter."
+            )
+        return data
+
+    def get_users(self):
+        """
+        Returns the queryset of pending users selected by the validated data.
+        """
+        data = self.validated_data
+        users = CustomUser.objects.filter(status="pending")
+        if data.get("user_ids"):
+            users = users.filter(pk__in=data["user_ids"])
+        if "sponsor_id" in data:
+            users = users.filter(individual_profile__sponsor_id=data["sponsor_id"])
+        if "date_joined_from" in data:
+            users = users.filter(date_joined__gte=data["date_joined_from"])
+        if "date_joined_to" in data:
+            users = users.filter(date_joined__lte=data["date_joined_to"])
+        return users
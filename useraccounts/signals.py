@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import earnings, genealogy
+from .models import CustomUser, EarningsType, IndividualProfile, UserEarnings
+from .registry import earnings_types
+
+
+@receiver(post_save, sender=UserEarnings)
+def update_daily_earnings_on_save(sender, instance, created, raw, **kwargs):
+    if raw:
+        # Fixtures are picked up by the rebuild_earnings_rollup command
+        return
+    previous = None if created else getattr(instance, "_loaded_values", None)
+    current = instance.rollup_values()
+    earnings.apply_earning_change(previous, current)
+    instance._loaded_values = current
+
+
+@receiver(post_delete, sender=UserEarnings)
+def update_daily_earnings_on_delete(sender, instance, **kwargs):
+    earnings.apply_earning_change(
+        getattr(instance, "_loaded_values", instance.rollup_values()), None
+    )
+
+
+@receiver(pre_delete, sender=EarningsType)
+def remember_earnings_type_profiles(sender, instance, **kwargs):
+    instance._rollup_profile_ids = list(
+        instance.daily_earnings.values_list("individual_profile_id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=EarningsType)
+def rebuild_daily_earnings_of_earnings_type(sender, instance, **kwargs):
+    # The earnings of a deleted type are kept without a type, so their
+    # rollup rows are recomputed instead of being dropped with the type
+    profile_ids = getattr(instance, "_rollup_profile_ids", None)
+    if profile_ids:
+        earnings.rebuild(profile_ids=profile_ids)
+
+
+@receiver(post_save, sender=EarningsType)
+@receiver(post_delete, sender=EarningsType)
+def invalidate_earnings_type_registry(sender, **kwargs):
+    transaction.on_commit(earnings_types.invalidate)
+
+
+@receiver(pre_delete, sender=CustomUser)
+def remember_genealogy_of_deleted_user(sender, instance, **kwargs):
+    instance._sponsored_ids = list(
+        IndividualProfile.objects.filter(sponsor=instance).values_list(
+            "user_id", flat=True
+        )
+    )
+    instance._upline_ids = genealogy.upline(instance.pk)
+
+
+@receiver(post_delete, sender=CustomUser)
+def detach_downline_of_deleted_user(sender, instance, **kwargs):
+    # The sponsor of the members below is set to NULL by a queryset update,
+    # which bypasses IndividualProfile.save(): their subtrees are detached
+    # from the deleted member's upline here instead
+    for user_id in getattr(instance, "_sponsored_ids", []):
+        genealogy.relink(user_id, None)
+    genealogy.invalidate_downline_stats(getattr(instance, "_upline_ids", []))
@@ -1,3 +1,567 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import genealogy, leaderboards, registry
+
+from .models import (
+    CustomUser,
+    DailyEarnings,
+    EarningsType,
+    IndividualProfile,
+    LeaderboardEntry,
+    ReferralGenealogy,
+    UserEarnings,
+)
+from .utils import DIRECT_REFERRAL_BONUS, MATCHING_BONUS, approve_users
+
+
+def create_member(email, sponsor=None, status="pending"):
+    user = CustomUser.objects.create_user(
+        email, "password", name=email, user_type="individual", status=status
+    )
+    IndividualProfile.objects.create(user=user, gender="male", sponsor=sponsor)
+    return user
+
+
+class StaleUserSaveTests(TestCase):
+    def setUp(self):
+        self.sponsor = create_member("sponsor@example.com", status="approved")
+        self.member = create_member("member@example.com", sponsor=self.sponsor)
+
+    def approved_referrals(self):
+        return IndividualProfile.objects.get(user=self.sponsor).approved_referrals
+
+    def direct_referral_bonus(self):
+        return UserEarnings.objects.get(
+            individual_profile_id=self.sponsor.pk,
+            earnings_type__bonus_name="Direct Referral Bonus",
+        ).amount
+
+    def test_stale_save_reverses_the_bonus_it_undoes(self):
+        stale = CustomUser.objects.get(pk=self.member.pk)
+        approve_users([self.member.pk])
+        self.assertEqual(self.approved_referrals(), 1)
+
+        stale.name = "Renamed"
+        stale.save()
+
+        self.assertEqual(CustomUser.objects.get(pk=self.member.pk).status, "pending")
+        self.assertEqual(self.approved_referrals(), 0)
+        self.assertEqual(self.direct_referral_bonus(), Decimal("0.00"))
+
+    def test_save_without_status_keeps_the_approval(self):
+        stale = CustomUser.objects.get(pk=self.member.pk)
+        approve_users([self.member.pk])
+
+        stale.name = "Renamed"
+        stale.save(update_fields=["name"])
+
+        member = CustomUser.objects.get(pk=self.member.pk)
+        self.assertEqual(member.status, "approved")
+        self.assertEqual(member.name, "Renamed")
+        self.assertEqual(self.approved_referrals(), 1)
+        self.assertEqual(self.direct_referral_bonus(), DIRECT_REFERRAL_BONUS)
+
+    def test_repeated_approval_pays_once(self):
+        for _ in range(2):
+            member = CustomUser.objects.get(pk=self.member.pk)
+            member.status = "approved"
+            member.save()
+
+        self.assertEqual(self.approved_referrals(), 1)
+        self.assertEqual(self.direct_referral_bonus(), DIRECT_REFERRAL_BONUS)
+
+
+class ReferralBonusTests(TestCase):
+    def setUp(self):
+        self.sponsor = create_member("sponsor@example.com", status="approved")
+        self.members = [
+            create_member(f"member{i}@example.com", sponsor=self.sponsor)
+            for i in range(3)
+        ]
+
+    def bonuses(self):
+        return dict(
+            UserEarnings.objects.filter(
+                individual_profile_id=self.sponsor.pk
+            ).values_list("earnings_type__bonus_name", "amount")
+        )
+
+    def recompute(self, *args):
+        out = StringIO()
+        call_command("recompute_referral_bonuses", *args, stdout=out)
+        return out.getvalue()
+
+    def test_approvals_and_unapprovals_adjust_the_bonuses(self):
+        approve_users([member.pk for member in self.members[:2]])
+        self.assertEqual(
+            self.bonuses(),
+            {
+                "Direct Referral Bonus": DIRECT_REFERRAL_BONUS * 2,
+                "Matching Bonus": MATCHING_BONUS,
+            },
+        )
+
+        member = CustomUser.objects.get(pk=self.members[0].pk)
+        member.status = "pending"
+        member.save()
+
+        profile = IndividualProfile.objects.get(user=self.sponsor)
+        self.assertEqual(profile.approved_referrals, 1)
+        self.assertEqual(
+            self.bonuses(),
+            {
+                "Direct Referral Bonus": DIRECT_REFERRAL_BONUS,
+                "Matching Bonus": Decimal("0.00"),
+            },
+        )
+
+    def test_recompute_finds_nothing_after_incremental_updates(self):
+        approve_users([member.pk for member in self.members])
+
+        self.assertIn("0 drifted", self.recompute("--check"))
+
+    def test_recompute_repairs_drifted_bonuses(self):
+        approve_users([member.pk for member in self.members])
+        UserEarnings.objects.filter(
+            individual_profile_id=self.sponsor.pk,
+            earnings_type__bonus_name="Matching Bonus",
+        ).update(amount=Decimal("0.00"))
+
+        with self.assertRaises(CommandError):
+            self.recompute("--check")
+        self.recompute()
+
+        self.assertEqual(
+            self.bonuses(),
+            {
+                "Direct Referral Bonus": DIRECT_REFERRAL_BONUS * 3,
+                "Matching Bonus": MATCHING_BONUS,
+            },
+        )
+        self.assertIn("0 drifted", self.recompute("--check"))
+
+    def test_recompute_repairs_drifted_counters(self):
+        approve_users([member.pk for member in self.members])
+        IndividualProfile.objects.filter(user=self.sponsor).update(approved_referrals=5)
+
+        self.recompute()
+
+        profile = IndividualProfile.objects.get(user=self.sponsor)
+        self.assertEqual(profile.approved_referrals, 3)
+        self.assertEqual(
+            self.bonuses()["Direct Referral Bonus"], DIRECT_REFERRAL_BONUS * 3
+        )
+
+
+@override_settings(
+    RANK_REQUIREMENTS={
+        "field marshall": {"recruits": 2, "network_size": 2, "earnings": 0},
+    }
+)
+class RankPromotionTests(TestCase):
+    def setUp(self):
+        self.sponsor = create_member("sponsor@example.com", status="approved")
+        self.members = [
+            create_member(f"member{i}@example.com", sponsor=self.sponsor)
+            for i in range(2)
+        ]
+
+    def rank(self):
+        return IndividualProfile.objects.get(user=self.sponsor).rank
+
+    def test_approval_that_crosses_the_threshold_promotes(self):
+        for member in self.members:
+            member.status = "approved"
+            member.save()
+
+        self.assertEqual(self.rank(), "field marshall")
+
+    def test_bulk_approval_promotes(self):
+        approve_users([member.pk for member in self.members])
+
+        self.assertEqual(self.rank(), "field marshall")
+
+    def test_below_the_threshold_keeps_the_rank(self):
+        self.members[0].status = "approved"
+        self.members[0].save()
+
+        self.assertEqual(self.rank(), "entrepreneur")
+
+    def test_unapproved_sponsors_are_not_promoted(self):
+        CustomUser.objects.filter(pk=self.sponsor.pk).update(status="pending")
+
+        approve_users([member.pk for member in self.members])
+
+        self.assertEqual(self.rank(), "entrepreneur")
+
+    def test_promotions_are_off_without_requirements(self):
+        with self.settings():
+            del settings.RANK_REQUIREMENTS
+            approve_users([member.pk for member in self.members])
+
+        self.assertEqual(self.rank(), "entrepreneur")
+
+
+class EarningsLeaderboardTests(TestCase):
+    def setUp(self):
+        self.sponsor = create_member("sponsor@example.com", status="approved")
+        self.members = [
+            create_member(f"member{i}@example.com", sponsor=self.sponsor)
+            for i in range(2)
+        ]
+
+    def score(self, period, on_date=None):
+        entry = LeaderboardEntry.objects.filter(
+            board="earnings",
+            period_key=leaderboards.period_key(period, on_date),
+            user=self.sponsor,
+        ).first()
+        return entry.score if entry else Decimal("0.00")
+
+    def test_bonus_adjustments_count_towards_the_current_period(self):
+        approve_users([self.members[0].pk])
+        # The bonus row was created long ago; the next approval adjusts it
+        long_ago = timezone.localdate() - timedelta(days=90)
+        UserEarnings.objects.filter(individual_profile_id=self.sponsor.pk).update(
+            date=long_ago
+        )
+        LeaderboardEntry.objects.all().delete()
+
+        approve_users([self.members[1].pk])
+
+        self.assertGreaterEqual(self.score("week"), DIRECT_REFERRAL_BONUS)
+        self.assertGreaterEqual(self.score("month"), DIRECT_REFERRAL_BONUS)
+        self.assertEqual(self.score("week", long_ago), Decimal("0.00"))
+
+    def test_rebuild_restores_the_all_time_boards(self):
+        approve_users([member.pk for member in self.members])
+        before = {
+            (entry.board, entry.user_id): entry.score
+            for entry in LeaderboardEntry.objects.filter(period_key="all")
+        }
+
+        LeaderboardEntry.objects.filter(period_key="all").update(score=0)
+        leaderboards.rebuild()
+
+        after = {
+            (entry.board, entry.user_id): entry.score
+            for entry in LeaderboardEntry.objects.filter(period_key="all")
+        }
+        self.assertEqual(after, before)
+
+
+class GenealogyTests(TestCase):
+    def setUp(self):
+        self.root = create_member("root@example.com")
+        self.middle = create_member("middle@example.com", sponsor=self.root)
+        self.leaf = create_member("leaf@example.com", sponsor=self.middle)
+
+    def links(self):
+        return set(
+            ReferralGenealogy.objects.values_list(
+                "ancestor_id", "descendant_id", "depth"
+            )
+        )
+
+    def assertMatchesRebuild(self):
+        links = self.links()
+        genealogy.rebuild()
+        self.assertEqual(links, self.links())
+
+    def test_signup_links_the_upline(self):
+        self.assertEqual(genealogy.upline(self.leaf.pk), [self.middle.pk, self.root.pk])
+        self.assertEqual(genealogy.level_counts(self.root.pk), {1: 1, 2: 1})
+        self.assertMatchesRebuild()
+
+    def test_new_sponsor_moves_the_subtree(self):
+        other = create_member("other@example.com")
+        profile = IndividualProfile.objects.get(user=self.middle)
+        profile.sponsor = other
+        profile.save()
+
+        self.assertEqual(genealogy.upline(self.leaf.pk), [self.middle.pk, other.pk])
+        self.assertEqual(genealogy.network_size(self.root.pk), 0)
+        self.assertEqual(genealogy.network_size(other.pk), 2)
+        self.assertMatchesRebuild()
+
+    def test_deleting_a_sponsor_detaches_its_downline(self):
+        self.assertEqual(genealogy.downline_stats(self.root.pk)["network_size"], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.middle.delete()
+
+        self.assertEqual(genealogy.upline(self.leaf.pk), [])
+        self.assertEqual(genealogy.network_size(self.root.pk), 0)
+        self.assertEqual(genealogy.downline_stats(self.root.pk)["network_size"], 0)
+        self.assertMatchesRebuild()
+
+
+class DownlineStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.root = create_member("root@example.com", status="approved")
+        self.middle = create_member("middle@example.com", sponsor=self.root)
+        self.leaf = create_member("leaf@example.com", sponsor=self.middle)
+
+    def test_levels_and_status_breakdown(self):
+        stats = genealogy.downline_stats(self.root.pk)
+
+        self.assertEqual(stats["network_size"], 2)
+        self.assertEqual(stats["status_breakdown"]["pending"], 2)
+        self.assertEqual(
+            [(level["level"], level["total"]) for level in stats["levels"]],
+            [(1, 1), (2, 1)],
+        )
+
+    def test_stats_are_served_from_the_cache(self):
+        genealogy.downline_stats(self.root.pk)
+
+        with self.assertNumQueries(0):
+            genealogy.downline_stats(self.root.pk)
+
+    def test_status_changes_refresh_the_upline(self):
+        genealogy.downline_stats(self.root.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            approve_users([self.leaf.pk])
+
+        breakdown = genealogy.downline_stats(self.root.pk)["status_breakdown"]
+        self.assertEqual((breakdown["approved"], breakdown["pending"]), (1, 1))
+
+    def test_signups_refresh_the_upline(self):
+        genealogy.downline_stats(self.root.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_member("new@example.com", sponsor=self.leaf)
+
+        stats = genealogy.downline_stats(self.root.pk)
+        self.assertEqual(stats["network_size"], 3)
+        self.assertEqual(stats["levels"][-1]["level"], 3)
+
+
+class EarningsDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.member = create_member("member@example.com", status="approved")
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+        self.direct = EarningsType.objects.get(bonus_name="Direct Referral Bonus")
+        self.matching = EarningsType.objects.get(bonus_name="Matching Bonus")
+
+    def earn(self, earnings_type, amount):
+        UserEarnings.objects.create(
+            individual_profile_id=self.member.pk,
+            earnings_type=earnings_type,
+            amount=Decimal(amount),
+        )
+
+    def dashboard(self):
+        response = self.client.get(reverse("user_earnings", args=[self.member.pk]))
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_totals_by_type_and_month(self):
+        self.earn(self.direct, "30000.00")
+        self.earn(self.direct, "30000.00")
+        self.earn(self.matching, "3000.00")
+
+        data = self.dashboard()
+
+        month = timezone.now().strftime("%b")
+        self.assertEqual(data["Direct Referral Bonus"], Decimal("60000.00"))
+        self.assertEqual(data["Matching Bonus"], Decimal("3000.00"))
+        self.assertEqual(data["total_earnings"], Decimal("63000.00"))
+        self.assertEqual(data["selected_date_earnings"], Decimal("63000.00"))
+        self.assertEqual(data["monthly_earnings"][month], Decimal("63000.00"))
+
+    def test_query_count_does_not_grow_with_earnings_types(self):
+        self.dashboard()
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(5):
+                EarningsType.objects.create(bonus_name=f"Bonus {i}")
+        self.dashboard()
+
+        # Profile, totals and per-type amounts
+        with self.assertNumQueries(3):
+            data = self.dashboard()
+        self.assertEqual(data["Bonus 4"], 0)
+
+    def test_invalid_date_is_rejected(self):
+        response = self.client.get(
+            reverse("user_earnings", args=[self.member.pk]), {"date": "yesterday"}
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+
+class EarningsTypeRegistryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_lookups_do_not_query_until_the_version_changes(self):
+        types = registry.EarningsTypeRegistry()
+        types.all()
+
+        with self.assertNumQueries(0), mock.patch.object(
+            registry, "VERSION_CHECK_INTERVAL", 0
+        ):
+            self.assertIsNotNone(types.by_name("Direct Referral Bonus"))
+
+    def test_other_workers_reload_after_the_version_check_interval(self):
+        worker = registry.EarningsTypeRegistry()
+        self.assertIsNone(worker.by_name("Leadership Bonus"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            EarningsType.objects.create(bonus_name="Leadership Bonus")
+
+        self.assertIsNone(worker.by_name("Leadership Bonus"))
+        with mock.patch.object(registry, "VERSION_CHECK_INTERVAL", 0):
+            self.assertIsNotNone(worker.by_name("Leadership Bonus"))
+
+
+class DailyEarningsTests(TestCase):
+    def setUp(self):
+        self.member = create_member("member@example.com", status="approved")
+        self.direct = EarningsType.objects.get(bonus_name="Direct Referral Bonus")
+        self.matching = EarningsType.objects.get(bonus_name="Matching Bonus")
+
+    def rollup(self):
+        return {
+            row.earnings_type_id: (row.amount, row.count)
+            for row in DailyEarnings.objects.filter(
+                individual_profile_id=self.member.pk
+            )
+        }
+
+    def earn(self, earnings_type, amount):
+        return UserEarnings.objects.create(
+            individual_profile_id=self.member.pk,
+            earnings_type=earnings_type,
+            amount=Decimal(amount),
+        )
+
+    def test_rollup_follows_created_changed_and_deleted_earnings(self):
+        first = self.earn(self.direct, "100.00")
+        self.earn(self.direct, "50.00")
+        self.assertEqual(self.rollup()[self.direct.pk], (Decimal("150.00"), 2))
+
+        first.amount = Decimal("40.00")
+        first.earnings_type = self.matching
+        first.save()
+        self.assertEqual(self.rollup()[self.direct.pk], (Decimal("50.00"), 1))
+        self.assertEqual(self.rollup()[self.matching.pk], (Decimal("40.00"), 1))
+
+        first.delete()
+        self.assertEqual(self.rollup()[self.matching.pk][1], 0)
+
+    def test_rebuild_matches_the_incremental_rollup(self):
+        self.earn(self.direct, "100.00")
+        self.earn(self.matching, "30.00")
+        before = self.rollup()
+
+        DailyEarnings.objects.all().delete()
+        call_command("rebuild_earnings_rollup", stdout=StringIO())
+
+        self.assertEqual(self.rollup(), before)
+
+
+class TotalEarningsTests(TestCase):
+    def setUp(self):
+        self.member = create_member("member@example.com", status="approved")
+        self.direct = EarningsType.objects.get(bonus_name="Direct Referral Bonus")
+
+    def total(self):
+        return IndividualProfile.objects.get(user=self.member).total_earnings
+
+    def test_total_follows_earnings_changes(self):
+        earning = UserEarnings.objects.create(
+            individual_profile_id=self.member.pk,
+            earnings_type=self.direct,
+            amount=Decimal("100.00"),
+        )
+        self.assertEqual(self.total(), Decimal("100.00"))
+
+        earning.amount = Decimal("70.00")
+        earning.save()
+        self.assertEqual(self.total(), Decimal("70.00"))
+
+        earning.delete()
+        self.assertEqual(self.total(), Decimal("0.00"))
+
+    def test_profile_saves_keep_the_total(self):
+        UserEarnings.objects.create(
+            individual_profile_id=self.member.pk,
+            earnings_type=self.direct,
+            amount=Decimal("100.00"),
+        )
+        stale = IndividualProfile.objects.get(user=self.member)
+        UserEarnings.objects.create(
+            individual_profile_id=self.member.pk,
+            earnings_type=self.direct,
+            amount=Decimal("20.00"),
+        )
+
+        stale.gender = "female"
+        stale.save()
+
+        self.assertEqual(self.total(), Decimal("120.00"))
+
+    def test_check_command_reports_and_fixes_drift(self):
+        UserEarnings.objects.create(
+            individual_profile_id=self.member.pk,
+            earnings_type=self.direct,
+            amount=Decimal("100.00"),
+        )
+        IndividualProfile.objects.filter(user=self.member).update(
+            total_earnings=Decimal("5.00")
+        )
+
+        with self.assertRaises(CommandError):
+            call_command("check_earnings_totals", stdout=StringIO())
+        call_command("check_earnings_totals", "--fix", stdout=StringIO())
+
+        self.assertEqual(self.total(), Decimal("100.00"))
+        call_command("check_earnings_totals", stdout=StringIO())
+
+
+class LeaderboardPositionTests(TestCase):
+    def setUp(self):
+        self.members = [
+            create_member(f"member{i}@example.com", status="approved") for i in range(3)
+        ]
+
+    def position(self, member):
+        return leaderboards.position("recruits", "week", member.pk)["position"]
+
+    def test_positions_follow_scores_without_a_refresh(self):
+        for member, score in zip(self.members, (3, 5, 3)):
+            leaderboards.record("recruits", member.pk, score)
+
+        self.assertEqual([self.position(member) for member in self.members], [2, 1, 2])
+
+        leaderboards.record("recruits", self.members[2].pk, 5)
+        self.assertEqual([self.position(member) for member in self.members], [3, 2, 1])
+
+    def test_members_without_a_score_have_no_position(self):
+        self.assertIsNone(leaderboards.position("recruits", "week", self.members[0].pk))
+
+    def test_cached_top_reports_when_it_was_computed(self):
+        leaderboards.record("recruits", self.members[0].pk, 1)
+        before = timezone.now()
+
+        leaderboards.refresh()
+        top = leaderboards.top("recruits", "week")
+
+        self.assertGreaterEqual(top["refreshed_at"], before)
+        self.assertEqual([row["user_id"] for row in top["rows"]], [self.members[0].pk])
@@ -9,6 +9,7 @@ from .views import (
     PasswordResetView,
     PasswordResetRequestView,
     EarningTypesViewSet,
+    UserApprovalView,
 )
 from rest_framework_simplejwt.views import (
     TokenRefreshView,
@@ -24,6 +25,7 @@ urlpatterns = [
     path("token/", CustomTokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("signup/", SignupView.as_view(), name="signup"),
+    path("users/approve/", UserApprovalView.as_view(), name="user-approve"),
     path(
         "user-earnings/<int:user_id>/", UserEarningsView.as_view(), name="user_earnings"
     ),
@@ -1,58 +1,218 @@
 from decimal import Decimal
 
+from django.db import transaction
+from django.db.models import Count, F, QuerySet
+
+DIRECT_REFERRAL_BONUS = Decimal("30000.00")
+MATCHING_BONUS = Decimal("3000.00")
+
+
+def _direct_referral_description(approved_referrals):
+    return f"Direct Referral Bonus for {approved_referrals} approved referrals"
+
+
+def _matching_bonus_description(matching_bonus_pairs):
+    return f"Matching Bonus for {matching_bonus_pairs} pairs of approved referrals"
+
+
+def _adjust_bonus(sponsor_profile, bonus_name, amount_delta, description):
+    """
+    Adds amount_delta to the sponsor's earnings row for bonus_name, creating
+    the row when the sponsor has not earned that bonus yet.
+    The caller must hold a lock on the sponsor profile row.
+    """
+    from .earnings import record_earnings_change
+    from .models import UserEarnings
+    from .registry import earnings_types
+
+    earnings_type = earnings_types.get_or_create(bonus_name)
+
+    earning = (
+        UserEarnings.objects.filter(
+            individual_profile=sponsor_profile, earnings_type=earnings_type
+        )
+        .values("pk", "date")
+        .first()
+    )
+    if earning is not None:
+        UserEarnings.objects.filter(pk=earning["pk"]).update(
+            amount=F("amount") + amount_delta, description=description
+        )
+        record_earnings_change(
+            sponsor_profile.pk, earning["date"], earnings_type.pk, amount_delta
+        )
+    else:
+        UserEarnings.objects.create(
+            individual_profile=sponsor_profile,
+            earnings_type=earnings_type,
+            amount=amount_delta,
+            description=description,
+        )
+
+
+def apply_referral_approvals(sponsor_id, delta=1):
+    """
+    Incrementally applies a change in the number of approved referrals of a sponsor.
+    Args:
+        sponsor_id: The id of the sponsor user.
+        delta: The number of referrals that became approved (negative when
+            approved referrals were moved out of the approved status).
+    Returns:
+        The change in the sponsor's total bonus amount.
+    """
+    from . import leaderboards
+    from .models import IndividualProfile
+
+    with transaction.atomic():
+        sponsor_profile = (
+            IndividualProfile.objects.select_for_update().filter(user_id=sponsor_id)
+        ).first()
+        if sponsor_profile is None:
+            # Only individual members earn referral bonuses
+            return Decimal("0.00")
+
+        old_count = sponsor_profile.approved_referrals
+        new_count = max(old_count + delta, 0)
+        if new_count == old_count:
+            return Decimal("0.00")
+
+        IndividualProfile.objects.filter(pk=sponsor_profile.pk).update(
+            approved_referrals=new_count
+        )
+        leaderboards.record("recruits", sponsor_id, new_count - old_count)
+
+        direct_referral_delta = DIRECT_REFERRAL_BONUS * (new_count - old_count)
+        _adjust_bonus(
+            sponsor_profile,
+            "Direct Referral Bonus",
+            direct_referral_delta,
+            _direct_referral_description(new_count),
+        )
+
+        matching_bonus_pairs = new_count // 2
+        matching_bonus_delta = MATCHING_BONUS * (matching_bonus_pairs - old_count // 2)
+        if matching_bonus_delta:
+            _adjust_bonus(
+                sponsor_profile,
+                "Matching Bonus",
+                matching_bonus_delta,
+                _matching_bonus_description(matching_bonus_pairs),
+            )
+
+    return direct_referral_delta + matching_bonus_delta
+
+
+def approve_users(users):
+    """
+    Approves pending users in one transaction.
+    Args:
+        users: A queryset of users or an iterable of user ids.
+    Returns:
+        The ids of the users that were actually moved from pending to approved.
+    """
+    from . import genealogy
+    from .models import CustomUser, IndividualProfile, ReferralGenealogy
+    from .ranks import evaluate_upline_ranks
+
+    user_ids = users.values("pk") if isinstance(users, QuerySet) else list(users)
+
+    with transaction.atomic():
+        approved_ids = list(
+            CustomUser.objects.select_for_update()
+            .filter(pk__in=user_ids, status="pending")
+            .values_list("pk", flat=True)
+        )
+        if not approved_ids:
+            return []
+
+        CustomUser.objects.filter(pk__in=approved_ids, status="pending").update(
+            status="approved"
+        )
+
+        # One bonus adjustment per sponsor for the whole batch, in a stable
+        # order so concurrent batches lock sponsor profiles consistently
+        sponsors = (
+            IndividualProfile.objects.filter(
+                user_id__in=approved_ids, sponsor__isnull=False
+            )
+            .values_list("sponsor")
+            .annotate(approved=Count("pk"))
+            .order_by("sponsor")
+        )
+        for sponsor_id, approved in sponsors:
+            apply_referral_approvals(sponsor_id, delta=approved)
+
+        evaluate_upline_ranks(approved_ids)
+
+        genealogy.invalidate_downline_stats(
+            set(
+                ReferralGenealogy.objects.filter(
+                    descendant_id__in=approved_ids, depth__gt=0
+                ).values_list("ancestor_id", flat=True)
+            )
+        )
+
+    return approved_ids
+
 
 def calculate_and_create_bonuses(sponsor_user):
     """
-    Calculates and creates bonuses for a given sponsor user.
+    Recalculates the bonuses of a given sponsor user from scratch.
+    The approval flow uses apply_referral_approvals; this is kept for audits
+    (see the recompute_referral_bonuses management command).
     Args:
         sponsor_user: The user for whom the bonuses are being calculated.
     Returns:
         The total bonus amount, which is the sum of the direct referral bonus and the matching bonus.
     """
-    from .models import UserEarnings, IndividualProfile, CustomUser, EarningsType
+    from .models import UserEarnings, IndividualProfile, CustomUser
+    from .registry import earnings_types
 
-    sponsor_profile = IndividualProfile.objects.get(user=sponsor_user)
+    with transaction.atomic():
+        sponsor_profile = IndividualProfile.objects.select_for_update().get(
+            user=sponsor_user
+        )
 
-    # Count approved direct referrals
-    approved_referrals = CustomUser.objects.filter(
-        individual_profile__sponsor=sponsor_user, status="approved"
-    ).count()
+        # Count approved direct referrals
+        approved_referrals = CustomUser.objects.filter(
+            individual_profile__sponsor=sponsor_user, status="approved"
+        ).count()
 
-    # Calculate direct referral bonuses
-    direct_referral_bonus = Decimal("30000.00") * approved_referrals
+        IndividualProfile.objects.filter(pk=sponsor_profile.pk).update(
+            approved_referrals=approved_referrals
+        )
 
-    # Get or create EarningsType for direct referral bonus
-    direct_referral_type, _ = EarningsType.objects.get_or_create(
-        bonus_name="Direct Referral Bonus"
-    )
+        # Calculate direct referral bonuses
+        direct_referral_bonus = DIRECT_REFERRAL_BONUS * approved_referrals
 
-    # Create or update direct referral bonus entry
-    UserEarnings.objects.update_or_create(
-        individual_profile=sponsor_profile,
-        earnings_type=direct_referral_type,
-        defaults={
-            "amount": direct_referral_bonus,
-            "description": f"Direct Referral Bonus for {approved_referrals} approved referrals",
-        },
-    )
+        # Get or create EarningsType for direct referral bonus
+        direct_referral_type = earnings_types.get_or_create("Direct Referral Bonus")
 
-    # Calculate matching bonus
-    matching_bonus_pairs = approved_referrals // 2
-    matching_bonus = Decimal("3000.00") * matching_bonus_pairs
+        # Create or update direct referral bonus entry
+        UserEarnings.objects.update_or_create(
+            individual_profile=sponsor_profile,
+            earnings_type=direct_referral_type,
+            defaults={
+                "amount": direct_referral_bonus,
+                "description": _direct_referral_description(approved_referrals),
+            },
+        )
 
-    # Get or create EarningsType for matching bonus
-    matching_bonus_type, _ = EarningsType.objects.get_or_create(
-        bonus_name="Matching Bonus"
-    )
+        # Calculate matching bonus
+        matching_bonus_pairs = approved_referrals // 2
+        matching_bonus = MATCHING_BONUS * matching_bonus_pairs
 
-    # Create or update matching bonus entry
-    UserEarnings.objects.update_or_create(
-        individual_profile=sponsor_profile,
-        earnings_type=matching_bonus_type,
-        defaults={
-            "amount": matching_bonus,
-            "description": f"Matching Bonus for {matching_bonus_pairs} pairs of approved referrals",
-        },
-    )
+        # Get or create EarningsType for matching bonus
+        matching_bonus_type = earnings_types.get_or_create("Matching Bonus")
+
+        # Create or update matching bonus entry
+        UserEarnings.objects.update_or_create(
+            individual_profile=sponsor_profile,
+            earnings_type=matching_bonus_type,
+            defaults={
+                "amount": matching_bonus,
+                "description": _matching_bonus_description(matching_bonus_pairs),
+            },
+        )
 
     return direct_referral_bonus + matching_bonus
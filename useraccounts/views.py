@@ -1,12 +1,15 @@
+import calendar
+
 from django.utils.dateparse import parse_date
 from rest_framework import viewsets, generics, permissions
 from rest_framework.views import APIView
 from rest_framework import status
+from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
-from .models import IndividualProfile, CompanyProfile, UserEarnings, EarningsType
+from .models import IndividualProfile, CompanyProfile, DailyEarnings, EarningsType
 from .serializers import (
     IndividualProfileSerializer,
     CompanyProfileSerializer,
@@ -14,8 +17,12 @@ from .serializers import (
     SignupSerializer,
     PasswordResetSerializer,
     EarningsTypeSerializer,
+    UserApprovalSerializer,
 )
-from django.db.models import Sum
+from .registry import earnings_types
+from .utils import approve_users
+from referrals.permissions import IsAdmin
+from django.db.models import Q, Sum
 from django.utils import timezone
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_decode
@@ -96,12 +103,15 @@ class IndividualProfileViewSet(viewsets.ModelViewSet):
     queryset = CompanyProfile.objects.all()
     serializer_class = IndividualProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [OrderingFilter]
+    ordering_fields = ["total_earnings", "approved_referrals", "rank"]
 
     def get_queryset(self):
         user = self.request.user
+        profiles = IndividualProfile.objects.select_related("user")
         if user.user_type == "admin" or user.user_type == "individual":
-            return IndividualProfile.objects.all()
-        return IndividualProfile.objects.filter(user=user)
+            return profiles.all()
+        return profiles.filter(user=user)
 
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop("partial", False)
@@ -162,60 +172,67 @@ class UserEarningsView(APIView):
     def get(self, request, user_id):
         try:
             profile = IndividualProfile.objects.get(user_id=user_id)
-            earnings = UserEarnings.objects.filter(individual_profile=profile)
+        except IndividualProfile.DoesNotExist:
+            return Response(
+                {"error": "User not found"}, status=status.HTTP_404_NOT_FOUND
+            )
 
-            # Get the date parameter from the request, default to today
-            date_str = request.query_params.get("date")
-            if date_str:
-                selected_date = parse_date(date_str)
-            else:
-                selected_date = timezone.now().date()
-
-            # Filter earnings by the selected date
-            daily_earnings = earnings.filter(date=selected_date)
-
-            monthly_earnings = {}
-            for month in range(1, 13):
-                total = (
-                    earnings.filter(date__month=month).aggregate(Sum("amount"))[
-                        "amount__sum"
-                    ]
-                    or 0
-                )
-                monthly_earnings[timezone.now().replace(month=month).strftime("%b")] = (
-                    total
-                )
+        # Get the date parameter from the request, default to today
+        date_str = request.query_params.get("date")
+        try:
+            selected_date = parse_date(date_str) if date_str else timezone.now().date()
+        except ValueError:
+            selected_date = None
+        if selected_date is None:
+            return Response(
+                {"error": "Invalid date, expected YYYY-MM-DD"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-            # Get all EarningsType objects
-            earnings_types = EarningsType.objects.all()
-
-            # Create a dictionary to store daily earnings for each type
-            daily_earnings_by_type = {}
-            for earnings_type in earnings_types:
-                amount = (
-                    daily_earnings.filter(earnings_type=earnings_type).aggregate(
-                        Sum("amount")
-                    )["amount__sum"]
-                    or 0
+        # Monthly earnings are reported for one year, default to the selected date's
+        try:
+            year = int(request.query_params.get("year", selected_date.year))
+        except ValueError:
+            return Response(
+                {"error": "Invalid year"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Totals, the selected date and every month of the year in one query
+        totals = DailyEarnings.objects.filter(individual_profile=profile).aggregate(
+            total_earnings=Sum("amount"),
+            selected_date_earnings=Sum("amount", filter=Q(date=selected_date)),
+            **{
+                f"month_{month}": Sum(
+                    "amount", filter=Q(date__year=year, date__month=month)
                 )
-                daily_earnings_by_type[earnings_type.bonus_name] = amount
+                for month in range(1, 13)
+            },
+        )
+        monthly_earnings = {
+            calendar.month_abbr[month]: totals[f"month_{month}"] or 0
+            for month in range(1, 13)
+        }
 
-            data = {
-                **daily_earnings_by_type,
-                "monthly_earnings": monthly_earnings,
-                "total_earnings": sum(earning.amount for earning in earnings),
-                "selected_date_earnings": daily_earnings.aggregate(Sum("amount"))[
-                    "amount__sum"
-                ]
-                or 0,
-            }
+        # Earnings of the selected date for each type in one grouped query
+        amounts_by_type = dict(
+            DailyEarnings.objects.filter(individual_profile=profile, date=selected_date)
+            .values_list("earnings_type_id")
+            .annotate(total=Sum("amount"))
+            .order_by()
+        )
+        daily_earnings_by_type = {
+            earnings_type.bonus_name: amounts_by_type.get(earnings_type.pk) or 0
+            for earnings_type in earnings_types.all()
+        }
 
-            return Response(data)
+        data = {
+            **daily_earnings_by_type,
+            "monthly_earnings": monthly_earnings,
+            "total_earnings": totals["total_earnings"] or 0,
+            "selected_date_earnings": totals["selected_date_earnings"] or 0,
+        }
 
-        except IndividualProfile.DoesNotExist:
-            return Response(
-                {"error": "User not found"}, status=status.HTTP_404_NOT_FOUND
-            )
+        return Response(data)
 
 
 class PasswordResetRequestView(APIView):
@@ -269,7 +286,7 @@ class PasswordResetView(APIView):
 
             if user is not None and default_token_generator.check_token(user, token):
                 user.set_password(new_password)
-                user.save()
+                user.save(update_fields=["password"])
                 return Response(
                     {"detail": "Password has been reset."}, status=status.HTTP_200_OK
                 )
@@ -285,3 +302,20 @@ class EarningTypesViewSet(viewsets.ModelViewSet):
     queryset = EarningsType.objects.all()
     serializer_class = EarningsTypeSerializer
     permission_classes = [IsAuthenticated]
+
+
+class UserApprovalView(APIView):
+    """
+    API endpoint that approves pending users in bulk.
+    """
+
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def post(self, request, *args, **kwargs):
+        serializer = UserApprovalSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        approved_ids = approve_users(serializer.get_users())
+        return Response(
+            {"approved": approved_ids, "count": len(approved_ids)},
+            status=status.HTTP_200_OK,
+        )